@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Bulk backfill for GJ MugShots
+Parses a whole directory of blotter PDFs (archive/ by default) into a TSV
+spool, loads it into a staging table with LOAD DATA LOCAL INFILE and merges
+it into bookings with one set-based upsert, with the secondary indexes
+dropped for the duration of the load; derived tables are then filled in
+committed, id-ordered chunks
+"""
+
+import os
+import re
+import sys
+import argparse
+import tempfile
+from datetime import datetime
+import pymysql
+from db_pool import open_dedicated_connection
+from run_metrics import metrics, build_report, print_stage_summary
+from gj_mugshots_core import (
+    ARCHIVE_DIR, BOOKING_COLUMNS, BOOKING_UPSERT_UPDATE, BOOKING_INDEXES, PERMANENT_INDEXES,
+    PDF_BACKENDS, DEFAULT_PDF_BACKEND, build_booking_rows, iter_extract_jobs, extract_date_from_filename,
+    sync_booking_charges, sync_search_index, refresh_daily_stats, assign_persons, link_booking_images,
+    prune_linked_images, file_sha256, find_ingested_pdf, record_ingested_pdf, ensure_directories, ensure_database_tables,
+    ensure_database_indexes, report_image_stats, cleanup
+)
+
+# Temporary table the spool is loaded into (one per backfill connection)
+STAGING_TABLE = "bookings_staging"
+STAGING_COLUMNS = BOOKING_COLUMNS + ("image_hash",)
+# Ids of the bookings a merge touched, walked in chunks to fill the derived tables
+MERGED_IDS_TABLE = "bookings_merged_ids"
+MERGE_CHUNK = 1000
+
+# Rows per INSERT when the server refuses LOAD DATA LOCAL INFILE
+FALLBACK_INSERT_CHUNK = 5000
+
+# MySQL's default LOAD DATA escapes: \N is NULL, backslash escapes the rest
+TSV_ESCAPES = {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"}
+TSV_UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r", "0": "\0"}
+
+def tsv_field(value):
+    """Encode one value for the spool"""
+    if value is None:
+        return "\\N"
+    return "".join(TSV_ESCAPES.get(c, c) for c in str(value))
+
+def parse_tsv_field(field):
+    """Decode one spool value (used when LOAD DATA is unavailable)"""
+    if field == "\\N":
+        return None
+    return re.sub(r"\\(.)", lambda m: TSV_UNESCAPES.get(m.group(1), m.group(1)), field)
+
+def list_pdfs(directory, force=False):
+    """PDFs in a directory, oldest first, minus those already ingested
+
+    Returns [(filename, sha256)]. With force, the ingestion manifest is
+    ignored; byte-identical files within the directory are still parsed once.
+    """
+    files = sorted((f for f in os.listdir(directory) if f.lower().endswith('.pdf')),
+                   key=extract_date_from_filename)
+    selected = []
+    seen = set()
+    for f in files:
+        try:
+            sha256 = file_sha256(os.path.join(directory, f))
+        except Exception as e:
+            print(f"FAILED {f}: {e}")
+            continue
+        if sha256 in seen:
+            print(f"Skipping {f} (identical to another file in this backfill)")
+            continue
+        if not force:
+            ingested = find_ingested_pdf(sha256)
+            if ingested:
+                print(f"Skipping {f} (identical to ingested {ingested[0]})")
+                continue
+        seen.add(sha256)
+        selected.append((f, sha256))
+    return selected
+
+def spool_directory(directory, files, spool, workers, backend):
+    """Parse PDFs on a process pool and append their rows to the spool
+
+    Images are stored as in the daily run. Returns (row_count, manifest),
+    manifest holding one ingested_pdfs entry per parsed file.
+    """
+    row_count = 0
+    manifest = []
+    hashes = dict(files)
+    paths = [os.path.join(directory, f) for f, _ in files]
+    for n, (path, result, error) in enumerate(iter_extract_jobs(paths, workers, backend), 1):
+        f = os.path.basename(path)
+        try:
+            if error:
+                raise error
+            records, page_count, parse_seconds, _ = result
+            booked = build_booking_rows(records, f, path)
+        except Exception as e:
+            print(f"FAILED {f}: {e}")
+            continue
+
+        with metrics.stage("spool_write"):
+            for row, image_hash in booked:
+                spool.write("\t".join(tsv_field(v) for v in row + (image_hash,)) + "\n")
+        row_count += len(booked)
+        manifest.append((f, hashes[f], page_count, len(records), parse_seconds))
+        print(f"[{n}/{len(files)}] {f}: {len(booked)} rows")
+    return row_count, manifest
+
+def existing_booking_indexes(cursor):
+    cursor.execute('''
+        SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'bookings'
+    ''')
+    return {row[0] for row in cursor.fetchall()}
+
+def drop_secondary_indexes(cursor):
+    """Drop the pipeline's secondary indexes on bookings (PERMANENT_INDEXES stay)"""
+    existing = existing_booking_indexes(cursor)
+    for index_name, _ in BOOKING_INDEXES:
+        if index_name not in PERMANENT_INDEXES and index_name in existing:
+            cursor.execute(f"DROP INDEX {index_name} ON bookings")
+            print(f"Dropped index: {index_name}")
+
+def load_spool(cursor, spool_path):
+    """Create the staging table and fill it from the spool file"""
+    columns = ", ".join(STAGING_COLUMNS)
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {STAGING_TABLE}")
+    # Same column types as bookings, plus the image hash
+    cursor.execute(f"CREATE TEMPORARY TABLE {STAGING_TABLE} SELECT {', '.join(BOOKING_COLUMNS)} FROM bookings LIMIT 0")
+    cursor.execute(f"ALTER TABLE {STAGING_TABLE} ADD COLUMN image_hash CHAR(64) NULL")
+    try:
+        cursor.execute(f'''
+            LOAD DATA LOCAL INFILE %s INTO TABLE {STAGING_TABLE}
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+            LINES TERMINATED BY '\\n'
+            ({columns})
+        ''', (os.path.abspath(spool_path),))
+        return cursor.rowcount
+    except pymysql.MySQLError as e:
+        print(f"LOAD DATA LOCAL INFILE unavailable ({e}), loading staging table with batched inserts")
+
+    insert_sql = f"INSERT INTO {STAGING_TABLE} ({columns}) VALUES ({', '.join(['%s'] * len(STAGING_COLUMNS))})"
+    loaded = 0
+    batch = []
+    with open(spool_path, encoding="utf-8", newline="\n") as spool:
+        for line in spool:
+            batch.append(tuple(parse_tsv_field(f) for f in line.rstrip("\n").split("\t")))
+            if len(batch) >= FALLBACK_INSERT_CHUNK:
+                cursor.executemany(insert_sql, batch)
+                loaded += len(batch)
+                batch = []
+    if batch:
+        cursor.executemany(insert_sql, batch)
+        loaded += len(batch)
+    return loaded
+
+def merge_staging(conn):
+    """Upsert the staging table into bookings and fill in the derived tables; returns rows added
+
+    The set-based upsert and image links commit first. The ids of the
+    merged bookings are kept in a temporary table and walked in id order,
+    MERGE_CHUNK at a time, one transaction per chunk for the charges, search
+    index, persons and image links; the statistics rollups follow last,
+    since they summarize booking_charges.
+    """
+    cursor = conn.cursor()
+    columns = ", ".join(BOOKING_COLUMNS)
+    cursor.execute("SELECT COUNT(*) FROM bookings")
+    count_before = cursor.fetchone()[0]
+
+    # Same conflict rules as the daily row upsert
+    cursor.execute(f'''
+        INSERT INTO bookings ({columns})
+        SELECT {columns} FROM {STAGING_TABLE}
+    ''' + BOOKING_UPSERT_UPDATE)
+
+    cursor.execute(f'''
+        INSERT IGNORE INTO booking_images (booking_id, image_hash)
+        SELECT b.id, s.image_hash
+        FROM {STAGING_TABLE} s
+        JOIN bookings b
+          ON b.raw_name = s.raw_name AND b.booking_date = s.booking_date
+         AND b.booking_time = s.booking_time AND b.source_pdf = s.source_pdf
+        WHERE s.image_hash IS NOT NULL
+    ''')
+
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {MERGED_IDS_TABLE}")
+    cursor.execute(f"CREATE TEMPORARY TABLE {MERGED_IDS_TABLE} (id INT NOT NULL PRIMARY KEY)")
+    cursor.execute(f'''
+        INSERT IGNORE INTO {MERGED_IDS_TABLE} (id)
+        SELECT b.id
+        FROM {STAGING_TABLE} s
+        JOIN bookings b
+          ON b.raw_name = s.raw_name AND b.booking_date = s.booking_date
+         AND b.booking_time = s.booking_time AND b.source_pdf = s.source_pdf
+    ''')
+    cursor.execute("SELECT COUNT(*) FROM bookings")
+    added = cursor.fetchone()[0] - count_before
+    conn.commit()
+
+    # Normalized charges and the search index follow whatever the merge kept
+    last_id = 0
+    synced = 0
+    while True:
+        cursor.execute(f'''
+            SELECT b.id, b.first_name, b.middle_name, b.last_name, b.address, b.charges
+            FROM {MERGED_IDS_TABLE} m
+            JOIN bookings b ON b.id = m.id
+            WHERE m.id > %s
+            ORDER BY m.id
+            LIMIT %s
+        ''', (last_id, MERGE_CHUNK))
+        merged = cursor.fetchall()
+        if not merged:
+            break
+        booking_ids = [row[0] for row in merged]
+        sync_booking_charges(cursor, [(row[0], row[5]) for row in merged])
+        sync_search_index(cursor, merged)
+        assign_persons(cursor, booking_ids)
+        link_booking_images(cursor, booking_ids)
+        conn.commit()
+        synced += len(merged)
+        last_id = booking_ids[-1]
+        print(f"Indexed {synced} merged bookings")
+
+    cursor.execute(f"SELECT DISTINCT booking_date FROM {STAGING_TABLE}")
+    refresh_daily_stats(cursor, [row[0] for row in cursor.fetchall()])
+    conn.commit()
+    return added
+
+def load_and_merge(spool_path, keep_indexes=False):
+    """Load the spool and merge it (see merge_staging); returns rows added
+
+    Until the PDFs are recorded in the manifest a failed merge is simply
+    re-run: the upsert and every derived-table sync are idempotent.
+    """
+    conn = open_dedicated_connection(local_infile=True)
+    dropped = False
+    try:
+        cursor = conn.cursor()
+        if not keep_indexes:
+            with metrics.stage("index_drop"):
+                drop_secondary_indexes(cursor)
+            dropped = True
+
+        with metrics.stage("staging_load"):
+            loaded = load_spool(cursor, spool_path)
+        print(f"Loaded {loaded} rows into {STAGING_TABLE}")
+
+        with metrics.stage("merge"):
+            added = merge_staging(conn)
+        print(f"Merged staging table: {added} new bookings, {loaded - added} existing")
+        return added
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+        if dropped:
+            # DDL is not transactional: rebuild whatever was dropped even on failure
+            with metrics.stage("index_rebuild"):
+                ensure_database_indexes()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load a directory of blotter PDFs into bookings")
+    parser.add_argument("directory", nargs="?", default=ARCHIVE_DIR,
+                        help=f"Directory of PDFs to load (default: {ARCHIVE_DIR}); files are not moved")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes used to parse PDFs (default: all CPUs)")
+    parser.add_argument("--backend", choices=sorted(PDF_BACKENDS), default=DEFAULT_PDF_BACKEND,
+                        help=f"PDF text/layout engine (default: {DEFAULT_PDF_BACKEND})")
+    parser.add_argument("--spool", help="Write the TSV spool here and keep it (default: a temporary file)")
+    parser.add_argument("--spool-only", action="store_true", help="Parse and write the spool, load nothing")
+    parser.add_argument("--keep-indexes", action="store_true",
+                        help="Leave secondary indexes in place during the load (slower, site stays fast)")
+    parser.add_argument("--force", action="store_true", help="Include PDFs already in the ingestion manifest")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("=== GJ MugShots Bulk Backfill ===")
+    print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    if not os.path.isdir(args.directory):
+        print(f"Missing {args.directory} directory")
+        return 1
+
+    metrics.reset()
+    ensure_directories()
+    if not args.spool_only:
+        ensure_database_tables()
+        ensure_database_indexes()
+
+    files = list_pdfs(args.directory, force=args.force or args.spool_only)
+    if not files:
+        print("Nothing to backfill")
+        return 0
+    print(f"Backfilling {len(files)} PDFs from {args.directory}")
+
+    if args.spool:
+        spool_path = args.spool
+    else:
+        fd, spool_path = tempfile.mkstemp(prefix="backfill-", suffix=".tsv", dir=".")
+        os.close(fd)
+    try:
+        with open(spool_path, "w", encoding="utf-8", newline="\n") as spool:
+            row_count, manifest = spool_directory(args.directory, files, spool,
+                                                  max(1, args.workers), args.backend)
+        print(f"Spooled {row_count} rows from {len(manifest)} PDFs to {spool_path}")
+        report_image_stats()
+
+        if args.spool_only or not row_count:
+            return 0
+
+        load_and_merge(spool_path, keep_indexes=args.keep_indexes)
+        for entry in manifest:
+            record_ingested_pdf(*entry)
+        prune_linked_images()
+    finally:
+        if not args.spool and os.path.exists(spool_path):
+            os.remove(spool_path)
+        print_stage_summary(build_report(True))
+
+    print("Backfill complete!")
+    return 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        cleanup()
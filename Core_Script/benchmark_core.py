@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the GJ MugShots pipeline
+Times PDF extraction (both backends), name parsing, photo matching, image
+storage and, optionally, the database save against synthetic blotters, and
+prints machine-readable JSON so runs can be compared between commits.
+tests/test_benchmarks.py runs the same workloads under pytest-benchmark.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import resource
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import multiprocessing
+from datetime import datetime
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from synthetic_blotter import generate_blotter, make_photo, LAST_NAMES, FIRST_NAMES, MIDDLE_NAMES
+
+# Source PDF name used for rows written by the database benchmark
+BENCH_SOURCE_PDF = "Synthetic Bench 2025-10-01.pdf"
+
+def time_runs(func, repeat):
+    """Call func repeat times and return (per-run seconds, last result)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+def bench_extract(workdir, pages, bookings_per_page, repeat, backend):
+    from gj_mugshots_core import extract_records_from_pdf
+    pdf_path = os.path.join(workdir, "bench.pdf")
+    generate_blotter(pdf_path, pages=pages, bookings_per_page=bookings_per_page)
+    timings, records = time_runs(lambda: extract_records_from_pdf(pdf_path, backend), repeat)
+    return timings, len(records)
+
+def bench_extract_pymupdf(workdir, pages, bookings_per_page, repeat):
+    return bench_extract(workdir, pages, bookings_per_page, repeat, "pymupdf")
+
+def bench_extract_pdfplumber(workdir, pages, bookings_per_page, repeat):
+    return bench_extract(workdir, pages, bookings_per_page, repeat, "pdfplumber")
+
+def bench_parse_name(workdir, pages, bookings_per_page, repeat):
+    from records import parse_name
+    rnd = random.Random(0)
+    names = [f"{rnd.choice(LAST_NAMES)}, {rnd.choice(FIRST_NAMES)} {rnd.choice(MIDDLE_NAMES)}".strip()
+             for _ in range(pages * bookings_per_page * 100)]
+    names += [f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}" for _ in range(len(names) // 10)]
+    timings, _ = time_runs(lambda: [parse_name(n) for n in names], repeat)
+    return timings, len(names)
+
+def bench_match_images(workdir, pages, bookings_per_page, repeat):
+    from gj_mugshots_core import match_images_to_names
+    rnd = random.Random(0)
+    layouts = []
+    for _ in range(pages * 100):
+        name_tops = sorted(rnd.uniform(70, 790) for _ in range(bookings_per_page))
+        # Most rows have a photo, plus the occasional logo at the top
+        image_mids = sorted(top + rnd.uniform(-15, 15) for top in name_tops if rnd.random() < 0.9)
+        if rnd.random() < 0.5:
+            image_mids.insert(0, 30.0)
+        layouts.append((name_tops, image_mids))
+    timings, _ = time_runs(lambda: [match_images_to_names(n, m) for n, m in layouts], repeat)
+    return timings, len(layouts) * bookings_per_page
+
+def bench_store_images(workdir, pages, bookings_per_page, repeat):
+    import gj_mugshots_core
+    rnd = random.Random(0)
+    photos = [make_photo(rnd) for _ in range(pages * bookings_per_page)]
+    os.chdir(workdir)
+
+    def run():
+        # Start from an empty store every time so files are really written
+        store = os.path.join(workdir, f"images-{time.perf_counter_ns()}")
+        gj_mugshots_core.IMAGES_DIR = store
+        return gj_mugshots_core.store_images(photos)
+
+    timings, _ = time_runs(run, repeat)
+    return timings, len(photos)
+
+def bench_save_records(workdir, pages, bookings_per_page, repeat):
+    import gj_mugshots_core
+    from gj_mugshots_core import (extract_records_from_pdf, save_records_to_database,
+                                  ensure_database_tables, ensure_database_indexes)
+    pdf_path = os.path.join(workdir, "bench.pdf")
+    generate_blotter(pdf_path, pages=pages, bookings_per_page=bookings_per_page)
+    records = extract_records_from_pdf(pdf_path)
+    os.chdir(workdir)
+    gj_mugshots_core.IMAGES_DIR = os.path.join(workdir, "images")
+
+    def run():
+        clear_scratch_tables()
+        return save_records_to_database(records, BENCH_SOURCE_PDF)
+
+    # Writes go to a throwaway database, never the configured one
+    with scratch_database():
+        ensure_database_tables()
+        ensure_database_indexes()
+        timings, saved = time_runs(run, repeat)
+    if saved is None:
+        raise RuntimeError("save_records_to_database failed")
+    return timings, len(records)
+
+# Tables copied (structure only) into a scratch database; the pipeline's own
+# tables are then created there by ensure_database_tables()
+SCRATCH_COPY_TABLES = ("bookings",)
+
+@contextmanager
+def scratch_database(copy_tables=SCRATCH_COPY_TABLES):
+    """Serve pooled connections from an empty, throwaway copy of the configured database
+
+    For benchmarks and tests that write: a new database is created on the
+    configured server with copy_tables created LIKE their counterparts in
+    DB_NAME (no rows), get_db_connection() uses a pool of its own inside the
+    block, and the database is dropped afterwards. Dedicated connections
+    (open_dedicated_connection) still go to DB_NAME.
+    """
+    from config import DB_NAME
+    from db_pool import create_pool, pool_override, open_dedicated_connection
+    name = f"{DB_NAME}_scratch_{os.getpid()}"
+    admin = open_dedicated_connection(database=None, autocommit=True)
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE `{name}` CHARACTER SET utf8mb4")
+            for table in copy_tables:
+                cursor.execute(f"CREATE TABLE `{name}`.`{table}` LIKE `{DB_NAME}`.`{table}`")
+        with pool_override(create_pool(database=name)):
+            yield name
+    finally:
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+        admin.close()
+
+def clear_scratch_tables():
+    """Empty every table of the current (scratch) database"""
+    from db_pool import get_db_connection
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SHOW TABLES")
+        tables = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for table in tables:
+            cursor.execute(f"DELETE FROM `{table}`")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        conn.commit()
+
+BENCHMARKS = {
+    "extract_pymupdf": bench_extract_pymupdf,
+    "extract_pdfplumber": bench_extract_pdfplumber,
+    "parse_name": bench_parse_name,
+    "match_images": bench_match_images,
+    "store_images": bench_store_images,
+    "save_records": bench_save_records,
+}
+
+# Benchmarks that need a MySQL server (they write to a scratch database)
+DATABASE_BENCHMARKS = {"save_records"}
+
+def run_benchmark(name, pages, bookings_per_page, repeat):
+    """Run one benchmark and return its result dict (called in a fresh process)"""
+    with tempfile.TemporaryDirectory() as workdir:
+        timings, items = BENCHMARKS[name](workdir, pages, bookings_per_page, repeat)
+    best = min(timings)
+    return {
+        "items": items,
+        "repeat": repeat,
+        "best_seconds": round(best, 6),
+        "median_seconds": round(statistics.median(timings), 6),
+        "items_per_sec": round(items / best, 1) if best > 0 else None,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+def git_revision():
+    """Short commit hash of the working tree, if available"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the GJ MugShots pipeline on synthetic blotters")
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run (default: all except "
+                        f"{', '.join(sorted(DATABASE_BENCHMARKS))}); choices: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per synthetic blotter")
+    parser.add_argument("--bookings-per-page", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (best is reported)")
+    parser.add_argument("--database", action="store_true",
+                        help="Also run the database benchmarks (in a scratch database that is dropped afterwards)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = args.benchmarks or [n for n in BENCHMARKS if n not in DATABASE_BENCHMARKS]
+    if args.database:
+        names += [n for n in DATABASE_BENCHMARKS if n not in names]
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pages": args.pages,
+        "bookings_per_page": args.bookings_per_page,
+        "results": {},
+    }
+    # Each benchmark gets its own interpreter so peak RSS is not inherited
+    context = multiprocessing.get_context("spawn")
+    failed = False
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_benchmark, name, args.pages, args.bookings_per_page, args.repeat).result()
+        except Exception as e:
+            print(f"✗ {name} failed: {e}", file=sys.stderr)
+            result = {"error": str(e)}
+            failed = True
+        report["results"][name] = result
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"✓ Wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+PDF backend parity check for GJ MugShots
+Runs every archived PDF through both extraction backends (pdfplumber and
+PyMuPDF) and reports any record that differs between them
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+from gj_mugshots_core import ARCHIVE_DIR, extract_records_from_pdf
+
+RECORD_FIELDS = ['name', 'booked', 'dob', 'gender', 'brought', 'address', 'charges']
+
+def image_key(ref):
+    """Where a record's photo was found: (page, clip rectangle), or (page, xref) for an unplaced image
+
+    Compares what the parse matched, not how the photo would be rendered.
+    """
+    if not ref:
+        return None
+    if ref.get("fallback"):
+        return (ref["page"], "xref", ref["xref"])
+    return (ref["page"], tuple(ref["rect"]))
+
+def record_key(record, image_ref):
+    """Comparable view of one extracted record (lazy image reference included)"""
+    values = tuple(
+        tuple(record.get(field) or []) if field == 'charges' else (record.get(field) or "").strip()
+        for field in RECORD_FIELDS
+    )
+    return values + (image_key(image_ref),)
+
+def compare_pdf(pdf_path):
+    """Extract a PDF with both backends and return (differences, timings)"""
+    results = {}
+    timings = {}
+    for backend in ('pdfplumber', 'pymupdf'):
+        start = time.perf_counter()
+        records = extract_records_from_pdf(pdf_path, backend, lazy_images=True)
+        timings[backend] = time.perf_counter() - start
+        results[backend] = [record_key(rec, ref) for rec, ref in records]
+
+    differences = []
+    expected, actual = results['pdfplumber'], results['pymupdf']
+    if len(expected) != len(actual):
+        differences.append(f"record count {len(expected)} (pdfplumber) != {len(actual)} (pymupdf)")
+    for i, (old, new) in enumerate(zip(expected, actual)):
+        for field, a, b in zip(RECORD_FIELDS + ['image'], old, new):
+            if a != b:
+                differences.append(f"record {i} {field}: {a!r} != {b!r}")
+    return differences, timings
+
+def main():
+    """Diff both backends over every PDF in the archive directory"""
+    directory = sys.argv[1] if len(sys.argv) > 1 else ARCHIVE_DIR
+    print("=== GJ MugShots PDF Backend Parity ===")
+    print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    if not os.path.isdir(directory):
+        print(f"Missing {directory} directory")
+        return 1
+
+    files = sorted(f for f in os.listdir(directory) if f.lower().endswith('.pdf'))
+    if not files:
+        print(f"No PDFs in {directory}")
+        return 0
+
+    mismatched_files = 0
+    totals = {'pdfplumber': 0.0, 'pymupdf': 0.0}
+    for f in files:
+        try:
+            differences, timings = compare_pdf(os.path.join(directory, f))
+        except Exception as e:
+            print(f"FAILED {f}: {e}")
+            mismatched_files += 1
+            continue
+        for backend, seconds in timings.items():
+            totals[backend] += seconds
+        if differences:
+            mismatched_files += 1
+            print(f"✗ {f}: {len(differences)} differences")
+            for diff in differences:
+                print(f"    {diff}")
+        else:
+            print(f"✓ {f} ({timings['pdfplumber']:.2f}s vs {timings['pymupdf']:.2f}s)")
+
+    print("\n=== Parity Complete ===")
+    print(f"Files checked: {len(files)}")
+    print(f"Files with differences: {mismatched_files}")
+    print(f"pdfplumber total: {totals['pdfplumber']:.2f}s")
+    print(f"pymupdf total: {totals['pymupdf']:.2f}s")
+    if totals['pymupdf'] > 0:
+        print(f"Speedup: {totals['pdfplumber'] / totals['pymupdf']:.1f}x")
+    return 1 if mismatched_files else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
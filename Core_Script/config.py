@@ -7,6 +7,20 @@ DB_NAME = os.getenv('DB_NAME', 'bookings')
 DB_USER = os.getenv('DB_USER', 'root')
 DB_PASSWORD = os.getenv('DB_PASSWORD', 'Techandtime@25!!')
 
+# Connection pool shared by all scripts (see db_pool.py)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_POOL_IDLE_RECYCLE = int(os.getenv('DB_POOL_IDLE_RECYCLE', 300))  # seconds
+DB_POOL_CHECKOUT_TIMEOUT = int(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', 30))  # seconds
+
+# Run instrumentation (see run_metrics.py); an empty path disables that output
+METRICS_REPORT_FILE = os.getenv('METRICS_REPORT_FILE', 'run_report.json')
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE', '')  # e.g. node_exporter textfile collector dir
+
+# Watch mode (gj_mugshots_core.py --watch): seconds between listing polls, and
+# the longest one poll-and-ingest cycle may run before systemd's watchdog fires
+WATCH_POLL_INTERVAL = int(os.getenv('WATCH_POLL_INTERVAL', 300))  # seconds
+WATCH_CYCLE_TIMEOUT = int(os.getenv('WATCH_CYCLE_TIMEOUT', 1800))  # seconds
+
 # File paths
 SRC = "new"
 DST = "archive"
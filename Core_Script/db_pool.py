@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+GJ MugShots database connection pool
+Thread-safe pymysql pool shared by the core pipeline, the Discord sender and
+the maintenance scripts: capped size, ping on checkout, recycling of idle
+connections and per-checkout timing stats
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+import pymysql
+from config import (DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD,
+                    DB_POOL_SIZE, DB_POOL_IDLE_RECYCLE, DB_POOL_CHECKOUT_TIMEOUT)
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+class ConnectionPool:
+    """Fixed-size pool of pymysql connections"""
+
+    def __init__(self, max_size=DB_POOL_SIZE, idle_recycle=DB_POOL_IDLE_RECYCLE,
+                 checkout_timeout=DB_POOL_CHECKOUT_TIMEOUT, **connect_kwargs):
+        self.max_size = max_size
+        self.idle_recycle = idle_recycle
+        self.checkout_timeout = checkout_timeout
+        self.connect_kwargs = connect_kwargs
+        self._idle = []  # (connection, returned_at)
+        self._in_use = 0
+        self._lock = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "broken": 0,
+            "wait_seconds": 0.0,
+            "held_seconds": 0.0,
+            "max_held_seconds": 0.0,
+        }
+
+    def _connect(self):
+        conn = pymysql.connect(**self.connect_kwargs)
+        with self._lock:
+            self._stats["created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _acquire(self):
+        """Take an idle connection, or a slot to open a new one"""
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._lock:
+            while not self._idle and self._in_use >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection available after {self.checkout_timeout}s")
+                self._lock.wait(remaining)
+            self._in_use += 1
+            if self._idle:
+                # Most recently returned first: warmest socket
+                return self._idle.pop()
+            return None, None
+
+    def _release(self, conn):
+        with self._lock:
+            self._in_use -= 1
+            if conn is not None:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    def _checkout(self):
+        conn, returned_at = self._acquire()
+        try:
+            if conn is not None and time.monotonic() - returned_at > self.idle_recycle:
+                self._discard(conn)
+                conn = None
+                with self._lock:
+                    self._stats["recycled"] += 1
+            if conn is not None:
+                try:
+                    conn.ping(reconnect=False)
+                except Exception:
+                    self._discard(conn)
+                    conn = None
+                    with self._lock:
+                        self._stats["broken"] += 1
+            if conn is None:
+                conn = self._connect()
+            return conn
+        except Exception:
+            self._release(None)
+            raise
+
+    @contextmanager
+    def connection(self):
+        """Check out a live connection; it is returned to the pool afterwards
+
+        Uncommitted work is rolled back on return. If the block raises, the
+        connection is closed instead of being reused.
+        """
+        start = time.monotonic()
+        conn = self._checkout()
+        checked_out = time.monotonic()
+        try:
+            yield conn
+        except Exception:
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    self._discard(conn)
+                    conn = None
+            held = time.monotonic() - checked_out
+            with self._lock:
+                self._stats["checkouts"] += 1
+                self._stats["wait_seconds"] += checked_out - start
+                self._stats["held_seconds"] += held
+                self._stats["max_held_seconds"] = max(self._stats["max_held_seconds"], held)
+            self._release(conn)
+
+    def stats(self):
+        """Snapshot of pool counters and checkout timings"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._in_use
+        return stats
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def _connect_kwargs(**overrides):
+    kwargs = dict(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        charset='utf8mb4',
+        autocommit=False
+    )
+    kwargs.update(overrides)
+    return kwargs
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use
+
+    A forked worker (extract_pdf_job) gets a pool of its own; the inherited
+    one is dropped without closing, as its sockets belong to the parent.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(**_connect_kwargs())
+            _pool_pid = os.getpid()
+        return _pool
+
+def create_pool(database=DB_NAME):
+    """A new pool of connections to database on the configured server"""
+    return ConnectionPool(**_connect_kwargs(database=database))
+
+@contextmanager
+def pool_override(pool):
+    """Serve get_db_connection() from pool inside the block, in this process
+
+    The process-wide pool is set aside, not closed, and restored afterwards;
+    pool's idle connections are closed on exit.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        previous = (_pool, _pool_pid)
+        _pool, _pool_pid = pool, os.getpid()
+    try:
+        yield pool
+    finally:
+        with _pool_lock:
+            _pool, _pool_pid = previous
+        pool.close_all()
+
+def open_dedicated_connection(**overrides):
+    """Open an unpooled connection with extra pymysql options (e.g. local_infile)
+
+    For long bulk jobs whose session state (temporary tables, flags) must not
+    leak back into the pool. The caller closes it.
+    """
+    return pymysql.connect(**_connect_kwargs(**overrides))
+
+@contextmanager
+def get_db_connection():
+    """Context manager for a pooled database connection"""
+    with get_pool().connection() as conn:
+        yield conn
+
+def print_pool_stats():
+    """Print checkout statistics for this process"""
+    if _pool is None or _pool_pid != os.getpid():
+        return
+    stats = _pool.stats()
+    if not stats["checkouts"]:
+        return
+    print(f"DB pool: {stats['checkouts']} checkouts, {stats['created']} connections opened, "
+          f"{stats['recycled']} recycled, {stats['broken']} broken, "
+          f"avg wait {stats['wait_seconds'] / stats['checkouts'] * 1000:.1f}ms, "
+          f"avg held {stats['held_seconds'] / stats['checkouts'] * 1000:.1f}ms, "
+          f"max held {stats['max_held_seconds']:.2f}s")
+
+def close_pool():
+    """Close all pooled connections"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and _pool_pid == os.getpid():
+        pool.close_all()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+GJ MugShots file helpers
+Atomic file writes shared by the ingest pipeline (listing cache, image
+store) and the run metrics (JSON report, Prometheus textfile)
+"""
+
+import os
+import tempfile
+
+def write_file_atomic(filepath, data):
+    """Write bytes or text to filepath via a temp file and rename
+
+    Readers such as scrapers never see a partial file; the hidden temp file
+    sits next to the target so the rename stays on one filesystem.
+    """
+    mode = 'w' if isinstance(data, str) else 'wb'
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or '.', prefix='.', suffix='.part')
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+        # mkstemp creates 0600 files; keep them readable like a plain open() would
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filepath)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
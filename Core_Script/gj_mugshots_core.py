@@ -8,21 +8,65 @@ import os
 import io
 import re
 import time
+import json
+import hashlib
+import shutil
+import signal
+import socket
+import argparse
+import threading
+import itertools
 import requests
-import pymysql
+from email.utils import formatdate
 import fitz
 import pdfplumber
 from PIL import Image
-from datetime import datetime
-from config import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
-from contextlib import contextmanager
+from datetime import datetime, timedelta
+from collections import deque
+from db_pool import get_db_connection, get_pool, print_pool_stats, close_pool
+from fileio import write_file_atomic
+from run_metrics import metrics, Profiler, build_report, write_run_report, print_stage_summary
+from search_index import sync_search_index, rebuild_search_index
+from stats_rollup import refresh_daily_stats, rebuild_daily_stats
+from persons import assign_persons, refresh_person_counts, recluster_persons
+from image_index import (dhash_files, link_near_duplicates, link_all_images,
+                         unreferenced_linked_images, find_similar_images)
+from records import NO_CHARGES, parse_name, format_display_name, parse_dob, age_on, split_charges
+from config import METRICS_REPORT_FILE, METRICS_TEXTFILE, WATCH_POLL_INTERVAL, WATCH_CYCLE_TIMEOUT
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 # Configuration
 BASE_URL = "https://apps.mesacounty.us/so-blotter-reports/"
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
 SRC_DIR = "new"
 ARCHIVE_DIR = "archive"
+# Archived PDFs replaced by a re-issue for the same blotter date; kept out of
+# archive/ so reparse.py and backfill.py never load their rows again
+SUPERSEDED_DIR = os.path.join(ARCHIVE_DIR, "superseded")
 IMAGES_DIR = "images"
+LISTING_CACHE_FILE = "listing_cache.json"
+
+# Download politeness: concurrent connections and a token bucket of requests/second
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_RATE = 2.0
+DOWNLOAD_BURST = 2
+# Archived PDFs dated within this many days are re-fetched with a conditional
+# GET on every run, so a corrected re-issue under the same name is picked up
+REISSUE_CHECK_DAYS = 3
+
+# Mugshots are rasterized at 2x the PDF's point size
+RENDER_ZOOM = 2
+# Points by which pdfplumber and PyMuPDF may disagree on the bbox of one image
+IMAGE_BBOX_TOLERANCE = 0.5
+
+# Stored image derivatives: WebP master plus a thumbnail, encoded on a thread pool
+IMAGE_WEBP_QUALITY = 85
+THUMBNAIL_SIZE = (160, 200)
+IMAGE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Bump whenever parsing rules change; run reparse.py to re-parse the archived
+# PDFs ingested by an older version
+PARSER_VERSION = 1
 
 # Regex pattern for parsing jail records - gender is now optional
 # Pattern 1: With gender (most common)
@@ -40,49 +84,272 @@ NAME_ROW_PATTERN_NO_GENDER = re.compile(
 # Keep old name for backwards compatibility
 NAME_ROW_PATTERN = NAME_ROW_PATTERN_WITH_GENDER
 
-# Database connection pool (simple implementation)
-_db_connection = None
+# Line classes produced by classify_lines (bit flags, one byte per line)
+LINE_OTHER = 0
+LINE_BOOKING = 1
+LINE_CHARGE = 2
+LINE_HOLD = 4
+LINE_ADDRESS = 8
+
+# Insert keyed on the bookings natural key (raw_name, booking_date, booking_time, source_pdf)
+BOOKING_COLUMNS = ("raw_name", "first_name", "middle_name", "last_name", "address", "booking_date",
+                   "booking_time", "date_of_birth", "gender", "raw_arrestor", "charges", "source_pdf",
+                   "image_path", "thumbnail_path", "display_name", "dob_date", "age_at_booking")
+# Shared by the row upsert and the bulk staging merge (backfill.py); target
+# columns are qualified so INSERT ... SELECT from a same-shaped table is unambiguous
+BOOKING_UPSERT_UPDATE = f'''
+    ON DUPLICATE KEY UPDATE
+        bookings.charges = IF(
+            VALUES(charges) <> '{NO_CHARGES}'
+            AND (bookings.charges IS NULL OR bookings.charges = '' OR bookings.charges = '{NO_CHARGES}'
+                 OR CHAR_LENGTH(VALUES(charges)) > CHAR_LENGTH(bookings.charges)),
+            VALUES(charges), bookings.charges),
+        bookings.image_path = COALESCE(bookings.image_path, VALUES(image_path)),
+        bookings.thumbnail_path = COALESCE(bookings.thumbnail_path, VALUES(thumbnail_path)),
+        bookings.display_name = COALESCE(bookings.display_name, VALUES(display_name)),
+        bookings.dob_date = COALESCE(bookings.dob_date, VALUES(dob_date)),
+        bookings.age_at_booking = COALESCE(bookings.age_at_booking, VALUES(age_at_booking))
+'''
+BOOKING_UPSERT_SQL = f'''
+    INSERT INTO bookings ({", ".join(BOOKING_COLUMNS)})
+    VALUES ({", ".join(["%s"] * len(BOOKING_COLUMNS))})
+''' + BOOKING_UPSERT_UPDATE
+
+# Indexes on bookings for frequently queried columns; all but
+# PERMANENT_INDEXES may be dropped around a bulk load
+BOOKING_INDEXES = [
+    ("idx_bookings_raw_name", "CREATE INDEX idx_bookings_raw_name ON bookings(raw_name)"),
+    ("idx_bookings_booking_date", "CREATE INDEX idx_bookings_booking_date ON bookings(booking_date)"),
+    ("idx_bookings_booking_time", "CREATE INDEX idx_bookings_booking_time ON bookings(booking_time)"),
+    ("idx_bookings_source_pdf", "CREATE INDEX idx_bookings_source_pdf ON bookings(source_pdf)"),
+    ("idx_bookings_last_name", "CREATE INDEX idx_bookings_last_name ON bookings(last_name)"),
+    ("idx_bookings_first_name", "CREATE INDEX idx_bookings_first_name ON bookings(first_name)"),
+    ("idx_bookings_dob_date", "CREATE INDEX idx_bookings_dob_date ON bookings(dob_date)"),
+    ("idx_bookings_age_at_booking", "CREATE INDEX idx_bookings_age_at_booking ON bookings(age_at_booking)"),
+    ("idx_bookings_person_id", "CREATE INDEX idx_bookings_person_id ON bookings(person_id, booking_date)"),
+    ("idx_bookings_publish_order", "CREATE INDEX idx_bookings_publish_order ON bookings(booking_date, booking_time, id)"),
+    ("uq_bookings_natural_key", "CREATE UNIQUE INDEX uq_bookings_natural_key ON bookings(raw_name, booking_date, booking_time, source_pdf)")
+]
+# Replaced by the unique natural key on the same columns; dropped once it exists
+RETIRED_INDEXES = ("idx_bookings_duplicate_check",)
+# Unique key the upserts rely on; never dropped
+NATURAL_KEY_INDEX = "uq_bookings_natural_key"
+# Kept through a bulk load: the natural key, and the indexes the post-write
+# rollup and person refreshes look bookings up by
+PERMANENT_INDEXES = (NATURAL_KEY_INDEX, "idx_bookings_booking_date", "idx_bookings_person_id")
+
+# Booking keys per query when looking up already stored photos
+EXISTING_IMAGE_LOOKUP_CHUNK = 500
+
+# Charge lines: "State <statute> <description>"; holds are stored as HOLD_CHARGE
+CHARGE_PATTERN = re.compile(r'^State\s+(?P<statute>\d\S*)\s*(?P<description>.*)$')
+HOLD_CHARGE = "MARSHAL HOLD"
+CHARGE_DESCRIPTION_MAX = 255
+
+# Bookings per page when rebuilding derived columns and booking_charges
+DERIVED_REBUILD_PAGE = 1000
+
+# Maximum vertical distance (PDF points) between a booking row and its photo
+IMAGE_MATCH_MAX_DISTANCE = 200
+
+# Shared HTTP session for the listing page and PDF downloads
+_http_session = None
+
+# Set by SIGTERM/SIGINT in watch mode; the current PDF is finished before exiting
+_stop_requested = threading.Event()
 
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections with connection reuse"""
-    global _db_connection
+# Bytes written by the image optimization stage during this run
+image_stats = {"written": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+def ensure_database_tables():
+    """Create the auxiliary tables maintained by the core pipeline"""
     try:
-        if _db_connection is None or not _db_connection.open:
-            _db_connection = pymysql.connect(
-                host=DB_HOST,
-                port=DB_PORT,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                database=DB_NAME,
-                charset='utf8mb4',
-                autocommit=False
-            )
-        yield _db_connection
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            tables = [
+                ("booking_images", '''
+                    CREATE TABLE IF NOT EXISTS booking_images (
+                        booking_id INT NOT NULL PRIMARY KEY,
+                        image_hash CHAR(64) NOT NULL,
+                        KEY idx_booking_images_hash (image_hash)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''),
+                ("ingested_pdfs", '''
+                    CREATE TABLE IF NOT EXISTS ingested_pdfs (
+                        filename VARCHAR(255) NOT NULL PRIMARY KEY,
+                        sha256 CHAR(64) NOT NULL,
+                        page_count INT NOT NULL DEFAULT 0,
+                        record_count INT NOT NULL DEFAULT 0,
+                        parse_seconds FLOAT NOT NULL DEFAULT 0,
+                        parser_version INT NOT NULL,
+                        ingested_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        KEY idx_ingested_pdfs_sha256 (sha256, parser_version)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''),
+                ("booking_charges", '''
+                    CREATE TABLE IF NOT EXISTS booking_charges (
+                        booking_id INT NOT NULL,
+                        position SMALLINT UNSIGNED NOT NULL,
+                        statute VARCHAR(64) NULL,
+                        description VARCHAR(255) NOT NULL,
+                        is_hold TINYINT(1) NOT NULL DEFAULT 0,
+                        PRIMARY KEY (booking_id, position),
+                        KEY idx_booking_charges_statute (statute),
+                        KEY idx_booking_charges_description (description),
+                        KEY idx_booking_charges_hold (is_hold)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''),
+                # Search index maintained by search_index.py: normalized trigrams
+                # per field, and Soundex/Metaphone keys per name word
+                ("booking_search_grams", '''
+                    CREATE TABLE IF NOT EXISTS booking_search_grams (
+                        gram CHAR(3) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+                        field CHAR(1) CHARACTER SET ascii NOT NULL,
+                        booking_id INT NOT NULL,
+                        PRIMARY KEY (gram, field, booking_id),
+                        KEY idx_booking_search_grams_booking (booking_id)
+                    ) ENGINE=InnoDB
+                '''),
+                ("booking_name_keys", '''
+                    CREATE TABLE IF NOT EXISTS booking_name_keys (
+                        booking_id INT NOT NULL,
+                        name_part CHAR(1) CHARACTER SET ascii NOT NULL,
+                        position TINYINT UNSIGNED NOT NULL,
+                        soundex CHAR(4) CHARACTER SET ascii NOT NULL,
+                        metaphone VARCHAR(16) CHARACTER SET ascii NOT NULL,
+                        PRIMARY KEY (booking_id, name_part, position),
+                        KEY idx_booking_name_keys_soundex (soundex, name_part),
+                        KEY idx_booking_name_keys_metaphone (metaphone, name_part)
+                    ) ENGINE=InnoDB
+                '''),
+                # Perceptual hashes of stored photos (image_index.py), split into
+                # indexed bands for near-duplicate lookups
+                ("image_phashes", '''
+                    CREATE TABLE IF NOT EXISTS image_phashes (
+                        image_hash CHAR(64) NOT NULL PRIMARY KEY,
+                        dhash BIGINT UNSIGNED NOT NULL,
+                        band0 SMALLINT UNSIGNED NOT NULL,
+                        band1 SMALLINT UNSIGNED NOT NULL,
+                        band2 SMALLINT UNSIGNED NOT NULL,
+                        band3 SMALLINT UNSIGNED NOT NULL,
+                        canonical_hash CHAR(64) NULL,
+                        KEY idx_image_phashes_band0 (band0),
+                        KEY idx_image_phashes_band1 (band1),
+                        KEY idx_image_phashes_band2 (band2),
+                        KEY idx_image_phashes_band3 (band3),
+                        KEY idx_image_phashes_canonical (canonical_hash)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''),
+                # One row per resolved person (persons.py); bookings.person_id points here
+                ("persons", '''
+                    CREATE TABLE IF NOT EXISTS persons (
+                        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                        identity_key VARCHAR(255) CHARACTER SET ascii NOT NULL,
+                        name_key VARCHAR(255) CHARACTER SET ascii NULL,
+                        display_name VARCHAR(255) NULL,
+                        dob_date DATE NULL,
+                        booking_count INT NOT NULL DEFAULT 0,
+                        first_booking_date DATE NULL,
+                        last_booking_date DATE NULL,
+                        UNIQUE KEY uq_persons_identity (identity_key),
+                        KEY idx_persons_name_key (name_key, dob_date),
+                        KEY idx_persons_booking_count (booking_count, last_booking_date)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''),
+                # Per-day statistics rollups maintained by stats_rollup.py
+                ("stats_daily", '''
+                    CREATE TABLE IF NOT EXISTS stats_daily (
+                        booking_date DATE NOT NULL PRIMARY KEY,
+                        bookings INT NOT NULL,
+                        with_image INT NOT NULL,
+                        charges INT NOT NULL,
+                        holds INT NOT NULL
+                    ) ENGINE=InnoDB
+                '''),
+                ("stats_daily_charges", '''
+                    CREATE TABLE IF NOT EXISTS stats_daily_charges (
+                        booking_date DATE NOT NULL,
+                        description VARCHAR(255) NOT NULL,
+                        statute VARCHAR(64) NULL,
+                        charges INT NOT NULL,
+                        bookings INT NOT NULL,
+                        PRIMARY KEY (booking_date, description)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''),
+                ("stats_daily_arrestors", '''
+                    CREATE TABLE IF NOT EXISTS stats_daily_arrestors (
+                        booking_date DATE NOT NULL,
+                        arrestor VARCHAR(255) NOT NULL,
+                        bookings INT NOT NULL,
+                        PRIMARY KEY (booking_date, arrestor)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''),
+                ("stats_daily_demographics", '''
+                    CREATE TABLE IF NOT EXISTS stats_daily_demographics (
+                        booking_date DATE NOT NULL,
+                        gender VARCHAR(32) NOT NULL,
+                        age_band VARCHAR(16) NOT NULL,
+                        bookings INT NOT NULL,
+                        PRIMARY KEY (booking_date, gender, age_band)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''),
+            ]
+            
+            for table_name, table_sql in tables:
+                try:
+                    cursor.execute(table_sql)
+                except Exception as e:
+                    print(f"Table creation warning for {table_name}: {e}")
+            
+            # Columns added to bookings by the core pipeline
+            columns = [
+                ("thumbnail_path", "ALTER TABLE bookings ADD COLUMN thumbnail_path VARCHAR(255) NULL AFTER image_path"),
+                ("display_name", "ALTER TABLE bookings ADD COLUMN display_name VARCHAR(255) NULL AFTER raw_name"),
+                ("dob_date", "ALTER TABLE bookings ADD COLUMN dob_date DATE NULL AFTER date_of_birth"),
+                ("age_at_booking", "ALTER TABLE bookings ADD COLUMN age_at_booking SMALLINT NULL AFTER dob_date"),
+                ("person_id", "ALTER TABLE bookings ADD COLUMN person_id INT NULL AFTER id"),
+            ]
+            
+            for column_name, column_sql in columns:
+                try:
+                    cursor.execute(column_sql)
+                    print(f"Added column: bookings.{column_name}")
+                except Exception as e:
+                    # Column might already exist, which is fine
+                    if "Duplicate column name" not in str(e):
+                        print(f"Column creation warning for {column_name}: {e}")
+            
+            # Name blocks of persons created before persons.name_key existed
+            try:
+                cursor.execute("ALTER TABLE persons ADD COLUMN name_key VARCHAR(255) CHARACTER SET ascii NULL "
+                               "AFTER identity_key, ADD KEY idx_persons_name_key (name_key, dob_date)")
+                print("Added column: persons.name_key")
+            except Exception as e:
+                if "Duplicate column name" not in str(e):
+                    print(f"Column creation warning for persons.name_key: {e}")
+            cursor.execute("UPDATE persons SET name_key = SUBSTRING_INDEX(identity_key, '|', 2) WHERE name_key IS NULL")
+            
+            conn.commit()
+            print("Database tables ensured")
+            
     except Exception as e:
-        if _db_connection:
-            _db_connection.close()
-            _db_connection = None
-        raise e
+        print(f"Error creating database tables: {e}")
 
 def ensure_database_indexes():
-    """Create database indexes for better query performance"""
+    """Create database indexes for better query performance
+
+    Raises RuntimeError when duplicate bookings block the unique natural
+    key: the upserts would insert copies without it, and the duplicates are
+    left for remove_duplicates.py to review and remove rather than deleted
+    here.
+    """
+    blocked = None
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Create indexes for frequently queried columns
-            indexes = [
-                ("idx_bookings_raw_name", "CREATE INDEX idx_bookings_raw_name ON bookings(raw_name)"),
-                ("idx_bookings_booking_date", "CREATE INDEX idx_bookings_booking_date ON bookings(booking_date)"),
-                ("idx_bookings_booking_time", "CREATE INDEX idx_bookings_booking_time ON bookings(booking_time)"),
-                ("idx_bookings_source_pdf", "CREATE INDEX idx_bookings_source_pdf ON bookings(source_pdf)"),
-                ("idx_bookings_duplicate_check", "CREATE INDEX idx_bookings_duplicate_check ON bookings(raw_name, booking_date, booking_time, source_pdf)"),
-                ("idx_bookings_last_name", "CREATE INDEX idx_bookings_last_name ON bookings(last_name)"),
-                ("idx_bookings_first_name", "CREATE INDEX idx_bookings_first_name ON bookings(first_name)")
-            ]
-            
-            for index_name, index_sql in indexes:
+            for index_name, index_sql in BOOKING_INDEXES:
                 try:
                     cursor.execute(index_sql)
                     print(f"Created index: {index_name}")
@@ -90,48 +357,187 @@ def ensure_database_indexes():
                     # Index might already exist, which is fine
                     if "Duplicate key name" in str(e) or "already exists" in str(e):
                         print(f"Index {index_name} already exists")
+                    elif "Duplicate entry" in str(e):
+                        # Existing duplicates block the unique key; never delete them unattended
+                        print(f"✗ Duplicate rows block {index_name}: {e}")
+                        blocked = index_name
                     else:
                         print(f"Index creation warning for {index_name}: {e}")
             
+            # While duplicates block the unique key, the old index still serves its lookups
+            if not blocked:
+                for index_name in RETIRED_INDEXES:
+                    try:
+                        cursor.execute(f"DROP INDEX {index_name} ON bookings")
+                        print(f"Dropped retired index: {index_name}")
+                    except Exception as e:
+                        if "check that" not in str(e):
+                            print(f"Index drop warning for {index_name}: {e}")
+            
             conn.commit()
             print("Database indexes ensured")
             
     except Exception as e:
         print(f"Error creating database indexes: {e}")
+    
+    if blocked:
+        print("Review the duplicates with:  python3 remove_duplicates.py --dry-run")
+        print("Then remove them with:       python3 remove_duplicates.py")
+        raise RuntimeError(f"{blocked} cannot be created while duplicate bookings exist")
 
 def ensure_directories():
     """Create necessary directories"""
-    for directory in [SRC_DIR, ARCHIVE_DIR, IMAGES_DIR]:
+    for directory in [SRC_DIR, ARCHIVE_DIR, SUPERSEDED_DIR, IMAGES_DIR]:
         if not os.path.exists(directory):
             os.makedirs(directory)
             print(f"Created directory: {directory}")
 
-def gather_new_pdfs():
-    """Download new PDFs from Mesa County website"""
+class TokenBucket:
+    """Thread-safe token bucket used to pace requests to the county server"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def get_http_session():
+    """Shared requests Session so downloads reuse pooled keep-alive connections"""
+    global _http_session
+    if _http_session is None:
+        _http_session = requests.Session()
+        _http_session.headers.update({'User-Agent': USER_AGENT})
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=DOWNLOAD_WORKERS)
+        _http_session.mount('https://', adapter)
+        _http_session.mount('http://', adapter)
+    return _http_session
+
+def load_listing_cache():
+    """Load the cached ETag/Last-Modified and body of the blotter listing page"""
+    try:
+        with open(LISTING_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Error loading listing cache: {e}")
+        return {}
+
+def fetch_listing_page(session):
+    """Fetch the blotter listing with a conditional GET
+
+    Returns the page HTML. An unchanged listing costs a single 304 and the
+    cached body is reused so links that failed to download last time are
+    still retried.
+    """
+    cache = load_listing_cache()
+    headers = {}
+    if cache.get('body') is not None:
+        if cache.get('etag'):
+            headers['If-None-Match'] = cache['etag']
+        if cache.get('last_modified'):
+            headers['If-Modified-Since'] = cache['last_modified']
+    
+    with metrics.stage("listing_fetch"):
+        response = session.get(BASE_URL, headers=headers, timeout=30)
+    if response.status_code == 304:
+        print("Listing page unchanged (304)")
+        metrics.incr("listing_not_modified")
+        return cache['body']
+    response.raise_for_status()
+    
+    cache = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'body': response.text,
+    }
+    try:
+        write_file_atomic(LISTING_CACHE_FILE, json.dumps(cache))
+    except Exception as e:
+        print(f"Error saving listing cache: {e}")
+    return response.text
+
+def download_pdf(session, bucket, url, filename, archived_path=None):
+    """Download one PDF into the new directory, writing atomically
+
+    With archived_path (a re-check of a PDF already archived under this
+    name) the request is conditional on the archived copy's mtime, and a
+    download byte-identical to it is discarded. Returns filename, or None
+    when the PDF was unchanged.
+    """
+    with metrics.stage("download_wait"):
+        bucket.acquire()
+    headers = {}
+    if archived_path:
+        headers['If-Modified-Since'] = formatdate(os.path.getmtime(archived_path), usegmt=True)
+    else:
+        print(f"Downloading: {filename}")
+    filepath = os.path.join(SRC_DIR, filename)
+    tmp_path = f"{filepath}.part"
+    try:
+        with metrics.stage("download"), session.get(url, headers=headers, timeout=60, stream=True) as response:
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    if chunk:
+                        f.write(chunk)
+                        metrics.incr("download_bytes", len(chunk))
+        if archived_path and file_sha256(tmp_path) == file_sha256(archived_path):
+            os.remove(tmp_path)
+            return None
+        os.replace(tmp_path, filepath)
+        if archived_path:
+            print(f"Re-issued under the same name: {filename}")
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filename
+
+def gather_new_pdfs(verbose=True):
+    """Download new PDFs from Mesa County website
+
+    Files already in new/ or superseded are skipped. Archived ones dated
+    within REISSUE_CHECK_DAYS are re-fetched conditionally and downloaded
+    again only when their bytes changed; process_pdf_files then replaces
+    their bookings. Others already archived are skipped.
+    """
     print("=== Gathering New PDFs ===")
     
     try:
-        headers = {'User-Agent': USER_AGENT}
-        response = requests.get(BASE_URL, headers=headers, timeout=30)
-        response.raise_for_status()
+        session = get_http_session()
+        content = fetch_listing_page(session)
         
-        # Get existing files to avoid duplicates
+        # Get existing files to avoid duplicates. Files under a new name for an
+        # already seen date are still fetched; byte-identical copies are then
+        # skipped by the ingestion manifest.
         existing_files = set()
-        existing_dates = set()
         
-        for folder in [SRC_DIR, ARCHIVE_DIR]:
+        for folder in [SRC_DIR, ARCHIVE_DIR, SUPERSEDED_DIR]:
             if os.path.exists(folder):
                 for file in os.listdir(folder):
                     if file.lower().endswith('.pdf'):
                         existing_files.add(file)
-                        # Extract date from filename for comparison
-                        date_match = re.search(r'(\d{4}-\d{2}-\d{2})', file)
-                        if date_match:
-                            existing_dates.add(date_match.group(1))
+        recheck_after = datetime.now() - timedelta(days=REISSUE_CHECK_DAYS)
         
         # Find all PDF links using multiple patterns
         pdf_links = []
-        content = response.text
         
         # Pattern 1: Look for any PDF links with href
         pdf_pattern = r'href=["\']([^"\']*\.pdf[^"\']*)["\']'
@@ -164,41 +570,48 @@ def gather_new_pdfs():
         downloaded_count = 0
         skipped_count = 0
         
+        to_download = []
+        rechecked = set()
         for url, filename in pdf_links:
+            archived_path = os.path.join(ARCHIVE_DIR, filename)
+            if (filename not in rechecked and extract_date_from_filename(filename) >= recheck_after
+                    and os.path.exists(archived_path) and not os.path.exists(os.path.join(SRC_DIR, filename))):
+                # Recent and archived: may have been re-issued under the same name
+                rechecked.add(filename)
+                to_download.append((url, filename, archived_path))
+                continue
             # Skip if we already have this exact file
             if filename in existing_files:
-                print(f"Skipping existing file: {filename}")
+                if verbose:
+                    print(f"Skipping existing file: {filename}")
                 skipped_count += 1
                 continue
             
-            # Skip if we already have a file for this date (even with different number)
-            date_match = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
-            if date_match:
-                file_date = date_match.group(1)
-                if file_date in existing_dates:
-                    print(f"Skipping {filename} (date {file_date} already exists)")
-                    skipped_count += 1
-                    continue
-            
-            # Download the PDF
-            try:
-                print(f"Downloading: {filename}")
-                response = requests.get(url, headers=headers, timeout=60, stream=True)
-                response.raise_for_status()
-                
-                filepath = os.path.join(SRC_DIR, filename)
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                
-                print(f"✓ Downloaded: {filename}")
-                downloaded_count += 1
-                time.sleep(1)  # Be respectful to server
-                
-            except Exception as e:
-                print(f"✗ Failed to download {filename}: {e}")
-                skipped_count += 1
+            to_download.append((url, filename, None))
+            existing_files.add(filename)
+        
+        # Download the PDFs concurrently, paced by the token bucket to be respectful to server
+        if to_download:
+            bucket = TokenBucket(DOWNLOAD_RATE, DOWNLOAD_BURST)
+            with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(to_download))) as executor:
+                futures = {
+                    executor.submit(download_pdf, session, bucket, url, filename, archived_path): filename
+                    for url, filename, archived_path in to_download
+                }
+                for future in as_completed(futures):
+                    filename = futures[future]
+                    try:
+                        if future.result() is None:
+                            # Archived copy still current
+                            skipped_count += 1
+                            continue
+                        print(f"✓ Downloaded: {filename}")
+                        downloaded_count += 1
+                        metrics.incr("pdfs_downloaded")
+                    except Exception as e:
+                        print(f"✗ Failed to download {filename}: {e}")
+                        skipped_count += 1
+                        metrics.incr("pdfs_download_failed")
         
         print(f"Download complete: {downloaded_count} new, {skipped_count} skipped")
         return downloaded_count
@@ -207,392 +620,1132 @@ def gather_new_pdfs():
         print(f"Error gathering PDFs: {e}")
         return 0
 
-def parse_name(full_name):
-    """Parse full name into first, middle, last name components
-    Handles format: "LAST, FIRST MIDDLE" -> first, middle, last
-    """
-    if not full_name:
-        return "", "", ""
-    
-    # Handle "LAST, FIRST MIDDLE" format
-    if ',' in full_name:
-        parts = full_name.split(',', 1)
-        if len(parts) == 2:
-            last_name = parts[0].strip()
-            first_middle_part = parts[1].strip()
-            first_middle_parts = first_middle_part.split()
-            
-            if len(first_middle_parts) == 0:
-                return "", "", last_name
-            elif len(first_middle_parts) == 1:
-                return first_middle_parts[0], "", last_name
-            else:
-                # First name, middle names, last name
-                first_name = first_middle_parts[0]
-                middle_name = " ".join(first_middle_parts[1:])
-                return first_name, middle_name, last_name
-    
-    # Fallback: treat as space-separated "FIRST MIDDLE LAST"
-    clean_name = full_name.strip()
-    name_parts = clean_name.split()
-    
-    if len(name_parts) == 1:
-        return name_parts[0], "", ""
-    elif len(name_parts) == 2:
-        return name_parts[0], "", name_parts[1]
+def parse_charge(charge):
+    """Split one charge line into (statute, description, is_hold)"""
+    m = CHARGE_PATTERN.match(charge)
+    if m:
+        statute, description = m.group('statute'), m.group('description').strip() or charge
     else:
-        # First name, middle names, last name
-        return name_parts[0], " ".join(name_parts[1:-1]), name_parts[-1]
+        statute, description = None, charge
+    is_hold = charge == HOLD_CHARGE or _is_marshal_hold(charge) or re.search(r'\bHOLD\b', charge.upper()) is not None
+    return statute, description[:CHARGE_DESCRIPTION_MAX], is_hold
+
+def sync_booking_charges(cursor, bookings):
+    """Rewrite booking_charges for [(booking_id, charges_text)] from the stored charges strings"""
+    if not bookings:
+        return
+    booking_ids = [booking_id for booking_id, _ in bookings]
+    for i in range(0, len(booking_ids), DERIVED_REBUILD_PAGE):
+        chunk = booking_ids[i:i + DERIVED_REBUILD_PAGE]
+        cursor.execute(f"DELETE FROM booking_charges WHERE booking_id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+    rows = [
+        (booking_id, position) + parse_charge(charge)
+        for booking_id, charges_text in bookings
+        for position, charge in enumerate(split_charges(charges_text))
+    ]
+    if rows:
+        cursor.executemany('''
+            INSERT INTO booking_charges (booking_id, position, statute, description, is_hold)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', rows)
+
+def image_store_path(image_hash, variant=""):
+    """Path of an image in the content-addressed store: images/ab/cd/<sha256><variant>.webp"""
+    return os.path.join(IMAGES_DIR, image_hash[:2], image_hash[2:4], f"{image_hash}{variant}.webp")
+
+def encode_webp(img):
+    """Encode a PIL image as WebP bytes"""
+    buf = io.BytesIO()
+    img.save(buf, "WEBP", quality=IMAGE_WEBP_QUALITY, method=4)
+    return buf.getvalue()
 
-def save_image_to_disk(image_bytes, record_name, pdf_filename, booking_date):
-    """Save image to disk with validation and unique naming for multiple arrests"""
+def save_image_to_disk(image_bytes):
+    """Save image to the content-addressed store with its derivatives
+
+    Files are keyed by the SHA-256 of the extracted bytes, so identical
+    photos from different PDFs are stored once and re-ingesting a PDF
+    rewrites nothing. The raw PNG crop is re-encoded as an optimized WebP
+    master plus a THUMBNAIL_SIZE thumbnail. Returns a dict with the master
+    path, hash, thumbnail path and the raw/stored byte counts written, or
+    None if the bytes are not a usable image.
+    """
     if not image_bytes or len(image_bytes) < 100:
         return None
     
-    # Validate image data
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+    result = {
+        "path": image_store_path(image_hash),
+        "hash": image_hash,
+        "thumbnail": image_store_path(image_hash, "_thumb"),
+        "raw_bytes": 0,
+        "stored_bytes": 0,
+    }
+    
+    if os.path.exists(result["path"]) and os.path.exists(result["thumbnail"]):
+        metrics.incr("images_already_stored")
+        return result
+    
     try:
-        test_img = Image.open(io.BytesIO(image_bytes))
-        test_img.verify()
+        with metrics.stage("image_encode"):
+            img = Image.open(io.BytesIO(image_bytes))
+            img.load()
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            master = encode_webp(img)
+            thumb_img = img.copy()
+            thumb_img.thumbnail(THUMBNAIL_SIZE)
+            thumbnail = encode_webp(thumb_img)
+        
+        with metrics.stage("image_write"):
+            os.makedirs(os.path.dirname(result["path"]), exist_ok=True)
+            write_file_atomic(result["path"], master)
+            write_file_atomic(result["thumbnail"], thumbnail)
+        result["raw_bytes"] = len(image_bytes)
+        result["stored_bytes"] = len(master)
+        metrics.incr("images_written")
+        return result
     except Exception:
+        metrics.incr("images_invalid")
         return None
+
+def store_images(images):
+    """Run save_image_to_disk over a thread pool, preserving order (None entries pass through)"""
+    if not any(images):
+        return [None] * len(images)
+    with ThreadPoolExecutor(max_workers=IMAGE_WORKERS) as executor:
+        return list(executor.map(lambda b: save_image_to_disk(b) if b else None, images))
+
+def report_image_stats():
+    """Print bytes saved by image optimization during this run"""
+    if not image_stats["written"]:
+        return
+    saved = image_stats["raw_bytes"] - image_stats["stored_bytes"]
+    pct = saved / image_stats["raw_bytes"] * 100 if image_stats["raw_bytes"] else 0
+    print(f"Image optimization: {image_stats['written']} images, "
+          f"{image_stats['raw_bytes'] / 1024:.0f} KB -> {image_stats['stored_bytes'] / 1024:.0f} KB "
+          f"(saved {saved / 1024:.0f} KB, {pct:.1f}%)")
+
+def _sort_words_into_reading_order(words, tolerance=3):
+    """Order word boxes top-to-bottom, then left-to-right within a visual line
+
+    Mirrors pdfplumber's extract_words() ordering so both backends feed the
+    same word stream into the line grouping below.
+    """
+    ordered = []
+    cluster = []
+    cluster_top = None
+    for w in sorted(words, key=lambda w: (w['top'], w['x0'])):
+        if cluster_top is not None and abs(w['top'] - cluster_top) > tolerance:
+            ordered.extend(sorted(cluster, key=lambda w: w['x0']))
+            cluster = []
+            cluster_top = None
+        if cluster_top is None:
+            cluster_top = w['top']
+        cluster.append(w)
+    ordered.extend(sorted(cluster, key=lambda w: w['x0']))
+    return ordered
+
+def _page_image_placements(page):
+    """Image placements of a PyMuPDF page, in the layout "images" shape"""
+    images = []
+    for info in page.get_image_info(xrefs=True):
+        x0, top, x1, bottom = info["bbox"]
+        images.append({
+            "x0": x0, "top": top, "x1": x1, "bottom": bottom,
+            "xref": info.get("xref", 0),
+            "srcsize": (info.get("width"), info.get("height")),
+            "transform": info.get("transform"),
+        })
+    return images
+
+def _match_image_placements(images, placements):
+    """Swap each pdfplumber image for the PyMuPDF placement on the same bbox
+
+    Both backends then hand render_image_region the same xref, source size
+    and transform, so a photo is rendered (and content-addressed) the same
+    way whichever backend parsed the page. Unmatched images pass through.
+    """
+    matched = []
+    for im in images:
+        bbox = (im.get("x0", 0), im.get("top", 0), im.get("x1", 0), im.get("bottom", 0))
+        placement = next((p for p in placements
+                          if all(abs(a - b) <= IMAGE_BBOX_TOLERANCE
+                                 for a, b in zip(bbox, (p["x0"], p["top"], p["x1"], p["bottom"])))), None)
+        matched.append(placement or im)
+    return matched
+
+def _iter_pages_pymupdf(pdf_path):
+    """Yield page layouts using PyMuPDF only (single open per PDF)"""
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            words = [
+                {"text": w[4], "x0": w[0], "top": w[1], "x1": w[2], "bottom": w[3]}
+                for w in page.get_text("words")
+                if w[4].strip()
+            ]
+            yield {
+                "doc": doc,
+                "page": page,
+                "words": _sort_words_into_reading_order(words),
+                "text": (lambda page=page: page.get_text()),
+                "images": _page_image_placements(page),
+                "width": page.rect.width,
+                "height": page.rect.height,
+            }
+
+def _iter_pages_pdfplumber(pdf_path):
+    """Yield page layouts using pdfplumber for text/images and PyMuPDF for rendering"""
+    with pdfplumber.open(pdf_path) as pp, fitz.open(pdf_path) as doc:
+        for pidx, page_pp in enumerate(pp.pages):
+            page = doc[pidx]
+            images = page_pp.images or []
+            yield {
+                "doc": doc,
+                "page": page,
+                "words": page_pp.extract_words(),
+                "text": page_pp.extract_text,
+                "images": _match_image_placements(images, _page_image_placements(page)) if images else [],
+                "width": page_pp.width,
+                "height": page_pp.height,
+            }
+
+PDF_BACKENDS = {
+    "pymupdf": _iter_pages_pymupdf,
+    "pdfplumber": _iter_pages_pdfplumber,
+}
+DEFAULT_PDF_BACKEND = "pymupdf"
+
+def render_image_region(doc, page, im, rect):
+    """Return PNG bytes for one photo region of a page
+
+    When the embedded image is stored at exactly the rendered size and placed
+    unrotated on its bbox, its pixels are copied out losslessly by xref;
+    otherwise only the clip rectangle is rasterized at RENDER_ZOOM.
+    """
+    x0, top, x1, bottom = rect
+    width = (x1 - x0) * RENDER_ZOOM
+    height = (bottom - top) * RENDER_ZOOM
     
-    # Create clean filename with date to handle multiple arrests
-    clean_name = re.sub(r'[^\w\s-]', '', record_name).strip()
-    clean_name = re.sub(r'[-\s]+', '_', clean_name)
-    pdf_base = os.path.splitext(pdf_filename)[0]
+    xref = im.get("xref") or 0
+    transform = im.get("transform")
+    if (xref > 0 and tuple(im.get("srcsize") or ()) == (width, height)
+            and transform is not None and transform[1] == 0 and transform[2] == 0
+            and (im["x0"], im["top"], im["x1"], im["bottom"]) == (x0, top, x1, bottom)):
+        pix = fitz.Pixmap(doc, xref)
+        if not pix.alpha and pix.n in (1, 3):
+            if pix.n == 1:
+                pix = fitz.Pixmap(fitz.csRGB, pix)
+            return pix.tobytes("png")
     
-    # Include booking date in filename to handle multiple arrests of same person
-    date_str = booking_date.strftime('%Y%m%d') if booking_date else 'unknown'
-    filename = f"{clean_name}_{date_str}_{pdf_base}.png"
-    filepath = os.path.join(IMAGES_DIR, filename)
+    zoom = fitz.Matrix(RENDER_ZOOM, RENDER_ZOOM)
+    pix = page.get_pixmap(matrix=zoom, clip=fitz.Rect(x0, top, x1, bottom))
+    return pix.tobytes("png")
+
+def _is_marshal_hold(line):
+    """True if a line describes a US Marshal / federal hold"""
+    upper = line.upper()
+    if "MARSHAL HOLD" in upper or "MARSHALL HOLD" in upper or ("FEDERAL" in upper and "HOLD" in upper):
+        return True
+    return ("US MARSHAL" in upper or "U.S. MARSHAL" in upper or "FBI" in upper) and ("HOLD" in upper or "FEDERAL" in upper)
+
+def classify_lines(lines):
+    """Tag every text line once
+
+    Returns (flags, bookings): flags is a bytearray with one LINE_* bit set
+    per line, and bookings maps the index of each booking row to its parsed
+    fields. Every regex and keyword check runs exactly once per line.
+    """
+    flags = bytearray(len(lines))
+    bookings = {}
+    for idx, (text, _top) in enumerate(lines):
+        # Booking rows always carry dates, so skip the regexes otherwise
+        m = None
+        if '/' in text:
+            # Try pattern with gender first, then without (gender UNKNOWN)
+            m = NAME_ROW_PATTERN_WITH_GENDER.match(text)
+            if m:
+                bookings[idx] = m.groupdict()
+            else:
+                m = NAME_ROW_PATTERN_NO_GENDER.match(text)
+                if m:
+                    bookings[idx] = dict(m.groupdict(), gender='UNKNOWN')
+        if m:
+            flags[idx] = LINE_BOOKING
+            continue
+        
+        ln = text.strip()
+        if not ln:
+            continue
+        if ln.startswith("State "):
+            flags[idx] |= LINE_CHARGE
+        elif _is_marshal_hold(ln):
+            flags[idx] |= LINE_HOLD
+        # Address lines contain street, city, state, zip
+        if (not ln.startswith("Charge") and not ln.startswith("State") and
+                ("," in ln or "RD" in ln or "ST" in ln or "AVE" in ln or "DR" in ln)):
+            flags[idx] |= LINE_ADDRESS
+    return flags, bookings
+
+def build_name_entries(lines):
+    """Assemble booking records from classified lines in one linear sweep"""
+    flags, bookings = classify_lines(lines)
+    name_entries = []
+    rec = None
+    for idx, flag in enumerate(flags):
+        if flag & LINE_BOOKING:
+            rec = bookings[idx]
+            rec['charges'] = []
+            rec['address'] = ""
+            # Address is only taken from the line right after the booking row
+            if idx + 1 < len(lines) and flags[idx + 1] & LINE_ADDRESS:
+                rec['address'] = lines[idx + 1][0].strip()
+            name_entries.append({"rec": rec, "top": lines[idx][1]})
+        elif rec is None:
+            continue
+        elif flag & LINE_CHARGE:
+            rec['charges'].append(lines[idx][0].strip())
+        elif flag & LINE_HOLD:
+            rec['charges'].append(HOLD_CHARGE)
+    return name_entries
+
+def match_images_to_names(name_tops, image_mids, max_distance=IMAGE_MATCH_MAX_DISTANCE):
+    """Assign each booking row at most one photo in a single top-to-bottom sweep
+
+    Both lists must be sorted by vertical position (images without a known
+    position, i.e. None, last). Returns the chosen image index, or None, for
+    every name. A name and an image are paired when they are within
+    max_distance of each other and neither has a closer partner coming up
+    next, so missing photos and extra images (logos, banners) are skipped
+    instead of shifting every later assignment. Neither skip is final: a
+    name passed over in favour of the next name still gets the image if the
+    next name takes a later one, and an image passed over in favour of the
+    next image goes back to its name if that name ends up without a photo.
+    """
+    assignment = [None] * len(name_tops)
+    deferred = []  # names passed over for image j
+    spares = {}  # name -> image it passed over for a closer one
     
-    if os.path.exists(filepath):
-        return filepath
+    def release(j):
+        """Image j was not taken by the current name: offer it to a deferred name"""
+        in_reach = [(abs(image_mids[j] - name_tops[k]), k) for k in deferred
+                    if abs(image_mids[j] - name_tops[k]) < max_distance]
+        deferred.clear()
+        if in_reach:
+            assignment[min(in_reach)[1]] = j
+            return True
+        return False
     
+    i = j = 0
+    while i < len(name_tops) and j < len(image_mids) and image_mids[j] is not None:
+        name_top = name_tops[i]
+        image_mid = image_mids[j]
+        distance = abs(image_mid - name_top)
+        if distance >= max_distance:
+            # Too far apart: drop whichever one is higher on the page
+            if image_mid < name_top:
+                release(j)
+                j += 1
+            else:
+                i += 1
+            continue
+        
+        # Next image is a better fit for this name: current image is extra
+        if j + 1 < len(image_mids) and image_mids[j + 1] is not None and abs(image_mids[j + 1] - name_top) < distance:
+            if not release(j):
+                spares[i] = j
+            j += 1
+            continue
+        # Next name is a better fit for this image: current name has no photo yet
+        if i + 1 < len(name_tops) and abs(image_mid - name_tops[i + 1]) < distance:
+            deferred.append(i)
+            i += 1
+            continue
+        
+        assignment[i] = j
+        deferred.clear()
+        i += 1
+        j += 1
+    if deferred and j < len(image_mids) and image_mids[j] is not None:
+        release(j)
+    
+    taken = set(assignment)
+    for i, j in spares.items():
+        if assignment[i] is None and j not in taken:
+            assignment[i] = j
+            taken.add(j)
+    return assignment
+
+def render_image_ref(doc, ref):
+    """Render one photo reference from extract_records_from_pdf into PNG bytes, or None"""
     try:
-        with open(filepath, 'wb') as f:
-            f.write(image_bytes)
-        return filepath
+        if ref.get("fallback"):
+            with metrics.stage("image_render"):
+                pix = fitz.Pixmap(doc, ref["xref"])
+                if pix.n - pix.alpha >= 4:
+                    pix = fitz.Pixmap(fitz.csRGB, pix)
+                img_bytes = pix.tobytes("png")
+            with metrics.stage("image_verify"):
+                Image.open(io.BytesIO(img_bytes)).verify()
+        else:
+            with metrics.stage("image_render"):
+                img_bytes = render_image_region(doc, doc[ref["page"]], ref["image"], ref["rect"])
     except Exception:
         return None
+    metrics.incr("images_rendered")
+    return img_bytes if img_bytes and len(img_bytes) > 100 else None
+
+def materialize_image_refs(pdf_path, refs):
+    """Render a list of photo references (None entries pass through) with a single open of the PDF"""
+    if not any(refs):
+        return [None] * len(refs)
+    with fitz.open(pdf_path) as doc:
+        return [render_image_ref(doc, ref) if ref else None for ref in refs]
+
+def extract_records_from_pdf(pdf_path, backend=DEFAULT_PDF_BACKEND, lazy_images=False):
+    """Extract records and images from PDF (see _extract_records)"""
+    return _extract_records(pdf_path, backend, lazy_images)[0]
+
+def _extract_records(pdf_path, backend=DEFAULT_PDF_BACKEND, lazy_images=False):
+    """Extract records and images from PDF; returns (records_with_images, page_count)
+
+    backend selects the text/layout engine: "pymupdf" (default, single open)
+    or "pdfplumber" (the original dual-open path). Per-stage timings go to
+    run_metrics.metrics.
 
-def extract_records_from_pdf(pdf_path):
-    """Extract records and images from PDF"""
+    Only photos matched to a booking are rendered. With lazy_images nothing
+    is rendered: each record carries a small picklable reference (page,
+    clip rectangle, xref) instead of PNG bytes, for materialize_image_refs
+    to render later if the booking turns out to need it.
+    """
     records_with_images = []
+    page_count = 0
     
-    with pdfplumber.open(pdf_path) as pp, fitz.open(pdf_path) as doc:
-        for pidx, page_pp in enumerate(pp.pages):
-            # Extract text lines
-            words = page_pp.extract_words()
-            lines = []
-            if words:
-                cur_top = None
-                bucket = []
-                for w in words:
-                    if cur_top is None:
-                        cur_top = w['top']
-                    if abs(w['top'] - cur_top) <= 3:
-                        bucket.append(w)
-                    else:
-                        lines.append((" ".join(x['text'] for x in bucket).strip(), cur_top))
-                        bucket = [w]
-                        cur_top = w['top']
-                if bucket:
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend: {backend}")
+    
+    # page_layout covers opening the PDF and the word/image extraction per page
+    for layout in metrics.timed("page_layout", PDF_BACKENDS[backend](pdf_path)):
+        metrics.incr("pages")
+        page_count += 1
+        doc = layout["doc"]
+        page = layout["page"]
+        
+        # Extract text lines
+        line_start = time.perf_counter()
+        words = layout["words"]
+        lines = []
+        if words:
+            cur_top = None
+            bucket = []
+            for w in words:
+                if cur_top is None:
+                    cur_top = w['top']
+                if abs(w['top'] - cur_top) <= 3:
+                    bucket.append(w)
+                else:
                     lines.append((" ".join(x['text'] for x in bucket).strip(), cur_top))
-            else:
-                raw = page_pp.extract_text() or ""
-                lines = [(l, 0) for l in raw.splitlines()]
+                    bucket = [w]
+                    cur_top = w['top']
+            if bucket:
+                lines.append((" ".join(x['text'] for x in bucket).strip(), cur_top))
+        else:
+            raw = layout["text"]() or ""
+            lines = [(l, 0) for l in raw.splitlines()]
+        metrics.add_time("line_grouping", time.perf_counter() - line_start)
 
-            # Extract images
-            page_img_regions = []
-            full_img = None
+        # Locate photos; each is rendered from its clip rectangle only once matched
+        page_img_regions = []
+        for im in layout["images"]:
             try:
-                full_pix = doc[pidx].get_pixmap(matrix=fitz.Matrix(2,2))
-                full_img = Image.open(io.BytesIO(full_pix.tobytes("png")))
-            except Exception:
-                full_img = None
-
-            for im in (page_pp.images or []):
-                try:
-                    x0 = int(im.get("x0", 0))
-                    top = int(im.get("top", 0))
-                    x1 = int(im.get("x1", 0))
-                    bottom = int(im.get("bottom", 0))
-                    if full_img and x1 > x0 and bottom > top:
-                        sx = full_img.width / page_pp.width if page_pp.width else 1.0
-                        sy = full_img.height / page_pp.height if page_pp.height else 1.0
-                        
-                        img_height = (bottom - top) * sy
-                        img_width = (x1 - x0) * sx
-                        
-                        # Skip small images (logos/headers)
-                        if img_height < 50 or img_width < 50:
-                            continue
-                        if top * sy < 100:
-                            continue
-                            
-                        crop = full_img.crop((int(x0 * sx), int(top * sy), int(x1 * sx), int(bottom * sy)))
-                        buf = io.BytesIO()
-                        crop.save(buf, "PNG")
-                        buf.seek(0)
-                        img_bytes = buf.getvalue()
-                        
-                        if img_bytes and len(img_bytes) > 100:
-                            try:
-                                test_img = Image.open(io.BytesIO(img_bytes))
-                                test_img.verify()
-                                page_img_regions.append({"mid_y": (top + bottom) * 0.5, "bytes": img_bytes})
-                            except Exception:
-                                page_img_regions.append({"mid_y": (top + bottom) * 0.5, "bytes": None})
-                        else:
-                            page_img_regions.append({"mid_y": (top + bottom) * 0.5, "bytes": None})
-                except Exception:
-                    continue
-
-            # Fallback image extraction
-            if not page_img_regions:
-                imgs = doc[pidx].get_images(full=True) or []
-                for im in imgs:
-                    try:
-                        xref = im[0]
-                        pix = fitz.Pixmap(doc, xref)
-                        if pix.n - pix.alpha < 4:
-                            imgbytes = pix.tobytes("png")
-                        else:
-                            pix = fitz.Pixmap(fitz.csRGB, pix)
-                            imgbytes = pix.tobytes("png")
-                        if imgbytes and len(imgbytes) > 100:
-                            try:
-                                test_img = Image.open(io.BytesIO(imgbytes))
-                                test_img.verify()
-                                page_img_regions.append({"mid_y": None, "bytes": imgbytes})
-                            except Exception:
-                                continue
-                    except Exception:
+                x0 = int(im.get("x0", 0))
+                top = int(im.get("top", 0))
+                x1 = int(im.get("x1", 0))
+                bottom = int(im.get("bottom", 0))
+                if x1 > x0 and bottom > top:
+                    img_height = (bottom - top) * RENDER_ZOOM
+                    img_width = (x1 - x0) * RENDER_ZOOM
+                    
+                    # Skip small images (logos/headers)
+                    if img_height < 50 or img_width < 50:
                         continue
-
-            # Parse name entries
-            name_entries = []
-            for idx, (text, top) in enumerate(lines):
-                # Try pattern with gender first
-                m = NAME_ROW_PATTERN_WITH_GENDER.match(text)
-                if not m:
-                    # Try pattern without gender as fallback
-                    m = NAME_ROW_PATTERN_NO_GENDER.match(text)
-                    if m:
-                        # Add UNKNOWN gender if missing
-                        rec = m.groupdict()
-                        rec['gender'] = 'UNKNOWN'
-                    else:
+                    if top * RENDER_ZOOM < 100:
                         continue
-                else:
-                    rec = m.groupdict()
-                
-                if m:
-                    rec['charges'] = []
-                    rec['address'] = ""
                     
-                    # Look for address on the next line after booking info
-                    if idx + 1 < len(lines):
-                        next_line = lines[idx + 1][0].strip()
-                        # Check if next line looks like an address (contains street, city, state, zip)
-                        if (next_line and 
-                            not next_line.startswith("Charge") and 
-                            not next_line.startswith("State") and
-                            not NAME_ROW_PATTERN_WITH_GENDER.match(next_line) and
-                            not NAME_ROW_PATTERN_NO_GENDER.match(next_line) and
-                            ("," in next_line or "RD" in next_line or "ST" in next_line or "AVE" in next_line or "DR" in next_line)):
-                            rec['address'] = next_line
-                    
-                    j = idx + 1
-                    while j < len(lines) and not NAME_ROW_PATTERN_WITH_GENDER.match(lines[j][0]) and not NAME_ROW_PATTERN_NO_GENDER.match(lines[j][0]):
-                        ln = lines[j][0].strip()
-                        if ln and ln.startswith("State "):
-                            rec['charges'].append(ln)
-                        # Check for Marshal/Federal holds
-                        elif ln and ("MARSHAL HOLD" in ln.upper() or "MARSHALL HOLD" in ln.upper() or ("FEDERAL" in ln.upper() and "HOLD" in ln.upper())):
-                            rec['charges'].append("MARSHAL HOLD")
-                        # Check for other federal holds
-                        elif ln and ("US MARSHAL" in ln.upper() or "U.S. MARSHAL" in ln.upper() or "FBI" in ln.upper()) and ("HOLD" in ln.upper() or "FEDERAL" in ln.upper()):
-                            rec['charges'].append("MARSHAL HOLD")
-                        j += 1
-                    name_entries.append({"rec": rec, "top": top})
-
-            if not name_entries:
+                    ref = {
+                        "page": page.number,
+                        "rect": (x0, top, x1, bottom),
+                        "image": {
+                            "x0": im.get("x0"), "top": im.get("top"), "x1": im.get("x1"), "bottom": im.get("bottom"),
+                            "xref": im.get("xref"), "srcsize": im.get("srcsize"), "transform": im.get("transform"),
+                        },
+                    }
+                    page_img_regions.append({"mid_y": (top + bottom) * 0.5, "ref": ref})
+            except Exception:
                 continue
 
-            # Match images to names
-            name_entries.sort(key=lambda x: x["top"])
-            page_img_regions.sort(key=lambda x: x["mid_y"] if x["mid_y"] is not None else float('inf'))
-            
-            distances = []
-            for i, ne in enumerate(name_entries):
-                for j, img_region in enumerate(page_img_regions):
-                    if img_region["mid_y"] is not None:
-                        distance = abs(img_region["mid_y"] - ne["top"])
-                    else:
-                        distance = float('inf')
-                    distances.append((distance, i, j))
-            
-            distances.sort()
-            assigned_names = set()
-            assigned_images = set()
-            
-            for distance, name_idx, img_idx in distances:
-                if name_idx not in assigned_names and img_idx not in assigned_images:
-                    if distance < 200:
-                        assigned_names.add(name_idx)
-                        assigned_images.add(img_idx)
-            
-            for i, ne in enumerate(name_entries):
-                if i in assigned_names:
-                    for distance, name_idx, img_idx in distances:
-                        if name_idx == i and img_idx in assigned_images:
-                            img_bytes = page_img_regions[img_idx]["bytes"]
-                            break
-                    else:
-                        img_bytes = None
-                else:
-                    img_bytes = None
-                
-                records_with_images.append((ne["rec"], img_bytes))
+        # Fallback image extraction (embedded images without a position)
+        if not page_img_regions:
+            for im in page.get_images(full=True) or []:
+                page_img_regions.append({"mid_y": None, "ref": {"page": page.number, "xref": im[0], "fallback": True}})
+
+        # Parse name entries
+        with metrics.stage("regex_parse"):
+            name_entries = build_name_entries(lines)
+
+        if not name_entries:
+            continue
+
+        # Match images to names
+        name_entries.sort(key=lambda x: x["top"])
+        page_img_regions.sort(key=lambda x: x["mid_y"] if x["mid_y"] is not None else float('inf'))
+        
+        with metrics.stage("image_match"):
+            assignment = match_images_to_names(
+                [ne["top"] for ne in name_entries],
+                [img_region["mid_y"] for img_region in page_img_regions],
+            )
+        
+        for ne, img_idx in zip(name_entries, assignment):
+            ref = page_img_regions[img_idx]["ref"] if img_idx is not None else None
+            if ref and not lazy_images:
+                ref = render_image_ref(doc, ref)
+            records_with_images.append((ne["rec"], ref))
+
+    metrics.incr("records_extracted", len(records_with_images))
+    return records_with_images, page_count
+
+def normalize_db_time(value):
+    """pymysql returns TIME columns as timedelta; normalize to datetime.time"""
+    if isinstance(value, timedelta):
+        return (datetime.min + value).time()
+    return value
+
+def parse_booking_datetime(booking_datetime, warn=True):
+    """Parse "MM/DD/YYYY HH:MM:SS AM" into (date, time), or (None, None)"""
+    # Parse booking date and time with robust error handling
+    try:
+        if not booking_datetime or not booking_datetime.strip():
+            return None, None
+        # Split the datetime string properly
+        parts = booking_datetime.strip().split(' ')
+        if len(parts) < 3:
+            if warn:
+                print(f"Warning: Invalid booking datetime format: '{booking_datetime}'")
+            return None, None
+        date_part = parts[0]
+        time_part = ' '.join(parts[-2:])  # Last two parts should be time and AM/PM
+        return (datetime.strptime(date_part, '%m/%d/%Y').date(),
+                datetime.strptime(time_part, '%I:%M:%S %p').time())
+    except ValueError as e:
+        if warn:
+            print(f"Warning: Date/time parsing error for '{booking_datetime}': {e}")
+    except Exception as e:
+        if warn:
+            print(f"Warning: Unexpected error parsing datetime '{booking_datetime}': {e}")
+    return None, None
+
+def booking_key(record, warn=True):
+    """(raw_name, booking_date, booking_time) of an extracted record, as build_booking_rows keys it"""
+    raw_name = record['name'].strip() if record['name'] else ""
+    booked = record['booked'].strip() if record['booked'] else ""
+    return (raw_name,) + parse_booking_datetime(booked, warn)
+
+def mugshots_expected(pdf_filename):
+    """False for blotters from before June 26th 2025, which carry no mugshots"""
+    pdf_date_match = re.search(r'(\d{4}-\d{2}-\d{2})', pdf_filename)
+    if not pdf_date_match:
+        return True
+    pdf_date = datetime.strptime(pdf_date_match.group(1), '%Y-%m-%d').date()
+    return pdf_date >= datetime.strptime('2025-06-26', '%Y-%m-%d').date()
+
+def is_stored_image(image):
+    """True for an image entry that is an already stored photo ({"path", "thumbnail", "hash"})"""
+    return isinstance(image, dict) and "path" in image
+
+def resolve_images(booking_keys, images, pdf_path=None):
+    """Swap in stored photos of known bookings and render the remaining lazy references
+
+    booking_keys are (raw_name, booking_date, booking_time) per entry;
+    images are PNG bytes, lazy references (rendered from pdf_path), stored
+    photos or None. Returns a new list holding stored photos, PNG bytes
+    and None only.
+    """
+    images = list(images)
+    pending = [i for i, image in enumerate(images) if image and not is_stored_image(image)]
+    if pending:
+        with metrics.stage("image_lookup"):
+            existing = find_existing_images([booking_keys[i] for i in pending])
+        reused = [i for i in pending if booking_keys[i] in existing]
+        for i in reused:
+            images[i] = existing[booking_keys[i]]
+        metrics.incr("images_reused", len(reused))
     
-    return records_with_images
+    lazy = [i for i, image in enumerate(images) if isinstance(image, dict) and not is_stored_image(image)]
+    if lazy:
+        rendered = materialize_image_refs(pdf_path, [images[i] for i in lazy])
+        for i, image_bytes in zip(lazy, rendered):
+            images[i] = image_bytes
+    return images
+
+def find_existing_images(booking_keys):
+    """Stored photos of bookings already in the database
 
-def save_records_to_database(records_with_images, pdf_filename):
-    """Save all records from a PDF to MySQL database - Optimized version"""
+    booking_keys are (raw_name, booking_date, booking_time); the same
+    booking seen in an overlapping PDF or a re-run matches regardless of
+    source_pdf. Returns {key: {"path", "thumbnail", "hash"}} for keys whose
+    booking has a WebP image and thumbnail (legacy images are re-rendered).
+    """
+    keys = list({k for k in booking_keys if k[1] is not None and k[2] is not None})
+    found = {}
+    if not keys:
+        return found
     try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            for i in range(0, len(keys), EXISTING_IMAGE_LOOKUP_CHUNK):
+                chunk = keys[i:i + EXISTING_IMAGE_LOOKUP_CHUNK]
+                placeholders = ", ".join(["(%s, %s, %s)"] * len(chunk))
+                cursor.execute(f'''
+                    SELECT b.raw_name, b.booking_date, b.booking_time, b.image_path, b.thumbnail_path, bi.image_hash
+                    FROM bookings b
+                    LEFT JOIN booking_images bi ON bi.booking_id = b.id
+                    WHERE (b.raw_name, b.booking_date, b.booking_time) IN ({placeholders})
+                      AND b.image_path IS NOT NULL AND b.thumbnail_path IS NOT NULL
+                ''', [value for key in chunk for value in key])
+                for raw_name, booking_date, booking_time, image_path, thumbnail_path, image_hash in cursor.fetchall():
+                    found[(raw_name, booking_date, normalize_db_time(booking_time))] = {
+                        "path": image_path,
+                        "thumbnail": thumbnail_path,
+                        "hash": image_hash,
+                    }
+    except Exception as e:
+        print(f"Error looking up existing images: {e}")
+    return found
+
+def build_booking_rows(records_with_images, pdf_filename, pdf_path=None):
+    """Turn extracted records into bookings rows and store their images
+
+    Images may be PNG bytes, lazy references (extract_records_from_pdf with
+    lazy_images, rendered from pdf_path) or photos extract_pdf_job already
+    found stored. Bookings whose photo is already stored reuse it, so only
+    new bookings pay for rendering and encoding.
+
+    Returns one (row, image_hash) pair per record: row is a BOOKING_COLUMNS
+    tuple and image_hash the content hash of its stored photo, or None (no
+    photo, or a reused photo whose hash was never recorded).
+    """
+    prepare_start = time.perf_counter()
+    
+    # Check if this PDF is from before June 26th (no mugshots expected)
+    is_pre_june_26 = not mugshots_expected(pdf_filename)
+    
+    # Prepare all records data first
+    records_to_insert = []
+    records_to_check = []
+    images_to_store = []
+    
+    for record, image_bytes in records_with_images:
+        # Parse name components
+        raw_name = record['name'].strip() if record['name'] else ""
+        first_name, middle_name, last_name = parse_name(raw_name)
+        
+        # Prepare data
+        charges_text = "; ".join(record['charges']) if record['charges'] else NO_CHARGES
+        booking_datetime = record['booked'].strip() if record['booked'] else ""
+        dob = record['dob'].strip() if record['dob'] else ""
+        gender = record['gender'].strip() if record['gender'] else ""
+        raw_arrestor = record['brought'].strip() if record['brought'] else ""
+        address = record.get('address', '').strip() if record.get('address') else ""
+        
+        booking_date, booking_time = parse_booking_datetime(booking_datetime)
+        
+        # Queue image (only if not pre-June 26th)
+        if is_pre_june_26 and image_bytes:
+            print(f"  Skipping image for {raw_name} (pre-June 26th file)")
+        images_to_store.append(image_bytes if not is_pre_june_26 else None)
+        
+        # Data validation is handled by datetime.strptime() above
+        
+        # Collect record data for batch processing
+        record_data = (raw_name, first_name, middle_name, last_name, address, booking_date, booking_time,
+                      dob, gender, raw_arrestor, charges_text, pdf_filename)
+        records_to_insert.append(record_data)
+        records_to_check.append((raw_name, booking_date, booking_time, pdf_filename))
+    
+    metrics.add_time("record_prepare", time.perf_counter() - prepare_start)
+    if not records_to_insert:
+        return []
+    
+    # Reuse photos already stored for these bookings (including ones stored
+    # since the worker looked), render what is still a lazy reference
+    images_to_store = resolve_images([key[:3] for key in records_to_check], images_to_store, pdf_path)
+    reused = {i: image for i, image in enumerate(images_to_store) if is_stored_image(image)}
+    for i in reused:
+        images_to_store[i] = None
+    
+    # Save images and their derivatives in parallel
+    with metrics.stage("image_store"):
+        stored_images = store_images(images_to_store)
+    for i, stored in reused.items():
+        stored_images[i] = stored
+    for stored in stored_images:
+        if stored and stored.get("stored_bytes"):
+            image_stats["written"] += 1
+            image_stats["raw_bytes"] += stored["raw_bytes"]
+            image_stats["stored_bytes"] += stored["stored_bytes"]
+    
+    booked = []
+    for i, record_data in enumerate(records_to_insert):
+        # Derived columns, computed once here instead of by every consumer
+        raw_name, booking_date, dob = record_data[0], record_data[5], record_data[7]
+        dob_date = parse_dob(dob)
+        derived = (format_display_name(raw_name), dob_date, age_on(dob_date, booking_date))
+        
+        stored = stored_images[i]
+        if stored:
+            booked.append((record_data + (stored["path"], stored["thumbnail"]) + derived, stored["hash"]))
+        else:
+            booked.append((record_data + (None, None) + derived, None))
+    
+    return booked
+
+def image_link_params(booked):
+    """booking_images parameters (image_hash, raw_name, booking_date, booking_time, source_pdf)
+    for the build_booking_rows pairs that have an image hash"""
+    return [(image_hash, row[0], row[5], row[6], row[11]) for row, image_hash in booked if image_hash]
+
+def save_records_to_database(records_with_images, pdf_filename, pdf_path=None):
+    """Save all records from a PDF to MySQL database - Optimized version
+
+    pdf_path is needed when the records carry lazy image references.
+    Returns the number of new records, or None if the save failed.
+    """
+    try:
+        booked = build_booking_rows(records_with_images, pdf_filename, pdf_path)
+        rows = [row for row, _ in booked]
+        image_keys = image_link_params(booked)
+        if not rows:
+            return 0
+        
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Check if this PDF is from before June 26th (no mugshots expected)
-            pdf_date_match = re.search(r'(\d{4}-\d{2}-\d{2})', pdf_filename)
-            is_pre_june_26 = False
-            if pdf_date_match:
-                pdf_date_str = pdf_date_match.group(1)
-                pdf_date = datetime.strptime(pdf_date_str, '%Y-%m-%d').date()
-                june_26_2025 = datetime.strptime('2025-06-26', '%Y-%m-%d').date()
-                is_pre_june_26 = pdf_date < june_26_2025
-            
-            # Prepare all records data first
-            records_to_insert = []
-            records_to_check = []
-            
-            for record, image_bytes in records_with_images:
-                # Parse name components
-                raw_name = record['name'].strip() if record['name'] else ""
-                first_name, middle_name, last_name = parse_name(raw_name)
-                
-                # Prepare data
-                charges_text = "; ".join(record['charges']) if record['charges'] else "No charges listed"
-                booking_datetime = record['booked'].strip() if record['booked'] else ""
-                dob = record['dob'].strip() if record['dob'] else ""
-                gender = record['gender'].strip() if record['gender'] else ""
-                raw_arrestor = record['brought'].strip() if record['brought'] else ""
-                address = record.get('address', '').strip() if record.get('address') else ""
-                
-                # Parse booking date and time with robust error handling
-                try:
-                    if not booking_datetime or not booking_datetime.strip():
-                        booking_date = None
-                        booking_time = None
-                    else:
-                        # Split the datetime string properly
-                        parts = booking_datetime.strip().split(' ')
-                        if len(parts) < 3:
-                            print(f"Warning: Invalid booking datetime format: '{booking_datetime}'")
-                            booking_date = None
-                            booking_time = None
-                        else:
-                            date_part = parts[0]
-                            time_part = ' '.join(parts[-2:])  # Last two parts should be time and AM/PM
-                            
-                            # Parse date
-                            booking_date = datetime.strptime(date_part, '%m/%d/%Y').date()
-                            
-                            # Parse time - ensure it's a proper time object
-                            booking_time = datetime.strptime(time_part, '%I:%M:%S %p').time()
-                            
-                            # Time object is valid from strptime
-                            pass
-                                
-                except ValueError as e:
-                    print(f"Warning: Date/time parsing error for '{booking_datetime}': {e}")
-                    booking_date = None
-                    booking_time = None
-                except Exception as e:
-                    print(f"Warning: Unexpected error parsing datetime '{booking_datetime}': {e}")
-                    booking_date = None
-                    booking_time = None
-                
-                # Save image (only if not pre-June 26th)
-                image_path = None
-                if not is_pre_june_26 and image_bytes:
-                    image_path = save_image_to_disk(image_bytes, record['name'], pdf_filename, booking_date)
-                elif is_pre_june_26:
-                    print(f"  Skipping image for {raw_name} (pre-June 26th file)")
-                
-                # Data validation is handled by datetime.strptime() above
-                
-                # Collect record data for batch processing
-                record_data = (raw_name, first_name, middle_name, last_name, address, booking_date, booking_time,
-                              dob, gender, raw_arrestor, charges_text, pdf_filename, image_path)
-                records_to_insert.append(record_data)
-                records_to_check.append((raw_name, booking_date, booking_time, pdf_filename))
-            
-            if not records_to_insert:
-                return
-            
-            # Batch check for existing records - much more efficient than individual queries
-            existing_records = set()
-            if records_to_check:
-                # Create a single query to check all records at once
-                placeholders = ','.join(['(%s,%s,%s,%s)'] * len(records_to_check))
-                check_query = f'''
-                    SELECT raw_name, booking_date, booking_time, source_pdf 
-                    FROM bookings 
-                    WHERE (raw_name, booking_date, booking_time, source_pdf) IN ({placeholders})
-                '''
-                
-                # Flatten the records_to_check list for the query
-                flat_check_data = []
-                for record in records_to_check:
-                    flat_check_data.extend(record)
-                
-                cursor.execute(check_query, flat_check_data)
-                existing_records = set(cursor.fetchall())
+            # New rows for this PDF are counted through the source_pdf index
+            db_start = time.perf_counter()
+            cursor.execute("SELECT COUNT(*) FROM bookings WHERE source_pdf = %s", (pdf_filename,))
+            count_before = cursor.fetchone()[0]
             
-            # Filter out existing records and prepare batch insert
-            new_records = []
-            skipped_count = 0
+            # Upsert on the natural key; an existing booking only takes the
+            # new charges when they are richer, and fills in missing images
+            cursor.executemany(BOOKING_UPSERT_SQL, rows)
             
-            for i, record_data in enumerate(records_to_insert):
-                check_key = records_to_check[i]
-                if check_key in existing_records:
-                    skipped_count += 1
-                else:
-                    new_records.append(record_data)
+            # Map each booking id to its image hash
+            if image_keys:
+                cursor.executemany('''
+                    INSERT IGNORE INTO booking_images (booking_id, image_hash)
+                    SELECT id, %s FROM bookings
+                    WHERE raw_name = %s AND booking_date = %s AND booking_time = %s AND source_pdf = %s
+                ''', image_keys)
             
-            # Batch insert all new records at once - much more efficient
-            if new_records:
-                insert_query = '''
-                    INSERT INTO bookings
-                    (raw_name, first_name, middle_name, last_name, address, booking_date, booking_time, 
-                     date_of_birth, gender, raw_arrestor, charges, source_pdf, image_path)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                '''
-                cursor.executemany(insert_query, new_records)
+            # Normalized charges and the search index follow whatever the upsert kept
+            cursor.execute('''
+                SELECT id, first_name, middle_name, last_name, address, charges FROM bookings WHERE source_pdf = %s
+            ''', (pdf_filename,))
+            pdf_bookings = cursor.fetchall()
+            sync_booking_charges(cursor, [(row[0], row[5]) for row in pdf_bookings])
+            sync_search_index(cursor, pdf_bookings)
+            refresh_daily_stats(cursor, {row[5] for row in rows})
+            assign_persons(cursor, [row[0] for row in pdf_bookings])
+            link_booking_images(cursor, [row[0] for row in pdf_bookings])
+            saved_count = len(pdf_bookings) - count_before
             
             conn.commit()
-            saved_count = len(new_records)
+            metrics.add_time("db_write", time.perf_counter() - db_start)
+            skipped_count = len(rows) - saved_count
+            metrics.incr("records_saved", saved_count)
+            metrics.incr("records_skipped", skipped_count)
             print(f"Saved {saved_count} new records, skipped {skipped_count} duplicates from {pdf_filename}")
+            return saved_count
         
     except Exception as e:
+        # Connection will be automatically closed by context manager
         print(f"Error saving records: {e}")
+        return None
+
+# Parser output is authoritative when a PDF's rows are replaced (re-parse or
+# re-issue): every non-key column is replaced; images are only filled in, never cleared
+PDF_REPLACE_UPSERT_SQL = f'''
+    INSERT INTO bookings ({", ".join(BOOKING_COLUMNS)})
+    VALUES ({", ".join(["%s"] * len(BOOKING_COLUMNS))})
+    ON DUPLICATE KEY UPDATE
+        bookings.first_name = VALUES(first_name),
+        bookings.middle_name = VALUES(middle_name),
+        bookings.last_name = VALUES(last_name),
+        bookings.address = VALUES(address),
+        bookings.date_of_birth = VALUES(date_of_birth),
+        bookings.gender = VALUES(gender),
+        bookings.raw_arrestor = VALUES(raw_arrestor),
+        bookings.charges = VALUES(charges),
+        bookings.image_path = COALESCE(VALUES(image_path), bookings.image_path),
+        bookings.thumbnail_path = COALESCE(VALUES(thumbnail_path), bookings.thumbnail_path),
+        bookings.display_name = VALUES(display_name),
+        bookings.dob_date = VALUES(dob_date),
+        bookings.age_at_booking = VALUES(age_at_booking)
+'''
+
+# A stored booking carried onto a new row (its name now split differently, or
+# its PDF re-issued) is rewritten under the new key, keeping its id. Its photo
+# is the new parse's: the old one may have belonged to another booking
+PDF_REPLACE_MOVE_SQL = f'''
+    UPDATE bookings SET {", ".join(f"{column} = %s" for column in BOOKING_COLUMNS)}
+    WHERE id = %s
+'''
+
+def move_keys(booking_date, booking_time, dob, arrestor):
+    """Non-name fields that identify a booking whose name the new parse reads differently
+
+    A stored row is only moved onto a new row sharing one of these keys; a
+    row without a date of birth is never moved.
+    """
+    if not dob:
+        return []
+    return [("booked", booking_date, booking_time, dob), ("brought", dob, arrestor)]
+
+def pair_moved_rows(unmatched, fresh):
+    """Pair stored rows whose key changed with new rows of the same booking
+
+    unmatched are stored (id, raw_name, booking_date, booking_time,
+    date_of_birth, raw_arrestor, person_id, source_pdf) rows and fresh are
+    new BOOKING_COLUMNS rows, neither matched by natural key. Rows pair on
+    booking date, time and date of birth first, then on date of birth and
+    arrestor, each new row at most once. Returns [(stored, row)].
+    """
+    candidates = {}
+    for row in fresh:
+        for key in move_keys(row[5], row[6], row[7], row[9]):
+            candidates.setdefault(key, []).append(row)
+    moved = []
+    taken = set()
+    for stored in unmatched:
+        for key in move_keys(stored[2], normalize_db_time(stored[3]), stored[4], stored[5]):
+            row = next((row for row in candidates.get(key, ()) if id(row) not in taken), None)
+            if row is not None:
+                taken.add(id(row))
+                moved.append((stored, row))
+                break
+    return moved
+
+def replace_pdf_bookings(cursor, pdf_filename, booked, superseded=(), keep_stale=False):
+    """Make a PDF's stored bookings match a new parse of it, on the caller's cursor
+
+    booked are build_booking_rows pairs for pdf_filename. Its stored rows,
+    and those of the superseded PDFs it re-issues, are matched to the new
+    rows by (raw_name, booking_date, booking_time); a superseded PDF's
+    match is moved under pdf_filename. A stored booking whose key changed
+    is updated under its old id when a new row agrees with it on fields
+    other than the name (pair_moved_rows), so it keeps its person and
+    delivery history without being duplicated. Any other new row is
+    inserted; stored bookings left over are ones the new parse no longer
+    produces and are deleted unless keep_stale. Derived tables follow.
+    Returns (rows_written, moved_rows, stale_rows).
+    """
+    rows = [row for row, _ in booked]
+    image_keys = image_link_params(booked)
+    sources = [pdf_filename] + [f for f in superseded if f != pdf_filename]
+
+    cursor.execute(f'''
+        SELECT id, raw_name, booking_date, booking_time, date_of_birth, raw_arrestor, person_id, source_pdf
+        FROM bookings WHERE source_pdf IN ({", ".join(["%s"] * len(sources))})
+        ORDER BY source_pdf = %s DESC, id
+    ''', sources + [pdf_filename])
+    stored = cursor.fetchall()
+    # One stored row per key, this PDF's own first
+    by_key = {}
+    for row in stored:
+        by_key.setdefault((row[1], row[2], normalize_db_time(row[3])), row)
+    # Rows under keys not stored yet, once per key (a repeated key is one booking);
+    # the first new row of a key a superseded PDF stored carries that row over
+    fresh = []
+    carried = []
+    seen = set()
+    for row in rows:
+        key = (row[0], row[5], row[6])
+        if key in seen:
+            continue
+        seen.add(key)
+        if key not in by_key:
+            fresh.append(row)
+        elif by_key[key][7] != pdf_filename:
+            carried.append((by_key[key], row))
+    kept = {by_key[key][0] for key in seen if key in by_key}
+    unmatched = [row for row in stored if (row[1], row[2], normalize_db_time(row[3])) not in seen]
+    moved = carried + pair_moved_rows(unmatched, fresh)
+    moved_ids = {old[0] for old, _ in moved}
+    # Includes a superseded PDF's copies of keys this PDF already stores
+    stale = [row for row in stored if row[0] not in kept and row[0] not in moved_ids]
+    touched_dates = {row[2] for row in stored} | {row[5] for row in rows}
+
+    if moved:
+        cursor.executemany(PDF_REPLACE_MOVE_SQL, [row + (old[0],) for old, row in moved])
+        # Relinked below from the new parse's photos
+        placeholders = ", ".join(["%s"] * len(moved_ids))
+        cursor.execute(f"DELETE FROM booking_images WHERE booking_id IN ({placeholders})", list(moved_ids))
+    moved_rows = {id(row) for _, row in moved}
+    upserts = [row for row in rows if id(row) not in moved_rows]
+    if upserts:
+        cursor.executemany(PDF_REPLACE_UPSERT_SQL, upserts)
+    if image_keys:
+        cursor.executemany('''
+            INSERT INTO booking_images (booking_id, image_hash)
+            SELECT id, %s FROM bookings
+            WHERE raw_name = %s AND booking_date = %s AND booking_time = %s AND source_pdf = %s
+            ON DUPLICATE KEY UPDATE image_hash = VALUES(image_hash)
+        ''', image_keys)
+
+    stale_ids = [row[0] for row in stale]
+    if stale_ids and not keep_stale:
+        placeholders = ", ".join(["%s"] * len(stale_ids))
+        cursor.execute(f"DELETE FROM booking_images WHERE booking_id IN ({placeholders})", stale_ids)
+        cursor.execute(f"DELETE FROM booking_charges WHERE booking_id IN ({placeholders})", stale_ids)
+        cursor.execute(f"DELETE FROM booking_search_grams WHERE booking_id IN ({placeholders})", stale_ids)
+        cursor.execute(f"DELETE FROM booking_name_keys WHERE booking_id IN ({placeholders})", stale_ids)
+        cursor.execute(f"DELETE FROM bookings WHERE id IN ({placeholders})", stale_ids)
+        refresh_person_counts(cursor, [row[6] for row in stale])
+
+    cursor.execute('''
+        SELECT id, first_name, middle_name, last_name, address, charges FROM bookings WHERE source_pdf = %s
+    ''', (pdf_filename,))
+    pdf_bookings = cursor.fetchall()
+    sync_booking_charges(cursor, [(row[0], row[5]) for row in pdf_bookings])
+    sync_search_index(cursor, pdf_bookings)
+    refresh_daily_stats(cursor, touched_dates)
+    assign_persons(cursor, [row[0] for row in pdf_bookings])
+    link_booking_images(cursor, [row[0] for row in pdf_bookings])
+    return len(rows), len(moved) - len(carried), len(stale)
+
+def save_reissued_pdf(records_with_images, pdf_filename, pdf_path=None, superseded=()):
+    """Replace the bookings of a re-issued PDF (see replace_pdf_bookings)
+
+    Used instead of save_records_to_database when pdf_filename was ingested
+    before under different bytes, or re-issues the superseded PDFs of the
+    same blotter date. Returns the number of rows written, or None if the
+    save failed.
+    """
+    try:
+        booked = build_booking_rows(records_with_images, pdf_filename, pdf_path)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            with metrics.stage("db_write"):
+                written, moved, stale = replace_pdf_bookings(cursor, pdf_filename, booked, superseded)
+                conn.commit()
+        metrics.incr("pdfs_reissued")
+        replaced = f" and {', '.join(superseded)}" if superseded else ""
+        print(f"Replaced bookings of {pdf_filename}{replaced}: {written} rows, "
+              f"{moved} updated under a new key, {stale} stale deleted")
+        return written
+    except Exception as e:
         # Connection will be automatically closed by context manager
+        print(f"Error replacing records: {e}")
+        return None
+
+def link_booking_images(cursor, booking_ids):
+    """Perceptual-hash the photos of these bookings and link same-person near-duplicates"""
+    with metrics.stage("image_link"):
+        linked, near = link_near_duplicates(cursor, booking_ids)
+    metrics.incr("images_near_duplicate", near)
+    metrics.incr("images_linked", linked)
+    if linked:
+        print(f"Linked {linked} near-duplicate photos to stored copies")
+
+def prune_linked_images():
+    """Delete the files of photos linked to a stored copy that no booking uses any more"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            image_hashes = unreferenced_linked_images(cursor)
+    except Exception as e:
+        print(f"Error finding linked images: {e}")
+        return 0
+
+    removed = 0
+    freed = 0
+    for image_hash in image_hashes:
+        for path in (image_store_path(image_hash), image_store_path(image_hash, "_thumb")):
+            if os.path.exists(path):
+                freed += os.path.getsize(path)
+                os.remove(path)
+                removed += 1
+    if removed:
+        metrics.incr("image_files_pruned", removed)
+        print(f"Removed {removed} files of linked duplicate photos ({freed / 1024:.0f} KB)")
+    return removed
+
+def find_bookings_by_image(image_path):
+    """Print the bookings whose stored photo is a near-duplicate of an image file"""
+    value = dhash_files([image_path]).get(image_path)
+    if value is None:
+        return []
+    similar = dict(find_similar_images(value))
+    if not similar:
+        print(f"No stored photos within reach of {image_path}")
+        return []
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT b.id, b.raw_name, b.booking_date, b.source_pdf, bi.image_hash
+            FROM booking_images bi
+            JOIN bookings b ON b.id = bi.booking_id
+            WHERE bi.image_hash IN ({", ".join(["%s"] * len(similar))})
+        ''', list(similar))
+        matches = sorted(cursor.fetchall(), key=lambda row: (similar[row[4]], row[0]))
+    for booking_id, raw_name, booking_date, source_pdf, image_hash in matches:
+        print(f"  [{similar[image_hash]} bits] #{booking_id} {raw_name} - {booking_date} - {source_pdf}")
+    return matches
+
+def file_sha256(path):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def find_ingested_pdf(sha256):
+    """Return (filename, parser_version) of a PDF already ingested with these exact bytes by the current parser, or None"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT filename, parser_version FROM ingested_pdfs
+                WHERE sha256 = %s AND parser_version >= %s
+                LIMIT 1
+            ''', (sha256, PARSER_VERSION))
+            return cursor.fetchone()
+    except Exception as e:
+        print(f"Error checking ingestion manifest: {e}")
+        return None
+
+def record_ingested_pdf(filename, sha256, page_count, record_count, parse_seconds):
+    """Upsert a PDF's row in the ingestion manifest"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO ingested_pdfs
+                (filename, sha256, page_count, record_count, parse_seconds, parser_version)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    sha256 = VALUES(sha256),
+                    page_count = VALUES(page_count),
+                    record_count = VALUES(record_count),
+                    parse_seconds = VALUES(parse_seconds),
+                    parser_version = VALUES(parser_version)
+            ''', (filename, sha256, page_count, record_count, parse_seconds, PARSER_VERSION))
+            conn.commit()
+    except Exception as e:
+        print(f"Error updating ingestion manifest: {e}")
 
-def process_pdf_files():
-    """Process all PDF files in the new directory, starting with oldest first"""
+def extract_pdf_job(pdf_path, backend=DEFAULT_PDF_BACKEND):
+    """Extract one PDF and return (records, page_count, parse_seconds, job_metrics)
+
+    Photos of bookings already in the database come back as their stored
+    paths; only the new ones are rendered, here in the (pool) process, and
+    come back as PNG bytes for build_booking_rows to encode and store.
+
+    job_metrics holds the stage timings of this job alone, so a parent
+    process can merge what its pool workers measured.
+    """
+    before = metrics.snapshot()
+    start = time.perf_counter()
+    records, page_count = _extract_records(pdf_path, backend, lazy_images=True)
+    parse_seconds = time.perf_counter() - start
+    if records and mugshots_expected(os.path.basename(pdf_path)):
+        keys = [booking_key(record, warn=False) for record, _ in records]
+        images = resolve_images(keys, [image for _, image in records], pdf_path)
+        records = [(record, image) for (record, _), image in zip(records, images)]
+    return records, page_count, parse_seconds, metrics.since(before)
+
+def iter_extract_jobs(paths, workers=1, backend=DEFAULT_PDF_BACKEND):
+    """Yield (path, job_result, error) for each PDF path, in order
+
+    job_result is extract_pdf_job's tuple, or None with the exception in
+    error. With workers > 1 extraction runs on a process pool with at most
+    two jobs per worker in flight, so a large archive is never held in
+    memory at once; worker stage timings are merged into metrics.
+    """
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield path, extract_pdf_job(path, backend), None
+            except Exception as e:
+                yield path, None, e
+        return
+    
+    paths = iter(paths)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = deque((path, executor.submit(extract_pdf_job, path, backend))
+                        for path in itertools.islice(paths, workers * 2))
+        while pending:
+            path, future = pending.popleft()
+            for next_path in itertools.islice(paths, 1):
+                pending.append((next_path, executor.submit(extract_pdf_job, next_path, backend)))
+            try:
+                result = future.result()
+            except Exception as e:
+                yield path, None, e
+                continue
+            metrics.merge(result[3])
+            yield path, result, None
+    finally:
+        # Closing the generator early drops the queued jobs instead of finishing them
+        executor.shutdown(cancel_futures=True)
+
+def extract_date_from_filename(filename):
+    """Blotter date embedded in a PDF filename, or datetime.min (sorts first)"""
+    date_match = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
+    if date_match:
+        return datetime.strptime(date_match.group(1), '%Y-%m-%d')
+    return datetime.min
+
+def archive_pdf_file(filename):
+    """Move a processed PDF from the new directory to the archive"""
+    try:
+        shutil.move(os.path.join(SRC_DIR, filename), os.path.join(ARCHIVE_DIR, filename))
+        print(f"Archived: {filename}")
+    except Exception as e:
+        print(f"Archive move failed {filename}: {e}")
+
+def superseded_pdfs(filename):
+    """Archived PDFs another PDF of the same blotter date re-issues"""
+    blotter_date = extract_date_from_filename(filename)
+    if blotter_date == datetime.min or not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(f for f in os.listdir(ARCHIVE_DIR)
+                  if f.lower().endswith('.pdf') and f != filename and extract_date_from_filename(f) == blotter_date)
+
+def supersede_pdf_file(filename):
+    """Move an archived PDF replaced by a re-issue into the superseded directory"""
+    try:
+        os.makedirs(SUPERSEDED_DIR, exist_ok=True)
+        shutil.move(os.path.join(ARCHIVE_DIR, filename), os.path.join(SUPERSEDED_DIR, filename))
+        print(f"Superseded: {filename}")
+    except Exception as e:
+        print(f"Supersede move failed {filename}: {e}")
+
+def process_pdf_files(workers=1, backend=DEFAULT_PDF_BACKEND):
+    """Process all PDF files in the new directory, starting with oldest first
+
+    With workers > 1 the PDFs are extracted in parallel on a process pool
+    (iter_extract_jobs, at most two jobs per worker in flight) while this
+    process stays the single writer: results are saved to the database and
+    archived one file at a time in the same oldest-first order.
+
+    A PDF already archived under its name (changed bytes), or one dated the
+    same as archived PDFs, is a re-issue: it replaces the bookings of the
+    earlier versions (save_reissued_pdf) and other-named earlier versions
+    move to the superseded directory.
+    """
     if not os.path.isdir(SRC_DIR):
         print(f"Missing {SRC_DIR} directory")
         return
@@ -603,111 +1756,350 @@ def process_pdf_files():
         return
     
     # Sort files by date (oldest first)
-    def extract_date_from_filename(filename):
-        date_match = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
-        if date_match:
-            return datetime.strptime(date_match.group(1), '%Y-%m-%d')
-        return datetime.min
-    
     files.sort(key=extract_date_from_filename)
     
-    print(f"\n=== Processing {len(files)} PDF files (oldest first) ===")
-    
+    # Skip PDFs whose exact bytes were already ingested by this parser version
+    hashes = {}
+    to_parse = []
     for f in files:
-        path = os.path.join(SRC_DIR, f)
-        print(f"\nProcessing: {f}")
         try:
-            records = extract_records_from_pdf(path)
-            print(f"Extracted {len(records)} records")
-            if records:
-                save_records_to_database(records, f)
+            hashes[f] = file_sha256(os.path.join(SRC_DIR, f))
         except Exception as e:
             print(f"FAILED {f}: {e}")
-        
-        # Move processed file to archive
-        try:
-            import shutil
-            shutil.move(path, os.path.join(ARCHIVE_DIR, f))
-            print(f"Archived: {f}")
-        except Exception as e:
-            print(f"Archive move failed {f}: {e}")
+            continue
+        ingested = find_ingested_pdf(hashes[f])
+        if not ingested:
+            ingested = next(((other,) for other in to_parse if hashes[other] == hashes[f]), None)
+        if ingested:
+            print(f"Skipping {f} (identical to ingested {ingested[0]})")
+            metrics.incr("pdfs_already_ingested")
+            archive_pdf_file(f)
+        else:
+            to_parse.append(f)
+    files = to_parse
+    if not files:
+        print("All PDFs already ingested")
+        return
+    
+    workers = max(1, min(workers or 1, len(files)))
+    if workers > 1:
+        print(f"\n=== Processing {len(files)} PDF files (oldest first, {workers} workers) ===")
+    else:
+        print(f"\n=== Processing {len(files)} PDF files (oldest first) ===")
+    
+    jobs = iter_extract_jobs([os.path.join(SRC_DIR, f) for f in files], workers, backend)
+    try:
+        for n, (path, result, error) in enumerate(jobs, 1):
+            f = os.path.basename(path)
+            print(f"\nProcessing: {f}")
+            try:
+                if error:
+                    raise error
+                records, page_count, parse_seconds, _ = result
+                metrics.incr("pdfs_processed")
+                print(f"Extracted {len(records)} records")
+                superseded = superseded_pdfs(f)
+                if records and (superseded or os.path.exists(os.path.join(ARCHIVE_DIR, f))):
+                    saved = save_reissued_pdf(records, f, path, superseded)
+                    if saved is not None:
+                        for other in superseded:
+                            supersede_pdf_file(other)
+                else:
+                    saved = save_records_to_database(records, f, path) if records else 0
+                if saved is not None:
+                    record_ingested_pdf(f, hashes[f], page_count, len(records), parse_seconds)
+            except Exception as e:
+                print(f"FAILED {f}: {e}")
+                metrics.incr("pdfs_failed")
+            
+            # Move processed file to archive
+            archive_pdf_file(f)
+            if _stop_requested.is_set() and n < len(files):
+                print(f"Stop requested, leaving remaining PDFs in {SRC_DIR}")
+                break
+    finally:
+        jobs.close()
+
+def pending_pdf_count():
+    """Number of PDFs waiting in the new directory"""
+    if not os.path.isdir(SRC_DIR):
+        return 0
+    return sum(1 for f in os.listdir(SRC_DIR) if f.lower().endswith(".pdf"))
+
+def sd_notify(state):
+    """Send a state line (READY=1, WATCHDOG=1, STATUS=...) to systemd; no-op outside a notify unit"""
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address:
+        return False
+    # A leading @ names a socket in the abstract namespace
+    if address.startswith("@"):
+        address = "\0" + address[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(state.encode(), address)
+        return True
+    except Exception as e:
+        print(f"sd_notify failed: {e}")
+        return False
+
+def watchdog_interval():
+    """Seconds between watchdog pings requested by systemd (half of WatchdogSec), or None"""
+    usec = os.environ.get("WATCHDOG_USEC")
+    pid = os.environ.get("WATCHDOG_PID")
+    if not usec or (pid and int(pid) != os.getpid()):
+        return None
+    return int(usec) / 1e6 / 2
+
+def request_stop(signum, frame):
+    """Signal handler: finish the current PDF, then exit; a second signal exits at once"""
+    if _stop_requested.is_set():
+        raise KeyboardInterrupt
+    print(f"Received {signal.Signals(signum).name}, stopping after the current step")
+    _stop_requested.set()
+    sd_notify("STOPPING=1")
+
+class Heartbeat:
+    """Pings systemd's watchdog from a thread while the watch loop is making progress
+
+    The loop calls beat() with how long its next step may take. Pings stop
+    once that deadline passes, so a hung download, parse or query gets the
+    daemon restarted by systemd instead of being kept alive by the thread.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.deadline = time.monotonic()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def beat(self, budget):
+        """Allow budget more seconds before pings stop"""
+        with self.lock:
+            self.deadline = time.monotonic() + budget
+
+    def start(self):
+        if not self.interval:
+            return
+        self.thread = threading.Thread(target=self._run, name="watchdog", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not _stop_requested.wait(self.interval):
+            with self.lock:
+                alive = time.monotonic() < self.deadline
+            if alive:
+                sd_notify("WATCHDOG=1")
+
+def run_watch_cycle(args):
+    """One poll: conditional GET of the listing, then ingest whatever PDFs are waiting
 
-def main():
+    Returns the number of PDFs that were waiting. The run report and
+    textfile are rewritten every cycle so their timestamp shows the daemon
+    is alive.
+    """
+    metrics.reset()
+    success = False
+    pending = 0
+    try:
+        with metrics.stage("gather"):
+            gather_new_pdfs(verbose=False)
+        pending = pending_pdf_count()
+        if pending:
+            sd_notify(f"STATUS=Processing {pending} PDFs")
+            with metrics.stage("process"):
+                process_pdf_files(workers=args.workers, backend=args.backend)
+            with metrics.stage("image_prune"):
+                prune_linked_images()
+            report_image_stats()
+        success = True
+    except Exception as e:
+        print(f"Error in watch cycle: {e}")
+    finally:
+        report = build_report(success, {"db_pool": get_pool().stats(), "pdfs_pending": pending})
+        if pending:
+            print_stage_summary(report)
+        write_run_report(report, args.metrics_json, args.metrics_textfile)
+    return pending
+
+def watch(args):
+    """Poll the blotter listing every args.poll_interval seconds until SIGTERM/SIGINT
+
+    The interpreter, parsing libraries, HTTP session and DB pool stay warm
+    between polls. An unchanged listing costs one 304, and a new PDF is
+    ingested on the first poll after it is posted instead of at the next
+    daily run.
+    """
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    interval = max(1, args.poll_interval)
+    heartbeat = Heartbeat(watchdog_interval())
+    heartbeat.beat(WATCH_CYCLE_TIMEOUT)
+    heartbeat.start()
+
+    ensure_directories()
+    ensure_database_tables()
+    ensure_database_indexes()
+    print(f"Watching {BASE_URL} every {interval}s")
+    sd_notify("READY=1")
+
+    profiler = Profiler(args.profile, args.tracemalloc)
+    profiler.start()
+    cycles = 0
+    try:
+        while not _stop_requested.is_set():
+            heartbeat.beat(WATCH_CYCLE_TIMEOUT)
+            started = time.monotonic()
+            run_watch_cycle(args)
+            cycles += 1
+
+            wait = max(0, interval - (time.monotonic() - started))
+            next_poll = datetime.now() + timedelta(seconds=wait)
+            sd_notify(f"STATUS=Idle after {cycles} polls, next poll at {next_poll.strftime('%H:%M:%S')}")
+            heartbeat.beat(wait + WATCH_CYCLE_TIMEOUT)
+            _stop_requested.wait(wait)
+    finally:
+        sd_notify("STOPPING=1")
+        profiler.stop()
+        print(f"Watch stopped after {cycles} polls")
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Gather, parse, and store Mesa County mugshot data")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes used to extract PDFs in parallel (default: 1)")
+    parser.add_argument("--backend", choices=sorted(PDF_BACKENDS), default=DEFAULT_PDF_BACKEND,
+                        help=f"PDF text/layout engine (default: {DEFAULT_PDF_BACKEND})")
+    parser.add_argument("--metrics-json", default=METRICS_REPORT_FILE,
+                        help="Write a JSON run report with stage timings here ('' to disable)")
+    parser.add_argument("--metrics-textfile", default=METRICS_TEXTFILE,
+                        help="Write the run metrics as a Prometheus textfile for node_exporter")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Capture a cProfile of the main process to PATH (read with pstats)")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Trace Python allocations and add the peak and top sites to the run report")
+    parser.add_argument("--rebuild-derived", action="store_true",
+                        help="Only recompute display names, DOB/age columns and booking_charges for existing rows")
+    parser.add_argument("--rebuild-search", action="store_true",
+                        help="Only rebuild the name/address/charges search index for existing rows")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                        help="Only recompute the per-day statistics rollups from bookings")
+    parser.add_argument("--recluster-persons", action="store_true",
+                        help="Only re-resolve every booking to a person and recompute booking counts")
+    parser.add_argument("--link-images", action="store_true",
+                        help="Only perceptual-hash every stored photo, link near-duplicates and prune their files")
+    parser.add_argument("--find-image", metavar="PATH",
+                        help="Only list bookings whose photo is a near-duplicate of the image at PATH")
+    parser.add_argument("--watch", action="store_true",
+                        help="Run as a daemon: poll the listing and ingest new PDFs as they appear")
+    parser.add_argument("--poll-interval", type=int, default=WATCH_POLL_INTERVAL,
+                        help=f"Seconds between listing polls with --watch (default: {WATCH_POLL_INTERVAL})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function - gather, parse, and store mugshot data"""
+    args = parse_args(argv)
     print("=== GJ MugShots Core ===")
     print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Ensure directories exist
-    ensure_directories()
-    
-    # Ensure database indexes exist for optimal performance
-    ensure_database_indexes()
-    
-    # Step 1: Gather new PDFs
-    gather_new_pdfs()
+    if args.find_image:
+        find_bookings_by_image(args.find_image)
+        return
+
+    if args.rebuild_derived or args.rebuild_search or args.rebuild_stats or args.recluster_persons or args.link_images:
+        ensure_database_tables()
+        if args.rebuild_derived:
+            rebuild_derived_fields()
+        if args.recluster_persons:
+            ensure_database_indexes()
+            recluster_persons()
+        if args.rebuild_search:
+            rebuild_search_index()
+        if args.rebuild_stats:
+            rebuild_daily_stats()
+        if args.link_images:
+            link_all_images()
+            prune_linked_images()
+        return
     
-    # Step 2: Process PDFs and extract data
-    process_pdf_files()
+    if args.watch:
+        watch(args)
+        return
     
-    print("Processing complete!")
+    metrics.reset()
+    profiler = Profiler(args.profile, args.tracemalloc)
+    profiler.start()
+    success = False
+    try:
+        # Ensure directories exist
+        ensure_directories()
+        
+        # Ensure auxiliary tables and indexes exist for optimal performance
+        with metrics.stage("schema_check"):
+            ensure_database_tables()
+            ensure_database_indexes()
+        
+        # Step 1: Gather new PDFs
+        with metrics.stage("gather"):
+            gather_new_pdfs()
+        
+        # Step 2: Process PDFs and extract data
+        with metrics.stage("process"):
+            process_pdf_files(workers=args.workers, backend=args.backend)
+
+        # Step 3: Remove files of photos now linked to an earlier copy
+        with metrics.stage("image_prune"):
+            prune_linked_images()
+        
+        report_image_stats()
+        print("Processing complete!")
+        success = True
+    finally:
+        extra = profiler.stop()
+        extra["db_pool"] = get_pool().stats()
+        report = build_report(success, extra)
+        print_stage_summary(report)
+        write_run_report(report, args.metrics_json, args.metrics_textfile)
+
+def rebuild_derived_fields(page_size=DERIVED_REBUILD_PAGE):
+    """Recompute display_name, dob_date, age_at_booking and booking_charges for every booking
 
-def check_and_remove_duplicates():
-    """Check for and remove exact duplicate records while preserving multiple arrests"""
+    For rows ingested before these columns existed. Walks bookings in id
+    order, one page per transaction; safe to interrupt and re-run.
+    """
+    print("=== Rebuilding derived booking fields ===")
+    last_id = 0
+    updated = 0
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Find exact duplicates (same person, same date/time, same source)
-            cursor.execute('''
-                SELECT raw_name, booking_date, booking_time, source_pdf, COUNT(*) as count,
-                       GROUP_CONCAT(id) as all_ids, GROUP_CONCAT(charges SEPARATOR '|||') as all_charges
-                FROM bookings 
-                GROUP BY raw_name, booking_date, booking_time, source_pdf
-                HAVING COUNT(*) > 1
-            ''')
-            
-            duplicates = cursor.fetchall()
-            if not duplicates:
-                print("No exact duplicates found")
-                return 0
-            
-            removed_count = 0
-            for name, date, time, pdf, count, all_ids, all_charges in duplicates:
-                # Smart selection: keep the record with actual charges, not "No charges listed"
-                ids_list = [int(id_str) for id_str in all_ids.split(',')]
-                charges_list = all_charges.split('|||')
-                
-                # Find the best record to keep (one with actual charges)
-                keep_id = ids_list[0]  # Default to first
-                for i, charges in enumerate(charges_list):
-                    if charges and charges != "No charges listed" and charges.strip():
-                        keep_id = ids_list[i]
-                        break
-                
-                # Delete all others
-                ids_to_delete = [id_val for id_val in ids_list if id_val != keep_id]
-                
-                if ids_to_delete:
-                    placeholders = ','.join(['%s'] * len(ids_to_delete))
-                    cursor.execute(f'DELETE FROM bookings WHERE id IN ({placeholders})', ids_to_delete)
-                    deleted = cursor.rowcount
-                    removed_count += deleted
-                    print(f"Removed {deleted} duplicate records for {name} on {date} {time}")
-            
-            conn.commit()
-            print(f"Total duplicates removed: {removed_count}")
-            return removed_count
-            
+        while True:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, raw_name, booking_date, date_of_birth, charges FROM bookings
+                    WHERE id > %s ORDER BY id LIMIT %s
+                ''', (last_id, page_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                derived = []
+                for booking_id, raw_name, booking_date, dob, _ in rows:
+                    dob_date = parse_dob(dob)
+                    derived.append((format_display_name(raw_name), dob_date, age_on(dob_date, booking_date), booking_id))
+                cursor.executemany('''
+                    UPDATE bookings SET display_name = %s, dob_date = %s, age_at_booking = %s WHERE id = %s
+                ''', derived)
+                sync_booking_charges(cursor, [(row[0], row[4]) for row in rows])
+                conn.commit()
+            updated += len(rows)
+            last_id = rows[-1][0]
+            print(f"Rebuilt {updated} bookings")
     except Exception as e:
-        print(f"Error checking duplicates: {e}")
-        return 0
+        print(f"Error rebuilding derived fields: {e}")
+    return updated
 
 def cleanup():
     """Cleanup function to close database connections"""
-    global _db_connection
-    if _db_connection:
-        _db_connection.close()
-        _db_connection = None
+    print_pool_stats()
+    close_pool()
 
 if __name__ == "__main__":
     try:
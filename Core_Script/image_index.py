@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+GJ MugShots image index
+64-bit difference hashes (dHash) of stored mugshots, kept in image_phashes
+split into four 16-bit bands. Two hashes within 7 bits of each other have
+a band that differs in at most one bit, so near-duplicates are found with
+indexed equality lookups on the bands (each band probed with its 16
+one-bit neighbours) followed by an exact Hamming check, never by comparing
+every pair of images.
+"""
+
+import numpy as np
+from PIL import Image
+from db_pool import get_db_connection
+
+# dHash grid: each row of HASH_WIDTH + 1 grey pixels gives HASH_WIDTH bits
+HASH_WIDTH = 8
+HASH_HEIGHT = 8
+
+# Bands per hash and bits per band
+PHASH_BANDS = 4
+BAND_BITS = 16
+
+# Largest Hamming distance treated as the same photo (recall is exact up to
+# 2 * PHASH_BANDS - 1 with one-bit band probes)
+PHASH_MAX_DISTANCE = 6
+
+# Images hashed and looked up per batch
+PHASH_CHUNK = 500
+
+def dhash_images(images):
+    """dHash of each PIL image, computed for the whole batch at once"""
+    if not images:
+        return []
+    grey = np.stack([
+        np.asarray(img.convert("L").resize((HASH_WIDTH + 1, HASH_HEIGHT), Image.LANCZOS), dtype=np.int16)
+        for img in images
+    ])
+    # Bit set where brightness increases left to right
+    bits = grey[:, :, 1:] > grey[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(images), HASH_WIDTH * HASH_HEIGHT), axis=1)
+    return [int(value) for value in packed.view(">u8").ravel()]
+
+def dhash_files(paths):
+    """{path: dHash} for the readable image files among paths"""
+    images = {}
+    for path in paths:
+        try:
+            with Image.open(path) as img:
+                img.load()
+                images[path] = img.copy()
+        except Exception as e:
+            print(f"Warning: cannot hash image {path}: {e}")
+    return dict(zip(images, dhash_images(list(images.values()))))
+
+def hash_bands(value):
+    """The PHASH_BANDS band values of a hash, most significant first"""
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (BAND_BITS * (PHASH_BANDS - 1 - i))) & mask for i in range(PHASH_BANDS)]
+
+def near_duplicate_sql(value, exclude_hash=None):
+    """WHERE clause and params matching image_phashes rows within PHASH_MAX_DISTANCE of value"""
+    clauses = []
+    params = []
+    for i, band in enumerate(hash_bands(value)):
+        probes = [band] + [band ^ (1 << bit) for bit in range(BAND_BITS)]
+        clauses.append(f"band{i} IN ({', '.join(['%s'] * len(probes))})")
+        params.extend(probes)
+    sql = f"({' OR '.join(clauses)}) AND BIT_COUNT(dhash ^ %s) <= %s"
+    params += [value, PHASH_MAX_DISTANCE]
+    if exclude_hash:
+        sql += " AND image_hash <> %s"
+        params.append(exclude_hash)
+    return sql, params
+
+def index_images(cursor, thumbnails):
+    """Hash and record {image_hash: thumbnail_path} entries not yet in image_phashes; returns {image_hash: dhash}"""
+    hashes = list(thumbnails)
+    known = {}
+    for i in range(0, len(hashes), PHASH_CHUNK):
+        chunk = hashes[i:i + PHASH_CHUNK]
+        cursor.execute(f'''
+            SELECT image_hash, dhash FROM image_phashes WHERE image_hash IN ({", ".join(["%s"] * len(chunk))})
+        ''', chunk)
+        known.update(cursor.fetchall())
+
+    missing = [h for h in hashes if h not in known and thumbnails[h]]
+    for i in range(0, len(missing), PHASH_CHUNK):
+        chunk = missing[i:i + PHASH_CHUNK]
+        by_path = dhash_files([thumbnails[h] for h in chunk])
+        rows = []
+        for h in chunk:
+            value = by_path.get(thumbnails[h])
+            if value is not None:
+                known[h] = value
+                rows.append((h, value, *hash_bands(value)))
+        if rows:
+            cursor.executemany(f'''
+                INSERT IGNORE INTO image_phashes (image_hash, dhash, {", ".join(f"band{i}" for i in range(PHASH_BANDS))})
+                VALUES ({", ".join(["%s"] * (2 + PHASH_BANDS))})
+            ''', rows)
+    return known
+
+def link_near_duplicates(cursor, booking_ids):
+    """Hash the photos of the given bookings and point each at an earlier near-duplicate of the same person
+
+    A photo within PHASH_MAX_DISTANCE of one already stored for a booking
+    of the same person (bookings.person_id) has that person's bookings
+    switched to the stored file. Only once no booking of anyone else still
+    uses the photo is it recorded as a copy (image_phashes.canonical_hash),
+    so find_similar_images and prune_linked_images keep treating a photo
+    other people still show as a file of its own. Near-duplicates belonging
+    to other people are only counted, never linked. Returns (linked,
+    near_duplicates).
+    """
+    bookings = []
+    for i in range(0, len(booking_ids), PHASH_CHUNK):
+        chunk = booking_ids[i:i + PHASH_CHUNK]
+        cursor.execute(f'''
+            SELECT b.person_id, bi.image_hash, b.thumbnail_path
+            FROM bookings b
+            JOIN booking_images bi ON bi.booking_id = b.id
+            WHERE b.id IN ({", ".join(["%s"] * len(chunk))})
+        ''', chunk)
+        bookings.extend(cursor.fetchall())
+    if not bookings:
+        return 0, 0
+
+    dhashes = index_images(cursor, {image_hash: thumbnail for _, image_hash, thumbnail in bookings})
+    persons_by_hash = {}
+    for person_id, image_hash, _ in bookings:
+        if person_id:
+            persons_by_hash.setdefault(image_hash, set()).add(person_id)
+
+    linked = near = 0
+    for image_hash, person_ids in persons_by_hash.items():
+        value = dhashes.get(image_hash)
+        if value is None:
+            continue
+        where, params = near_duplicate_sql(value, exclude_hash=image_hash)
+        cursor.execute(f"SELECT DISTINCT COALESCE(canonical_hash, image_hash) FROM image_phashes WHERE {where}", params)
+        candidates = [row[0] for row in cursor.fetchall() if row[0] != image_hash]
+        if not candidates:
+            continue
+        near += 1
+
+        for person_id in person_ids:
+            # Earliest stored copy this person already has, with its files
+            cursor.execute(f'''
+                SELECT bi.image_hash, b.image_path, b.thumbnail_path
+                FROM booking_images bi
+                JOIN bookings b ON b.id = bi.booking_id
+                WHERE b.person_id = %s AND bi.image_hash IN ({", ".join(["%s"] * len(candidates))})
+                ORDER BY b.id
+                LIMIT 1
+            ''', [person_id] + candidates)
+            match = cursor.fetchone()
+            if not match:
+                continue
+            canonical, image_path, thumbnail_path = match
+            cursor.execute('''
+                UPDATE bookings b
+                JOIN booking_images bi ON bi.booking_id = b.id
+                SET b.image_path = %s, b.thumbnail_path = %s, bi.image_hash = %s
+                WHERE bi.image_hash = %s AND b.person_id = %s
+            ''', (image_path, thumbnail_path, canonical, image_hash, person_id))
+            linked += 1
+
+            # Retire the photo once no other person's booking shows it
+            cursor.execute("SELECT 1 FROM booking_images WHERE image_hash = %s LIMIT 1", (image_hash,))
+            if cursor.fetchone():
+                continue
+            cursor.execute('''
+                UPDATE image_phashes SET canonical_hash = %s WHERE image_hash = %s OR canonical_hash = %s
+            ''', (canonical, image_hash, image_hash))
+    return linked, near
+
+def unreferenced_linked_images(cursor):
+    """Hashes of images linked to a canonical copy that no booking uses any more"""
+    cursor.execute('''
+        SELECT p.image_hash
+        FROM image_phashes p
+        LEFT JOIN booking_images bi ON bi.image_hash = p.image_hash
+        WHERE p.canonical_hash IS NOT NULL AND bi.booking_id IS NULL
+    ''')
+    return [row[0] for row in cursor.fetchall()]
+
+def find_similar_images(value):
+    """[(image_hash, distance)] of stored files within PHASH_MAX_DISTANCE of a dHash, closest first
+
+    Linked copies are reported as the file they were linked to.
+    """
+    where, params = near_duplicate_sql(value)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT COALESCE(canonical_hash, image_hash) AS stored_hash, MIN(BIT_COUNT(dhash ^ %s)) AS distance
+            FROM image_phashes
+            WHERE {where}
+            GROUP BY stored_hash
+            ORDER BY distance
+        ''', [value] + params)
+        return cursor.fetchall()
+
+def link_all_images(page_size=PHASH_CHUNK):
+    """Hash every booking photo and link near-duplicates, one id-ordered page per transaction
+
+    For photos stored before the index existed; safe to interrupt and re-run.
+    Photos recorded as copies while bookings still use them are first made
+    files of their own again.
+    """
+    print("=== Linking near-duplicate images ===")
+    last_id = 0
+    scanned = linked = near = 0
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE image_phashes p
+                JOIN booking_images bi ON bi.image_hash = p.image_hash
+                SET p.canonical_hash = NULL
+                WHERE p.canonical_hash IS NOT NULL
+            ''')
+            if cursor.rowcount:
+                print(f"Unlinked {cursor.rowcount} photos still in use")
+            conn.commit()
+        while True:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT booking_id FROM booking_images WHERE booking_id > %s ORDER BY booking_id LIMIT %s
+                ''', (last_id, page_size))
+                booking_ids = [row[0] for row in cursor.fetchall()]
+                if not booking_ids:
+                    break
+                page_linked, page_near = link_near_duplicates(cursor, booking_ids)
+                conn.commit()
+            scanned += len(booking_ids)
+            linked += page_linked
+            near += page_near
+            last_id = booking_ids[-1]
+            print(f"Scanned {scanned} bookings: {near} near-duplicate photos, {linked} linked")
+    except Exception as e:
+        print(f"Error linking images: {e}")
+    return linked
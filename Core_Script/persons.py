@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+GJ MugShots person resolution
+Assigns every booking to a persons row keyed on the normalized first and
+last name plus date of birth, and keeps each person's booking count and
+first/last booking dates, so profile and repeat-arrest views are indexed
+lookups on bookings.person_id instead of name self-joins.
+
+persons.name_key ("LAST|FIRST") is the blocking index: a booking without
+a date of birth joins the one dated person of its name block, or is a
+person of its own while the block has none or several.
+"""
+
+from db_pool import get_db_connection
+from search_index import normalize_search_text
+
+# Bookings per statement when resolving and re-clustering
+PERSON_CHUNK = 1000
+
+# Longest identity key stored (persons.identity_key); names are cut so a
+# date or booking id suffix always fits
+IDENTITY_KEY_MAX = 255
+NAME_KEY_MAX = 220
+
+def name_key(first_name, last_name):
+    """Blocking key "LAST|FIRST" of a booking, or None without a name
+
+    Middle names are left out: the blotter lists them inconsistently for
+    the same person.
+    """
+    last, first = normalize_search_text(last_name), normalize_search_text(first_name)
+    if not last and not first:
+        return None
+    return f"{last}|{first}"[:NAME_KEY_MAX]
+
+def identity_key(first_name, last_name, dob_date, booking_id=None):
+    """Identity key "LAST|FIRST|YYYY-MM-DD" of a booking, or None without a name
+
+    A booking without a date of birth gets "LAST|FIRST|#<booking id>", the
+    key of a person of its own (see resolve_undated): a common name alone
+    would merge unrelated people.
+    """
+    block = name_key(first_name, last_name)
+    if block is None:
+        return None
+    if dob_date:
+        return f"{block}|{dob_date.isoformat()}"
+    if booking_id is not None:
+        return f"{block}|#{booking_id}"
+    return None
+
+def _fetch_bookings(cursor, booking_ids):
+    """(id, first_name, last_name, dob_date, display_name, person_id) for the given bookings"""
+    rows = []
+    for i in range(0, len(booking_ids), PERSON_CHUNK):
+        chunk = booking_ids[i:i + PERSON_CHUNK]
+        cursor.execute(f'''
+            SELECT id, first_name, last_name, dob_date, display_name, person_id FROM bookings
+            WHERE id IN ({", ".join(["%s"] * len(chunk))})
+        ''', chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+def _person_ids(cursor, people):
+    """Create missing persons for {identity_key: (dob_date, display_name, name_key)}; returns {identity_key: person_id}"""
+    keys = list(people)
+    ids = {}
+    for i in range(0, len(keys), PERSON_CHUNK):
+        chunk = keys[i:i + PERSON_CHUNK]
+        cursor.executemany('''
+            INSERT IGNORE INTO persons (identity_key, dob_date, display_name, name_key) VALUES (%s, %s, %s, %s)
+        ''', [(key,) + people[key] for key in chunk])
+        # Unique-key lookups, one per key
+        cursor.execute(f'''
+            SELECT identity_key, id FROM persons WHERE identity_key IN ({", ".join(["%s"] * len(chunk))})
+        ''', chunk)
+        ids.update(cursor.fetchall())
+    return ids
+
+def refresh_person_counts(cursor, person_ids):
+    """Recompute booking_count and first/last booking dates; persons left without bookings are deleted
+
+    An arrest listed in several PDFs (same raw_name, booking date and time)
+    counts once.
+    """
+    person_ids = sorted({p for p in person_ids if p})
+    for i in range(0, len(person_ids), PERSON_CHUNK):
+        chunk = person_ids[i:i + PERSON_CHUNK]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(f'''
+            UPDATE persons p
+            LEFT JOIN (
+                SELECT person_id, COUNT(DISTINCT raw_name, booking_date, booking_time) AS bookings,
+                       MIN(booking_date) AS first_date, MAX(booking_date) AS last_date
+                FROM bookings WHERE person_id IN ({placeholders})
+                GROUP BY person_id
+            ) c ON c.person_id = p.id
+            SET p.booking_count = COALESCE(c.bookings, 0),
+                p.first_booking_date = c.first_date,
+                p.last_booking_date = c.last_date
+            WHERE p.id IN ({placeholders})
+        ''', chunk + chunk)
+        cursor.execute(f"DELETE FROM persons WHERE id IN ({placeholders}) AND booking_count = 0", chunk)
+
+def resolve_undated(cursor, undated):
+    """Re-home the bookings without a date of birth of the given name blocks
+
+    undated maps name_key to {booking_id: (first_name, last_name,
+    display_name, person_id)} for bookings being resolved; the block's
+    other undated bookings are looked up through its persons. They all join
+    the block's one dated person, or their own persons while it has none or
+    several. Returns [(new_person_id, booking_id, old_person_id)] for the
+    bookings that move.
+    """
+    moves = []
+    singles = {}
+    for block, bookings in undated.items():
+        cursor.execute("SELECT id FROM persons WHERE name_key = %s AND dob_date IS NOT NULL LIMIT 2", (block,))
+        dated = [row[0] for row in cursor.fetchall()]
+        cursor.execute('''
+            SELECT b.id, b.first_name, b.last_name, b.display_name, b.person_id
+            FROM persons p
+            JOIN bookings b ON b.person_id = p.id
+            WHERE p.name_key = %s AND b.dob_date IS NULL
+        ''', (block,))
+        for booking_id, first_name, last_name, display_name, person_id in cursor.fetchall():
+            bookings.setdefault(booking_id, (first_name, last_name, display_name, person_id))
+        for booking_id, (first_name, last_name, display_name, person_id) in bookings.items():
+            if len(dated) == 1:
+                if person_id != dated[0]:
+                    moves.append((dated[0], booking_id, person_id))
+            else:
+                key = identity_key(first_name, last_name, None, booking_id)
+                singles[key] = (booking_id, person_id, (None, display_name, block))
+    ids = _person_ids(cursor, {key: person for key, (_, _, person) in singles.items()})
+    for key, (booking_id, person_id, _) in singles.items():
+        if ids.get(key) != person_id:
+            moves.append((ids.get(key), booking_id, person_id))
+    return moves
+
+def assign_persons(cursor, booking_ids):
+    """Resolve bookings to persons and refresh the counts of every person gained or lost
+
+    A dated booking costs one unique-key lookup on persons.identity_key;
+    undated ones are resolved per name block (resolve_undated), which is
+    revisited whenever a booking of the block is resolved, so a block's
+    first dated person also collects the undated bookings before it.
+    Returns the number of bookings whose person changed.
+    """
+    bookings = _fetch_bookings(cursor, list(booking_ids))
+    people = {}
+    keyed = []
+    undated = {}
+    for booking_id, first_name, last_name, dob_date, display_name, person_id in bookings:
+        block = name_key(first_name, last_name)
+        if block and not dob_date:
+            undated.setdefault(block, {})[booking_id] = (first_name, last_name, display_name, person_id)
+            continue
+        key = identity_key(first_name, last_name, dob_date)
+        if key:
+            people.setdefault(key, (dob_date, display_name, block))
+            undated.setdefault(block, {})
+        keyed.append((booking_id, key, person_id))
+    ids = _person_ids(cursor, people)
+
+    changes = []
+    touched = set()
+    for booking_id, key, person_id in keyed:
+        new_id = ids.get(key)
+        if new_id != person_id:
+            changes.append((new_id, booking_id))
+            touched.update((person_id, new_id))
+    if changes:
+        cursor.executemany("UPDATE bookings SET person_id = %s WHERE id = %s", changes)
+    # Persons emptied by the changes must be gone before blocks are counted
+    refresh_person_counts(cursor, touched)
+
+    touched = set()
+    moves = resolve_undated(cursor, undated)
+    if moves:
+        cursor.executemany("UPDATE bookings SET person_id = %s WHERE id = %s",
+                           [(new_id, booking_id) for new_id, booking_id, _ in moves])
+        for new_id, _, person_id in moves:
+            touched.update((person_id, new_id))
+    refresh_person_counts(cursor, touched)
+    return len(changes) + len(moves)
+
+def recluster_persons(page_size=PERSON_CHUNK):
+    """Re-resolve every booking, e.g. after the identity key rules change
+
+    Persons whose key is unchanged keep their id; ones left without
+    bookings (such as the persons of undated bookings that joined a dated
+    one) are deleted. Walks bookings in id
+    order, one page per transaction, so it is safe to interrupt and re-run;
+    every count is recomputed at the end.
+    """
+    print("=== Re-clustering persons ===")
+    last_id = 0
+    resolved = 0
+    moved = 0
+    try:
+        while True:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id FROM bookings WHERE id > %s ORDER BY id LIMIT %s", (last_id, page_size))
+                booking_ids = [row[0] for row in cursor.fetchall()]
+                if not booking_ids:
+                    break
+                moved += assign_persons(cursor, booking_ids)
+                conn.commit()
+            resolved += len(booking_ids)
+            last_id = booking_ids[-1]
+            print(f"Resolved {resolved} bookings ({moved} reassigned)")
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM persons")
+            refresh_person_counts(cursor, [row[0] for row in cursor.fetchall()])
+            conn.commit()
+            cursor.execute("SELECT COUNT(*), SUM(booking_count > 1) FROM persons")
+            people, repeat = cursor.fetchone()
+            print(f"{people} persons, {repeat or 0} with more than one booking")
+    except Exception as e:
+        print(f"Error re-clustering persons: {e}")
+    return moved
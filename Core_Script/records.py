@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+GJ MugShots record helpers
+Pure functions for names, dates of birth and charges of a booking, shared
+by the ingest pipeline and the Discord sender without pulling in the PDF
+and image libraries
+"""
+
+from datetime import datetime
+
+# Stored in bookings.charges when a booking lists no charges
+NO_CHARGES = "No charges listed"
+
+def parse_name(full_name):
+    """Parse full name into first, middle, last name components
+    Handles format: "LAST, FIRST MIDDLE" -> first, middle, last
+    """
+    if not full_name:
+        return "", "", ""
+
+    # Handle "LAST, FIRST MIDDLE" format
+    if ',' in full_name:
+        parts = full_name.split(',', 1)
+        if len(parts) == 2:
+            last_name = parts[0].strip()
+            first_middle_part = parts[1].strip()
+            first_middle_parts = first_middle_part.split()
+
+            if len(first_middle_parts) == 0:
+                return "", "", last_name
+            elif len(first_middle_parts) == 1:
+                return first_middle_parts[0], "", last_name
+            else:
+                # First name, middle names, last name
+                first_name = first_middle_parts[0]
+                middle_name = " ".join(first_middle_parts[1:])
+                return first_name, middle_name, last_name
+
+    # Fallback: treat as space-separated "FIRST MIDDLE LAST"
+    clean_name = full_name.strip()
+    name_parts = clean_name.split()
+
+    if len(name_parts) == 1:
+        return name_parts[0], "", ""
+    elif len(name_parts) == 2:
+        return name_parts[0], "", name_parts[1]
+    else:
+        # First name, middle names, last name
+        return name_parts[0], " ".join(name_parts[1:-1]), name_parts[-1]
+
+def format_display_name(raw_name):
+    """Render "LAST, FIRST MIDDLE" as "FIRST MIDDLE LAST" in upper case"""
+    if not raw_name:
+        return "UNKNOWN"
+    if ',' in raw_name:
+        last_name, first_middle = (part.strip() for part in raw_name.split(',', 1))
+        if first_middle.split():
+            return " ".join(first_middle.split() + [last_name]).strip().upper()
+    return raw_name.upper()
+
+def parse_dob(dob):
+    """Parse an MM/DD/YYYY date of birth, or return None"""
+    try:
+        return datetime.strptime(dob.strip(), '%m/%d/%Y').date() if dob else None
+    except ValueError:
+        return None
+
+def age_on(dob_date, on_date):
+    """Whole years between a date of birth and a later date, or None"""
+    if not dob_date or not on_date or on_date < dob_date:
+        return None
+    return on_date.year - dob_date.year - ((on_date.month, on_date.day) < (dob_date.month, dob_date.day))
+
+def split_charges(charges_text):
+    """Individual charges from the "; "-joined bookings.charges column"""
+    if not charges_text or charges_text == NO_CHARGES:
+        return []
+    return [charge.strip() for charge in charges_text.split(';') if charge.strip()]
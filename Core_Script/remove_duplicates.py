@@ -1,128 +1,162 @@
 #!/usr/bin/env python3
 """
 Safe duplicate removal script for GJ MugShots database
-Removes true duplicates (same person, same date, same time, same PDF) 
+Removes true duplicates (same person, same date, same time, same PDF)
 while preserving legitimate different bookings of the same person
 """
 
-import pymysql
-from config import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+import argparse
 from datetime import datetime
+from db_pool import get_db_connection, print_pool_stats, close_pool
+from records import NO_CHARGES
+from search_index import remove_orphan_search_rows
+from stats_rollup import refresh_daily_stats
+from persons import refresh_person_counts
 
-def remove_duplicates():
-    """Remove true duplicates while preserving different bookings"""
-    conn = None
+# Ranks rows sharing a natural key: real charges first, then lowest id
+RANKED_DUPLICATES_SQL = f'''
+    SELECT id, raw_name, booking_date, booking_time, source_pdf,
+           ROW_NUMBER() OVER (
+               PARTITION BY raw_name, booking_date, booking_time, source_pdf
+               ORDER BY (charges IS NULL OR charges = '' OR charges = '{NO_CHARGES}'), id
+           ) AS duplicate_rank
+    FROM bookings
+'''
+DUPLICATE_DELETE_CHUNK = 1000
+
+def check_and_remove_duplicates(dry_run=False, chunk_size=DUPLICATE_DELETE_CHUNK):
+    """Check for and remove exact duplicate records while preserving multiple arrests
+
+    Rows sharing (raw_name, booking_date, booking_time, source_pdf) are
+    ranked server-side with a window function; the one with real charges
+    (or else the lowest id) is kept and the rest are deleted in chunks.
+    With dry_run the duplicates are only reported.
+    """
     try:
-        conn = pymysql.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            charset='utf8mb4',
-            autocommit=False
-        )
-        cursor = conn.cursor()
-        
-        print("=== GJ MugShots Duplicate Removal ===")
-        print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        # First, let's see what we're working with
-        cursor.execute("SELECT COUNT(*) FROM bookings")
-        total_before = cursor.fetchone()[0]
-        print(f"Total records before cleanup: {total_before}")
-        
-        # Find duplicates (same person, same date, same time, same PDF)
-        cursor.execute("""
-            SELECT raw_name, booking_date, booking_time, source_pdf, COUNT(*) as duplicate_count
-            FROM bookings 
-            GROUP BY raw_name, booking_date, booking_time, source_pdf 
-            HAVING COUNT(*) > 1
-            ORDER BY duplicate_count DESC
-        """)
-        
-        duplicates = cursor.fetchall()
-        print(f"Found {len(duplicates)} sets of duplicates")
-        
-        if not duplicates:
-            print("No duplicates found!")
-            return
-        
-        # Show what we're about to remove
-        print("\nDuplicate sets to be cleaned:")
-        for dup in duplicates:
-            name, date, time, pdf, count = dup
-            print(f"  {name} - {date} {time} - {pdf} ({count} copies)")
-        
-        total_duplicates_to_remove = sum(count - 1 for _, _, _, _, count in duplicates)
-        print(f"\nTotal duplicate records to remove: {total_duplicates_to_remove}")
-        
-        # Confirm before proceeding
-        response = input("\nProceed with duplicate removal? (yes/no): ").lower().strip()
-        if response != 'yes':
-            print("Duplicate removal cancelled.")
-            return
-        
-        # Remove duplicates, keeping the record with the lowest ID (first inserted)
-        removed_count = 0
-        
-        for name, date, time, pdf, count in duplicates:
-            # Get all duplicate records for this person/date/time/pdf combination
-            cursor.execute("""
-                SELECT id FROM bookings 
-                WHERE raw_name = %s AND booking_date = %s AND booking_time = %s AND source_pdf = %s
-                ORDER BY id ASC
-            """, (name, date, time, pdf))
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
             
-            duplicate_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f'''
+                SELECT COUNT(*), COUNT(DISTINCT raw_name, booking_date, booking_time, source_pdf)
+                FROM ({RANKED_DUPLICATES_SQL}) ranked
+                WHERE duplicate_rank > 1
+            ''')
+            duplicate_rows, duplicate_sets = cursor.fetchone()
+            if not duplicate_rows:
+                print("No exact duplicates found")
+                return 0
             
-            # Keep the first record (lowest ID), remove the rest
-            ids_to_remove = duplicate_ids[1:]  # Skip the first one
+            print(f"Found {duplicate_rows} duplicate records in {duplicate_sets} sets")
+            if dry_run:
+                cursor.execute(f'''
+                    SELECT raw_name, booking_date, booking_time, source_pdf, COUNT(*) + 1
+                    FROM ({RANKED_DUPLICATES_SQL}) ranked
+                    WHERE duplicate_rank > 1
+                    GROUP BY raw_name, booking_date, booking_time, source_pdf
+                    ORDER BY COUNT(*) DESC
+                    LIMIT 50
+                ''')
+                for raw_name, booking_date, booking_time, source_pdf, copies in cursor.fetchall():
+                    print(f"  {raw_name} - {booking_date} {booking_time} - {source_pdf} ({copies} copies)")
+                print("Dry run: nothing removed")
+                return 0
+            
+            # Dates and persons whose statistics change once the copies are gone
+            cursor.execute(f'''
+                SELECT DISTINCT b.booking_date, b.person_id FROM ({RANKED_DUPLICATES_SQL}) ranked
+                JOIN bookings b ON b.id = ranked.id
+                WHERE ranked.duplicate_rank > 1
+            ''')
+            affected = cursor.fetchall()
+
+            removed_count = 0
+            while True:
+                cursor.execute(f'''
+                    DELETE b FROM bookings b
+                    JOIN (
+                        SELECT id FROM ({RANKED_DUPLICATES_SQL}) ranked
+                        WHERE duplicate_rank > 1
+                        LIMIT %s
+                    ) doomed ON doomed.id = b.id
+                ''', (chunk_size,))
+                deleted = cursor.rowcount
+                conn.commit()
+                removed_count += deleted
+                if deleted:
+                    print(f"Removed {deleted} duplicate records")
+                if deleted < chunk_size:
+                    break
+            
+            # Drop image, charge and search rows that pointed at removed bookings
+            cursor.execute('''
+                DELETE bi FROM booking_images bi
+                LEFT JOIN bookings b ON b.id = bi.booking_id
+                WHERE b.id IS NULL
+            ''')
+            cursor.execute('''
+                DELETE bc FROM booking_charges bc
+                LEFT JOIN bookings b ON b.id = bc.booking_id
+                WHERE b.id IS NULL
+            ''')
+            remove_orphan_search_rows(cursor)
+            refresh_daily_stats(cursor, [row[0] for row in affected])
+            refresh_person_counts(cursor, [row[1] for row in affected])
+            conn.commit()
+            print(f"Total duplicates removed: {removed_count}")
+            return removed_count
             
-            if ids_to_remove:
-                # Remove the duplicate records
-                placeholders = ','.join(['%s'] * len(ids_to_remove))
-                cursor.execute(f"DELETE FROM bookings WHERE id IN ({placeholders})", ids_to_remove)
-                removed_count += len(ids_to_remove)
-                print(f"  Removed {len(ids_to_remove)} duplicates for {name} ({date} {time})")
-        
-        # Commit the changes
-        conn.commit()
-        
-        # Verify the results
-        cursor.execute("SELECT COUNT(*) FROM bookings")
-        total_after = cursor.fetchone()[0]
-        
-        print(f"\n=== Cleanup Complete ===")
-        print(f"Records before: {total_before}")
-        print(f"Records after: {total_after}")
-        print(f"Duplicates removed: {removed_count}")
-        print(f"Records preserved: {total_after}")
-        
-        # Verify no duplicates remain
-        cursor.execute("""
-            SELECT COUNT(*) FROM (
-                SELECT raw_name, booking_date, booking_time, source_pdf, COUNT(*) as duplicate_count
-                FROM bookings 
-                GROUP BY raw_name, booking_date, booking_time, source_pdf 
-                HAVING COUNT(*) > 1
-            ) as remaining_duplicates
-        """)
-        remaining_duplicates = cursor.fetchone()[0]
-        
-        if remaining_duplicates == 0:
-            print("✓ No duplicates remain - cleanup successful!")
-        else:
-            print(f"⚠ Warning: {remaining_duplicates} duplicate sets still remain")
-        
     except Exception as e:
-        print(f"Error during duplicate removal: {e}")
-        if conn:
-            conn.rollback()
-        raise
-    finally:
-        if conn:
-            conn.close()
+        print(f"Error checking duplicates: {e}")
+        return 0
+
+
+def count_bookings():
+    """Return the number of rows in the bookings table"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM bookings")
+        return cursor.fetchone()[0]
+
+def remove_duplicates(dry_run=False):
+    """Remove true duplicates while preserving different bookings
+
+    Duplicates are found and deleted server-side in one ranked pass (see
+    check_and_remove_duplicates); the copy with real charges is kept.
+    """
+    print("=== GJ MugShots Duplicate Removal ===")
+    print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    total_before = count_bookings()
+    print(f"Total records before cleanup: {total_before}")
+
+    # Report what we're about to remove
+    check_and_remove_duplicates(dry_run=True)
+    if dry_run:
+        return
+
+    # Confirm before proceeding
+    response = input("\nProceed with duplicate removal? (yes/no): ").lower().strip()
+    if response != 'yes':
+        print("Duplicate removal cancelled.")
+        return
+
+    removed_count = check_and_remove_duplicates()
+    total_after = count_bookings()
+
+    print("\n=== Cleanup Complete ===")
+    print(f"Records before: {total_before}")
+    print(f"Records after: {total_after}")
+    print(f"Duplicates removed: {removed_count}")
+
+    # Verify no duplicates remain
+    check_and_remove_duplicates(dry_run=True)
 
 if __name__ == "__main__":
-    remove_duplicates()
+    parser = argparse.ArgumentParser(description="Remove exact duplicate bookings")
+    parser.add_argument("--dry-run", action="store_true", help="Only report duplicates, remove nothing")
+    args = parser.parse_args()
+    try:
+        remove_duplicates(dry_run=args.dry_run)
+    finally:
+        print_pool_stats()
+        close_pool()
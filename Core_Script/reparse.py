@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Archive re-parse for GJ MugShots
+Re-runs the current parser over archive/ after parsing rules change and
+rewrites the affected bookings in place. Progress is checkpointed per file
+in the ingestion manifest, so an interrupted run resumes where it stopped,
+and --shard i/n splits the archive deterministically between machines
+"""
+
+import os
+import sys
+import signal
+import hashlib
+import argparse
+from datetime import datetime
+from db_pool import get_db_connection
+from run_metrics import metrics, build_report, print_stage_summary
+from gj_mugshots_core import (
+    ARCHIVE_DIR, PARSER_VERSION, PDF_BACKENDS, DEFAULT_PDF_BACKEND,
+    build_booking_rows, replace_pdf_bookings, iter_extract_jobs, extract_date_from_filename, file_sha256,
+    prune_linked_images, ensure_directories, ensure_database_tables, ensure_database_indexes,
+    report_image_stats, cleanup
+)
+
+# Set by SIGINT/SIGTERM: finish the current file, then stop
+stop_requested = False
+
+def request_stop(signum, frame):
+    global stop_requested
+    if stop_requested:
+        raise KeyboardInterrupt
+    stop_requested = True
+    print("\nStop requested, finishing the current file (repeat to abort)")
+
+def parse_shard(value):
+    """Parse 'i/n' (0 <= i < n) into (i, n)"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("shard must look like i/n, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("shard i/n needs n >= 1 and 0 <= i < n")
+    return index, count
+
+def in_shard(filename, shard):
+    """Stable assignment of a file to one of n shards, independent of machine and listing order"""
+    index, count = shard
+    digest = hashlib.sha1(filename.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count == index
+
+def parse_since(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected a timestamp like 2025-10-01 or '2025-10-01 12:00'")
+
+def checkpointed_files(since=None):
+    """Filenames the manifest records at the current parser version (and, with since, ingested after it)"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        if since:
+            cursor.execute('''
+                SELECT filename FROM ingested_pdfs WHERE parser_version >= %s AND ingested_at >= %s
+            ''', (PARSER_VERSION, since))
+        else:
+            cursor.execute("SELECT filename FROM ingested_pdfs WHERE parser_version >= %s", (PARSER_VERSION,))
+        return {row[0] for row in cursor.fetchall()}
+
+def reparse_file(pdf_path, sha256, job_result, keep_stale=False):
+    """Rewrite one PDF's bookings in place and checkpoint it in a single transaction
+
+    See replace_pdf_bookings; stored bookings the new parse no longer
+    produces are deleted unless keep_stale. Returns (rows_written,
+    moved_rows, stale_rows).
+    """
+    filename = os.path.basename(pdf_path)
+    records, page_count, parse_seconds, _ = job_result
+    booked = build_booking_rows(records, filename, pdf_path)
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        with metrics.stage("db_write"):
+            written, moved, stale = replace_pdf_bookings(cursor, filename, booked, keep_stale=keep_stale)
+
+            # The manifest row is the checkpoint: committed together with the rows
+            cursor.execute('''
+                INSERT INTO ingested_pdfs
+                (filename, sha256, page_count, record_count, parse_seconds, parser_version)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    sha256 = VALUES(sha256),
+                    page_count = VALUES(page_count),
+                    record_count = VALUES(record_count),
+                    parse_seconds = VALUES(parse_seconds),
+                    parser_version = VALUES(parser_version),
+                    ingested_at = CURRENT_TIMESTAMP
+            ''', (filename, sha256, page_count, len(records), parse_seconds, PARSER_VERSION))
+            conn.commit()
+    return written, moved, stale
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description=f"Re-parse archived PDFs with the current parser (PARSER_VERSION {PARSER_VERSION})")
+    parser.add_argument("--directory", default=ARCHIVE_DIR, help=f"Directory to re-parse (default: {ARCHIVE_DIR})")
+    parser.add_argument("--shard", type=parse_shard, default=(0, 1), metavar="I/N",
+                        help="Only handle shard I of N (0-based), e.g. 2/4")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse PDFs (default: 1)")
+    parser.add_argument("--backend", choices=sorted(PDF_BACKENDS), default=DEFAULT_PDF_BACKEND,
+                        help=f"PDF text/layout engine (default: {DEFAULT_PDF_BACKEND})")
+    parser.add_argument("--since", type=parse_since,
+                        help="Also redo files already at the current parser version unless they were "
+                             "checkpointed after this time; pass the same value to resume or to every shard")
+    parser.add_argument("--keep-stale", action="store_true",
+                        help="Keep bookings of a re-parsed PDF that the new parse no longer produces "
+                             "(deleted by default)")
+    parser.add_argument("--limit", type=int, help="Stop after this many files")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    shard_index, shard_count = args.shard
+    print("=== GJ MugShots Archive Re-parse ===")
+    print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Parser version {PARSER_VERSION}, shard {shard_index}/{shard_count}")
+
+    if not os.path.isdir(args.directory):
+        print(f"Missing {args.directory} directory")
+        return 1
+
+    metrics.reset()
+    ensure_directories()
+    ensure_database_tables()
+    ensure_database_indexes()
+
+    done = checkpointed_files(args.since)
+    files = sorted((f for f in os.listdir(args.directory)
+                    if f.lower().endswith('.pdf') and in_shard(f, args.shard)),
+                   key=extract_date_from_filename)
+    todo = [f for f in files if f not in done]
+    print(f"{len(files)} PDFs in shard, {len(files) - len(todo)} already checkpointed")
+    if args.limit is not None:
+        todo = todo[:args.limit]
+    if not todo:
+        print("Nothing to re-parse")
+        return 0
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    completed = failed = rows_written = moved_rows = stale_rows = 0
+    paths = [os.path.join(args.directory, f) for f in todo]
+    jobs = iter_extract_jobs(paths, max(1, args.workers), args.backend)
+    try:
+        for n, (path, result, error) in enumerate(jobs, 1):
+            f = os.path.basename(path)
+            try:
+                if error:
+                    raise error
+                written, moved, stale = reparse_file(path, file_sha256(path), result, keep_stale=args.keep_stale)
+            except Exception as e:
+                print(f"FAILED {f}: {e}")
+                failed += 1
+            else:
+                completed += 1
+                rows_written += written
+                moved_rows += moved
+                stale_rows += stale
+                note = f", {moved} updated under a new key" if moved else ""
+                if stale:
+                    note += f", {stale} stale {'kept' if args.keep_stale else 'deleted'}"
+                print(f"[{n}/{len(todo)}] {f}: {written} rows{note}")
+            if stop_requested:
+                break
+    finally:
+        jobs.close()
+
+    print(f"\n=== Re-parse {'Stopped' if stop_requested else 'Complete'} ===")
+    print(f"Files re-parsed: {completed}, failed: {failed}, remaining: {len(todo) - completed - failed}")
+    print(f"Rows written: {rows_written}")
+    if moved_rows:
+        print(f"Rows updated under a new key: {moved_rows}")
+    if stale_rows:
+        print(f"Stale rows {'kept' if args.keep_stale else 'deleted'}: {stale_rows}")
+    prune_linked_images()
+    report_image_stats()
+    print_stage_summary(build_report(not failed))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        cleanup()
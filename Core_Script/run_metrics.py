@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+GJ MugShots run metrics
+Thread-safe stage timers and counters for one pipeline run, with optional
+cProfile/tracemalloc capture, written out as a JSON run report and a
+Prometheus textfile for node_exporter's textfile collector
+"""
+
+import time
+import json
+import resource
+import threading
+import tracemalloc
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime
+from fileio import write_file_atomic
+
+# Prefix of every exported Prometheus metric
+METRIC_PREFIX = "gj_mugshots"
+
+# Allocation sites listed in the report when tracemalloc is enabled
+TRACEMALLOC_TOP = 20
+
+class RunMetrics:
+    """Accumulated stage timings and counters for one run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}  # name -> [seconds, calls]
+            self.counters = {}
+            self.started_at = time.time()
+
+    def add_time(self, name, seconds, calls=1):
+        with self._lock:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block and add it to the named stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed(self, name, iterable):
+        """Yield from iterable, timing each step under the named stage"""
+        items = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - start, calls=0)
+                return
+            self.add_time(name, time.perf_counter() - start)
+            yield item
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """Copy of the current stages and counters"""
+        with self._lock:
+            return {
+                "stages": {name: list(entry) for name, entry in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def since(self, before):
+        """Stages and counters accumulated after an earlier snapshot"""
+        now = self.snapshot()
+        stages = {}
+        for name, (seconds, calls) in now["stages"].items():
+            old_seconds, old_calls = before["stages"].get(name, (0.0, 0))
+            if calls != old_calls:
+                stages[name] = [seconds - old_seconds, calls - old_calls]
+        counters = {
+            name: value - before["counters"].get(name, 0)
+            for name, value in now["counters"].items()
+            if value != before["counters"].get(name, 0)
+        }
+        return {"stages": stages, "counters": counters}
+
+    def merge(self, other):
+        """Add a snapshot taken in another process (e.g. a PDF worker)"""
+        for name, (seconds, calls) in other["stages"].items():
+            self.add_time(name, seconds, calls)
+        for name, value in other["counters"].items():
+            self.incr(name, value)
+
+metrics = RunMetrics()
+
+class Profiler:
+    """Optional cProfile and tracemalloc capture around a run"""
+
+    def __init__(self, profile_path=None, trace_memory=False):
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        self._profile = None
+
+    def start(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profile_path:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self):
+        """Stop capturing and return the extra report fields"""
+        extra = {}
+        if self._profile:
+            self._profile.disable()
+            self._profile.dump_stats(self.profile_path)
+            extra["profile"] = self.profile_path
+            self._profile = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:TRACEMALLOC_TOP]
+            tracemalloc.stop()
+            extra["tracemalloc"] = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top": [{"site": str(stat.traceback), "bytes": stat.size, "blocks": stat.count} for stat in top],
+            }
+        return extra
+
+def peak_rss_bytes():
+    """Peak resident set size of this process and its finished children"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux
+    return max(own, children) * 1024
+
+def build_report(success, extra=None):
+    """JSON-serialisable report of the run so far"""
+    snapshot = metrics.snapshot()
+    finished_at = time.time()
+    report = {
+        "started_at": datetime.fromtimestamp(metrics.started_at).isoformat(timespec="seconds"),
+        "finished_at": datetime.fromtimestamp(finished_at).isoformat(timespec="seconds"),
+        "duration_seconds": round(finished_at - metrics.started_at, 3),
+        "success": success,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "stages": {
+            name: {"seconds": round(seconds, 6), "calls": calls}
+            for name, (seconds, calls) in sorted(snapshot["stages"].items())
+        },
+        "counters": dict(sorted(snapshot["counters"].items())),
+    }
+    report.update(extra or {})
+    return report
+
+def format_prometheus(report):
+    """Render a run report in the Prometheus text exposition format"""
+    p = METRIC_PREFIX
+    lines = [
+        f"# HELP {p}_last_run_timestamp_seconds Unix time the last run finished",
+        f"# TYPE {p}_last_run_timestamp_seconds gauge",
+        f"{p}_last_run_timestamp_seconds {datetime.fromisoformat(report['finished_at']).timestamp():.0f}",
+        f"# HELP {p}_last_run_duration_seconds Wall time of the last run",
+        f"# TYPE {p}_last_run_duration_seconds gauge",
+        f"{p}_last_run_duration_seconds {report['duration_seconds']}",
+        f"# HELP {p}_last_run_success 1 if the last run finished without an unhandled error",
+        f"# TYPE {p}_last_run_success gauge",
+        f"{p}_last_run_success {1 if report['success'] else 0}",
+        f"# HELP {p}_last_run_peak_rss_bytes Peak resident memory of the last run",
+        f"# TYPE {p}_last_run_peak_rss_bytes gauge",
+        f"{p}_last_run_peak_rss_bytes {report['peak_rss_bytes']}",
+        f"# HELP {p}_last_run_stage_seconds Time spent in each pipeline stage during the last run",
+        f"# TYPE {p}_last_run_stage_seconds gauge",
+    ]
+    for name, stage in report["stages"].items():
+        lines.append(f'{p}_last_run_stage_seconds{{stage="{name}"}} {stage["seconds"]}')
+    lines += [
+        f"# HELP {p}_last_run_stage_calls Number of times each pipeline stage ran during the last run",
+        f"# TYPE {p}_last_run_stage_calls gauge",
+    ]
+    for name, stage in report["stages"].items():
+        lines.append(f'{p}_last_run_stage_calls{{stage="{name}"}} {stage["calls"]}')
+    lines += [
+        f"# HELP {p}_last_run_events Items counted during the last run",
+        f"# TYPE {p}_last_run_events gauge",
+    ]
+    for name, value in report["counters"].items():
+        lines.append(f'{p}_last_run_events{{event="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+def write_run_report(report, json_path=None, textfile_path=None):
+    """Write the JSON report and/or the Prometheus textfile"""
+    if json_path:
+        try:
+            write_file_atomic(json_path, json.dumps(report, indent=2) + "\n")
+            print(f"✓ Run report written to {json_path}")
+        except Exception as e:
+            print(f"✗ Failed to write run report {json_path}: {e}")
+    if textfile_path:
+        try:
+            write_file_atomic(textfile_path, format_prometheus(report))
+            print(f"✓ Prometheus metrics written to {textfile_path}")
+        except Exception as e:
+            print(f"✗ Failed to write Prometheus textfile {textfile_path}: {e}")
+
+def print_stage_summary(report):
+    """Print where the run spent its time, slowest stage first"""
+    if not report["stages"]:
+        return
+    print("Stage timings:")
+    for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["seconds"]):
+        print(f"  {name}: {stage['seconds']:.2f}s ({stage['calls']} calls)")
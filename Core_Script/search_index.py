@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+GJ MugShots search index
+Trigram and phonetic-key tables maintained alongside bookings so the
+website's substring and misspelled-name searches use index lookups instead
+of LIKE '%...%' scans. The normalization, trigram and phonetic rules are
+mirrored in Website/search-keys.js and must stay in step with it.
+"""
+
+import re
+import unicodedata
+from db_pool import get_db_connection
+
+# Indexed text fields, stored as a one-letter code in booking_search_grams
+SEARCH_FIELD_NAME = "N"
+SEARCH_FIELD_ADDRESS = "A"
+SEARCH_FIELD_CHARGES = "C"
+
+# Name parts with phonetic keys in booking_name_keys
+NAME_PART_FIRST = "F"
+NAME_PART_MIDDLE = "M"
+NAME_PART_LAST = "L"
+
+# Longest Metaphone key stored
+METAPHONE_MAX_LENGTH = 16
+
+# Bookings per DELETE when replacing their index rows, and per page on a rebuild
+SEARCH_SYNC_CHUNK = 1000
+
+# Soundex digit per consonant; letters not listed (vowels, H, W, Y) have none
+SOUNDEX_CODES = {
+    **dict.fromkeys("BFPV", "1"), **dict.fromkeys("CGJKQSXZ", "2"), **dict.fromkeys("DT", "3"),
+    "L": "4", **dict.fromkeys("MN", "5"), "R": "6",
+}
+# Vowels for Metaphone (kept only as the first letter)
+VOWELS = set("AEIOU")
+
+def normalize_search_text(text):
+    """Upper-case ASCII letters and digits, every other run of characters collapsed to one space"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.findall(r"[A-Z0-9]+", text.upper()))
+
+def trigrams(text):
+    """Distinct 3-character substrings of already normalized text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def soundex(word):
+    """American Soundex of one word ("ROBERT" -> "R163"), or "" if it has no letters"""
+    letters = re.sub(r"[^A-Z]", "", word.upper())
+    if not letters:
+        return ""
+    code = letters[0]
+    previous = SOUNDEX_CODES.get(letters[0], "")
+    for c in letters[1:]:
+        digit = SOUNDEX_CODES.get(c, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # H and W do not separate letters with the same code; vowels do
+        if c not in "HW":
+            previous = digit
+    return code.ljust(4, "0")
+
+def metaphone(word):
+    """Original (Philips 1990) Metaphone key of one word, e.g. SMITH -> SM0"""
+    w = re.sub(r"[^A-Z]", "", word.upper())
+    if not w:
+        return ""
+    # Initial letter exceptions
+    if w[:2] in ("AE", "GN", "KN", "PN", "WR"):
+        w = w[1:]
+    elif w[0] == "X":
+        w = "S" + w[1:]
+    elif w[:2] == "WH":
+        w = "W" + w[2:]
+
+    def at(i):
+        return w[i] if 0 <= i < len(w) else ""
+
+    key = []
+    for i, c in enumerate(w):
+        # Doubled letters count once, except C
+        if c == at(i - 1) and c != "C":
+            continue
+        nxt, prev = at(i + 1), at(i - 1)
+        if c in VOWELS:
+            if i == 0:
+                key.append(c)
+        elif c == "B":
+            if not (prev == "M" and i == len(w) - 1):
+                key.append("B")
+        elif c == "C":
+            if nxt == "I" and at(i + 2) == "A":
+                key.append("X")
+            elif nxt == "H":
+                key.append("K" if prev == "S" else "X")
+            elif nxt in ("I", "E", "Y"):
+                if prev != "S":
+                    key.append("S")
+            else:
+                key.append("K")
+        elif c == "D":
+            key.append("J" if nxt == "G" and at(i + 2) in ("E", "I", "Y") else "T")
+        elif c == "G":
+            if nxt == "H" and at(i + 2) and at(i + 2) not in VOWELS:
+                continue
+            if nxt == "N" and (i + 2 == len(w) or w[i + 2:] == "ED"):
+                continue
+            if prev == "D" and nxt in ("E", "I", "Y"):
+                continue
+            key.append("J" if nxt in ("E", "I", "Y") and prev != "G" else "K")
+        elif c == "H":
+            if prev in ("C", "S", "P", "T", "G"):
+                continue
+            if prev in VOWELS and nxt not in VOWELS:
+                continue
+            key.append("H")
+        elif c == "K":
+            if prev != "C":
+                key.append("K")
+        elif c == "P":
+            key.append("F" if nxt == "H" else "P")
+        elif c == "Q":
+            key.append("K")
+        elif c == "S":
+            if nxt == "H" or (nxt == "I" and at(i + 2) in ("O", "A")):
+                key.append("X")
+            else:
+                key.append("S")
+        elif c == "T":
+            if nxt == "I" and at(i + 2) in ("O", "A"):
+                key.append("X")
+            elif nxt == "H":
+                key.append("0")
+            elif not (nxt == "C" and at(i + 2) == "H"):
+                key.append("T")
+        elif c == "V":
+            key.append("F")
+        elif c in ("W", "Y"):
+            if nxt in VOWELS:
+                key.append(c)
+        elif c == "X":
+            key.append("KS")
+        elif c == "Z":
+            key.append("S")
+        else:
+            # F J L M N R
+            key.append(c)
+    return "".join(key)[:METAPHONE_MAX_LENGTH]
+
+def search_index_rows(booking_id, first_name, middle_name, last_name, address, charges):
+    """(gram_rows, name_key_rows) for one booking"""
+    grams = []
+    fields = (
+        (SEARCH_FIELD_NAME, normalize_search_text(" ".join(p for p in (first_name, middle_name, last_name) if p))),
+        (SEARCH_FIELD_ADDRESS, normalize_search_text(address)),
+        (SEARCH_FIELD_CHARGES, normalize_search_text(charges)),
+    )
+    for field, text in fields:
+        grams.extend((gram, field, booking_id) for gram in sorted(trigrams(text)))
+
+    keys = []
+    for part, name in ((NAME_PART_FIRST, first_name), (NAME_PART_MIDDLE, middle_name), (NAME_PART_LAST, last_name)):
+        for position, word in enumerate(normalize_search_text(name).split()):
+            code = soundex(word)
+            if code:
+                keys.append((booking_id, part, position, code, metaphone(word)))
+    return grams, keys
+
+def sync_search_index(cursor, bookings):
+    """Rewrite the search rows for [(id, first_name, middle_name, last_name, address, charges)]"""
+    if not bookings:
+        return
+    booking_ids = [booking[0] for booking in bookings]
+    for i in range(0, len(booking_ids), SEARCH_SYNC_CHUNK):
+        chunk = booking_ids[i:i + SEARCH_SYNC_CHUNK]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(f"DELETE FROM booking_search_grams WHERE booking_id IN ({placeholders})", chunk)
+        cursor.execute(f"DELETE FROM booking_name_keys WHERE booking_id IN ({placeholders})", chunk)
+
+    gram_rows = []
+    key_rows = []
+    for booking in bookings:
+        grams, keys = search_index_rows(*booking)
+        gram_rows.extend(grams)
+        key_rows.extend(keys)
+    if gram_rows:
+        cursor.executemany('''
+            INSERT INTO booking_search_grams (gram, field, booking_id) VALUES (%s, %s, %s)
+        ''', gram_rows)
+    if key_rows:
+        cursor.executemany('''
+            INSERT INTO booking_name_keys (booking_id, name_part, position, soundex, metaphone)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', key_rows)
+
+def rebuild_search_index(page_size=SEARCH_SYNC_CHUNK):
+    """Re-index every booking, one id-ordered page per transaction
+
+    For rows ingested before the index existed or after the normalization
+    rules change; safe to interrupt and re-run.
+    """
+    print("=== Rebuilding search index ===")
+    last_id = 0
+    indexed = 0
+    try:
+        while True:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, first_name, middle_name, last_name, address, charges FROM bookings
+                    WHERE id > %s ORDER BY id LIMIT %s
+                ''', (last_id, page_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                sync_search_index(cursor, rows)
+                conn.commit()
+            indexed += len(rows)
+            last_id = rows[-1][0]
+            print(f"Indexed {indexed} bookings")
+
+        # Rows of bookings deleted since they were indexed
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            remove_orphan_search_rows(cursor)
+            conn.commit()
+    except Exception as e:
+        print(f"Error rebuilding search index: {e}")
+    return indexed
+
+def remove_orphan_search_rows(cursor):
+    """Delete index rows whose booking no longer exists"""
+    for table in ("booking_search_grams", "booking_name_keys"):
+        cursor.execute(f'''
+            DELETE s FROM {table} s
+            LEFT JOIN bookings b ON b.id = s.booking_id
+            WHERE b.id IS NULL
+        ''')
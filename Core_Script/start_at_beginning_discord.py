@@ -1,54 +1,116 @@
 #!/usr/bin/env python3
 """
 Discord Start From Beginning Script
-Sends ALL bookings from the database to Discord (ignores sent records file)
+Sends bookings from the database to Discord, oldest first, skipping any
+already recorded in the discord_deliveries table so an interrupted run
+resumes where it stopped (--resend-all ignores the ledger)
 This is a standalone script that can be run independently
 """
 
 import os
+import argparse
 import requests
-import pymysql
 import json
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from config import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+from itertools import groupby
+from db_pool import get_db_connection, print_pool_stats, close_pool
+from records import NO_CHARGES, format_display_name, parse_dob, age_on, split_charges
 
 # Discord webhook configuration
 WEBHOOK = "https://discordapp.com/api/webhooks/1415105095678431332/3XxP-Uef3mcLOPzFUr27tlKZNtUiVefK1UAYWJgjzMXbgg30WgkU9IzQJXldAUQhjDEd"
 
-# Discord rate limits: 30 messages per minute, 50 requests per second
-MESSAGES_PER_MINUTE = 30
-REQUESTS_PER_SECOND = 50
-MIN_DELAY_BETWEEN_MESSAGES = 2  # 2 seconds between messages for production
-MIN_DELAY_BETWEEN_REQUESTS = 1 / REQUESTS_PER_SECOND   # 0.02 seconds
+# Discord rate limits are read from the response headers of each request;
+# 429s and 5xx responses are retried with backoff up to MAX_SEND_ATTEMPTS
+MAX_SEND_ATTEMPTS = 6
+MAX_BACKOFF_SECONDS = 60
 
-# File to track what has been sent to Discord
+# Legacy file that tracked what had been sent to Discord; imported into
+# the discord_deliveries table on every run
 SENT_RECORDS_FILE = "discord_sent_records.txt"
 
-last_message_time = 0
-last_request_time = 0
 GREY = 0x1f1f1f
 
+# Rows fetched per keyset page, and images read ahead of the post in flight
+RECORD_PAGE_SIZE = 500
+IMAGE_PREFETCH = 4
+
+# Webhook bucket state from the last X-RateLimit-* headers
+bucket_remaining = None
+bucket_reset_at = 0.0
+
+# Shared HTTP session so every post reuses one keep-alive connection
+_http_session = None
+
+def get_http_session():
+    """Return the shared requests Session"""
+    global _http_session
+    if _http_session is None:
+        _http_session = requests.Session()
+    return _http_session
+
 def rate_limit():
-    """Ensure we don't exceed Discord's rate limits"""
-    global last_message_time, last_request_time
-    current_time = time.time()
-    
-    # Check message rate limit (30 per minute)
-    time_since_last_message = current_time - last_message_time
-    if time_since_last_message < MIN_DELAY_BETWEEN_MESSAGES:
-        sleep_time = MIN_DELAY_BETWEEN_MESSAGES - time_since_last_message
-        print(f"Rate limiting: sleeping {sleep_time:.1f}s")
-        time.sleep(sleep_time)
-    
-    # Check request rate limit (50 per second)
-    time_since_last_request = current_time - last_request_time
-    if time_since_last_request < MIN_DELAY_BETWEEN_REQUESTS:
-        sleep_time = MIN_DELAY_BETWEEN_REQUESTS - time_since_last_request
-        time.sleep(sleep_time)
-    
-    last_message_time = time.time()
-    last_request_time = time.time()
+    """Wait only if Discord reported the webhook bucket as exhausted"""
+    if bucket_remaining is not None and bucket_remaining <= 0:
+        sleep_time = bucket_reset_at - time.monotonic()
+        if sleep_time > 0:
+            print(f"Rate limiting: sleeping {sleep_time:.1f}s")
+            time.sleep(sleep_time)
+
+def update_rate_limit(response):
+    """Record the webhook bucket state from Discord's rate limit headers"""
+    global bucket_remaining, bucket_reset_at
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    reset_after = response.headers.get("X-RateLimit-Reset-After")
+    try:
+        if remaining is not None:
+            bucket_remaining = int(remaining)
+        if reset_after is not None:
+            bucket_reset_at = time.monotonic() + float(reset_after)
+    except ValueError:
+        pass
+
+def get_retry_after(response):
+    """Seconds to wait after a 429, from the JSON body or Retry-After header"""
+    try:
+        return float(response.json().get("retry_after"))
+    except Exception:
+        pass
+    try:
+        return float(response.headers.get("Retry-After"))
+    except Exception:
+        return 1.0
+
+def send_webhook(data, files=None):
+    """POST to the webhook, honouring rate limits and retrying 429s and 5xxs
+
+    Returns the final response, or None if every attempt raised.
+    """
+    response = None
+    for attempt in range(MAX_SEND_ATTEMPTS):
+        rate_limit()
+        try:
+            response = get_http_session().post(WEBHOOK, data=data, files=files, timeout=30)
+        except requests.RequestException as e:
+            backoff = min(MAX_BACKOFF_SECONDS, 2 ** attempt)
+            print(f"  Request error ({e}), retrying in {backoff}s")
+            time.sleep(backoff)
+            continue
+        
+        update_rate_limit(response)
+        if response.status_code == 429:
+            retry_after = get_retry_after(response)
+            print(f"  Rate limited (429), retrying in {retry_after:.1f}s")
+            time.sleep(retry_after)
+        elif response.status_code >= 500:
+            backoff = min(MAX_BACKOFF_SECONDS, 2 ** attempt)
+            print(f"  Discord error {response.status_code}, retrying in {backoff}s")
+            time.sleep(backoff)
+        else:
+            return response
+    return response
 
 def load_sent_records():
     """Load the list of record IDs that have already been sent to Discord"""
@@ -64,78 +126,119 @@ def load_sent_records():
             print(f"Error loading sent records: {e}")
     return sent_records
 
-def save_sent_record(record_id):
-    """Add a record ID to the list of sent records"""
-    try:
-        with open(SENT_RECORDS_FILE, 'a') as f:
-            f.write(f"{record_id}\n")
-    except Exception as e:
-        print(f"Error saving sent record: {e}")
+def ensure_delivery_ledger():
+    """Create the discord_deliveries table and import the legacy sent records file
 
-def get_all_records():
-    """Get ALL records from the database (ignores sent records file)"""
-    try:
-        conn = pymysql.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            charset='utf8mb4'
-        )
+    The file is left in place (another process may still append to it);
+    ids imported before are ignored.
+    """
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        
-        # Get ALL records from the database, ordered chronologically
         cursor.execute('''
-            SELECT id, raw_name, first_name, middle_name, last_name, 
-                   booking_date, booking_time, date_of_birth, gender, 
-                   arrestor, charges, source_pdf, image_path
-            FROM bookings 
-            ORDER BY booking_date ASC, booking_time ASC
+            CREATE TABLE IF NOT EXISTS discord_deliveries (
+                booking_id INT NOT NULL PRIMARY KEY,
+                delivered_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
         ''')
+        conn.commit()
         
-        all_records = cursor.fetchall()
-        print(f"Found {len(all_records)} total records in database")
-        
-        conn.close()
-        
-        return all_records
-        
+        legacy_ids = load_sent_records()
+        if legacy_ids:
+            cursor.executemany(
+                "INSERT IGNORE INTO discord_deliveries (booking_id) VALUES (%s)",
+                [(record_id,) for record_id in sorted(legacy_ids)]
+            )
+            imported = cursor.rowcount
+            conn.commit()
+            if imported:
+                print(f"Imported {imported} sent records from {SENT_RECORDS_FILE}")
+
+def save_sent_record(record_id):
+    """Record a delivery in the discord_deliveries table right after its post
+
+    Committed per send, so a crash or Ctrl-C reposts at most the record in flight.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT IGNORE INTO discord_deliveries (booking_id) VALUES (%s)", (record_id,))
+            conn.commit()
     except Exception as e:
-        print(f"Error getting all records: {e}")
-        return []
+        print(f"Error saving sent record {record_id}: {e}")
+
+def iter_all_records(page_size=RECORD_PAGE_SIZE, undelivered_only=True):
+    """Stream dated records from the database, oldest first
+
+    Rows are read in keyset pages on (booking_date, booking_time, id),
+    served by idx_bookings_publish_order, each on a freshly checked-out
+    pooled connection, so memory stays flat regardless of table size and
+    no connection is held across slow sends. Bookings are written with
+    both a date and a time or neither (parse_booking_datetime), so the key
+    columns are compared as stored.
+    With undelivered_only, rows already in discord_deliveries are excluded
+    server-side by an anti-join, so the first page starts at the oldest
+    undelivered booking.
+    """
+    last_key = None
+    while True:
+        if last_key is None:
+            where, params = "", (page_size,)
+        else:
+            # Leading range on booking_date so each page starts with an index seek
+            booking_date, booking_time, booking_id = last_key
+            where = ("AND b.booking_date >= %s AND (b.booking_date > %s OR b.booking_time > %s"
+                     " OR (b.booking_time = %s AND b.id > %s))")
+            params = (booking_date, booking_date, booking_time, booking_time, booking_id, page_size)
+        if undelivered_only:
+            where += " AND d.booking_id IS NULL"
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT b.id, b.raw_name, b.first_name, b.middle_name, b.last_name, 
+                           b.booking_date, b.booking_time, b.date_of_birth, b.gender, 
+                           b.arrestor, b.charges, b.source_pdf, b.image_path,
+                           b.display_name, b.age_at_booking
+                    FROM bookings b
+                    LEFT JOIN discord_deliveries d ON d.booking_id = b.id
+                    WHERE b.booking_date IS NOT NULL AND b.booking_time IS NOT NULL {where}
+                    ORDER BY b.booking_date ASC, b.booking_time ASC, b.id ASC
+                    LIMIT %s
+                ''', params)
+                rows = cursor.fetchall()
+        except Exception as e:
+            print(f"Error getting records: {e}")
+            return
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1]
+        last_key = (last[5], last[6], last[0])
+
+def iter_date_groups(records):
+    """Lazily group a date-ordered record stream into (YYYY-MM-DD, [records])"""
+    for booking_date, group in groupby(records, key=lambda record: record[5]):  # booking_date is at index 5
+        yield booking_date.strftime('%Y-%m-%d'), list(group)
+
+def iter_with_images(records, executor, window=IMAGE_PREFETCH):
+    """Yield (record, image_bytes), reading the next images on a background thread"""
+    pending = deque()
+    for record in records:
+        pending.append((record, executor.submit(get_image_bytes, record[12])))  # image_path
+        if len(pending) > window:
+            queued_record, future = pending.popleft()
+            yield queued_record, future.result()
+    while pending:
+        queued_record, future = pending.popleft()
+        yield queued_record, future.result()
 
 def post_embed(record, image_bytes):
     """Send embed message to Discord webhook"""
-    # Apply rate limiting before making the request
-    rate_limit()
-    
     (id, raw_name, first_name, middle_name, last_name, booking_date, booking_time, 
-     dob, gender, arrestor, charges, source_pdf, image_path) = record
+     dob, gender, arrestor, charges, source_pdf, image_path, display_name, age_at_booking) = record
     
-    # Parse raw_name which is in "LAST, FIRST MIDDLE" format
-    # Convert to "FIRST MIDDLE LAST" format
-    if raw_name and ',' in raw_name:
-        # Split on comma: "MORRISON, JENNIFER ANN" -> ["MORRISON", "JENNIFER ANN"]
-        parts = raw_name.split(',', 1)
-        if len(parts) == 2:
-            last_name_part = parts[0].strip()
-            first_middle_part = parts[1].strip()
-            # Split first_middle_part: "JENNIFER ANN" -> ["JENNIFER", "ANN"]
-            first_middle_parts = first_middle_part.split()
-            if len(first_middle_parts) >= 1:
-                first_name_part = first_middle_parts[0]
-                middle_name_parts = first_middle_parts[1:] if len(first_middle_parts) > 1 else []
-                # Combine as "FIRST MIDDLE LAST"
-                name_parts = [first_name_part] + middle_name_parts + [last_name_part]
-                full_name = " ".join(name_parts).strip().upper()
-            else:
-                full_name = raw_name.upper()
-        else:
-            full_name = raw_name.upper()
-    else:
-        # Fallback to raw_name if no comma found
-        full_name = raw_name.upper() if raw_name else "UNKNOWN"
+    # "FIRST MIDDLE LAST", stored at ingest; older rows are formatted here
+    full_name = display_name or format_display_name(raw_name)
     
     # Format booking datetime
     booking_str = ""
@@ -166,18 +269,11 @@ def post_embed(record, image_bytes):
     elif booking_date:
         booking_str = booking_date.strftime('%m/%d/%Y')
     
-    # Format DOB and calculate age
+    # Format DOB and age at booking (stored at ingest; older rows are computed here)
     dob_str = dob if dob else "N/A"
-    age_str = "N/A"
-    if dob and dob != "N/A":
-        try:
-            from datetime import datetime
-            dob_date = datetime.strptime(dob, '%m/%d/%Y')
-            today = datetime.now()
-            age = today.year - dob_date.year - ((today.month, today.day) < (dob_date.month, dob_date.day))
-            age_str = f"{age} years old"
-        except:
-            age_str = "N/A"
+    if age_at_booking is None:
+        age_at_booking = age_on(parse_dob(dob), booking_date)
+    age_str = f"{age_at_booking} years old" if age_at_booking is not None else "N/A"
     
     # Format gender
     gender_str = gender.upper() if gender else "N/A"
@@ -186,10 +282,10 @@ def post_embed(record, image_bytes):
     arrestor_str = arrestor if arrestor else "N/A"
     
     # Format charges in bullet point format
-    charges_str = "No charges listed"
-    if charges and charges != "No charges listed":
+    charges_str = NO_CHARGES
+    if charges and charges != NO_CHARGES:
         # Split charges by semicolon and format as bullet points
-        charge_list = [charge.strip() for charge in charges.split(';') if charge.strip()]
+        charge_list = split_charges(charges)
         if charge_list:
             charges_str = "\n".join([f"• {charge}" for charge in charge_list])
             # Truncate if too long
@@ -199,26 +295,31 @@ def post_embed(record, image_bytes):
     # Create description with clean formatting
     desc = f"\n\n**Booked On**\n{booking_str}\n\n**DOB**\n{dob_str}\n\n**Age**\n{age_str}\n\n**Gender**\n{gender_str}\n\n**Arresting Officer**\n{arrestor_str}\n\n**Charges**\n{charges_str}"
     
+    # Stored mugshots are WebP; older rows still point at PNG files
+    image_ext = os.path.splitext(image_path)[1].lower() if image_path else ".png"
+    image_name = f"mug{image_ext or '.png'}"
+    image_mime = "image/webp" if image_ext == ".webp" else "image/png"
+    
     # Create embed with large image below description
     embed = {"title": full_name, "description": desc, "color": GREY}
     if image_bytes and image_bytes is not None:
-        embed["image"] = {"url": "attachment://mug.png"}
+        embed["image"] = {"url": f"attachment://{image_name}"}
     
     # Send as silent (no notification) for individual mugshot cards
     payload = {"embeds": [embed], "flags": 2}  # flags: 2 = SUPPRESS_NOTIFICATIONS (silent but shows embed)
     data = {"payload_json": json.dumps(payload)}
     files = {}
     if image_bytes and image_bytes is not None:
-        files["file"] = ("mug.png", image_bytes, "image/png")
+        files["file"] = (image_name, image_bytes, image_mime)
     
     try:
-        r = requests.post(WEBHOOK, data=data, files=files or None, timeout=30)
+        r = send_webhook(data, files=files or None)
         status_code = getattr(r, "status_code", None)
         print("POST", full_name, status_code)
         
         # Discord returns 204 for successful webhook posts
         success = status_code in [200, 204]
-        if not success:
+        if not success and r is not None:
             print(f"  Response: {r.text}")
         return success
     except Exception as e:
@@ -238,8 +339,6 @@ def get_image_bytes(image_path):
 
 def send_daily_completion_notification(count, date_str):
     """Send a daily completion notification embed (not silent)"""
-    rate_limit()
-    
     # Convert date string from YYYY-MM-DD to MM/DD/YYYY format
     try:
         from datetime import datetime
@@ -258,7 +357,7 @@ def send_daily_completion_notification(count, date_str):
     data = {"payload_json": json.dumps(payload)}
     
     try:
-        r = requests.post(WEBHOOK, data=data, timeout=30)
+        r = send_webhook(data)
         status_code = getattr(r, "status_code", None)
         print(f"DAILY NOTIFICATION: Bookings for {formatted_date} processed. - Status: {status_code}")
         return status_code in [200, 204]
@@ -266,87 +365,90 @@ def send_daily_completion_notification(count, date_str):
         print(f"DAILY NOTIFICATION ERROR: {e}")
         return False
 
-def main():
-    """Send ALL records to Discord from the beginning"""
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Send bookings to Discord, oldest first")
+    parser.add_argument("--resend-all", action="store_true",
+                        help="Send ALL records again, ignoring the delivery ledger")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Send undelivered records to Discord from the beginning"""
+    args = parse_args(argv)
     print("=== GJ MugShots Discord - START FROM BEGINNING ===")
     print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("⚠️  WARNING: This will send ALL records in the database!")
-    
-    # Get ALL records from the database
-    all_records = get_all_records()
+    if args.resend_all:
+        print("⚠️  WARNING: This will send ALL records in the database!")
+    else:
+        print("Resuming: only records not yet in discord_deliveries will be sent")
     
-    if not all_records:
-        print("No records found in database!")
+    try:
+        ensure_delivery_ledger()
+    except Exception as e:
+        print(f"Error preparing delivery ledger: {e}")
         return
     
-    print(f"Starting to send {len(all_records)} TOTAL records...")
     print("Order: Oldest bookings first")
     print("=" * 60)
     
-    # Group records by date
-    from collections import defaultdict
-    records_by_date = defaultdict(list)
-    
-    for record in all_records:
-        booking_date = record[5]  # booking_date is at index 5
-        if booking_date:
-            date_str = booking_date.strftime('%Y-%m-%d')
-            records_by_date[date_str].append(record)
-    
-    # Sort dates chronologically
-    sorted_dates = sorted(records_by_date.keys())
-    
+    total_records = 0
     total_successful_sends = 0
     total_failed_sends = 0
     
-    # Process each date group
-    for date_str in sorted_dates:
-        date_records = records_by_date[date_str]
-        print(f"\n--- Processing {len(date_records)} records for {date_str} ---")
-        
-        successful_sends = 0
-        failed_sends = 0
-        
-        # Send all records for this date
-        for i, record in enumerate(date_records, 1):
-            record_id = record[0]
-            print(f"\nProcessing record {i}/{len(date_records)}: {record[1]}")  # raw_name
+    # Stream records and process each date group as soon as it is read
+    with ThreadPoolExecutor(max_workers=1) as image_reader:
+        for date_str, date_records in iter_date_groups(iter_all_records(undelivered_only=not args.resend_all)):
+            total_records += len(date_records)
+            print(f"\n--- Processing {len(date_records)} records for {date_str} ---")
             
-            image_path = record[12]  # image_path
-            image_bytes = get_image_bytes(image_path)
+            successful_sends = 0
+            failed_sends = 0
             
-            success = post_embed(record, image_bytes)
-            if success:
-                successful_sends += 1
-                total_successful_sends += 1
-                # Mark this record as sent
-                save_sent_record(record_id)
-                print(f"✅ Sent record {i}")
-            else:
-                failed_sends += 1
-                total_failed_sends += 1
-                print(f"❌ Failed to send record {i}")
-        
-        # Send daily completion notification immediately after this date's records
-        if successful_sends > 0:
-            notification_sent = send_daily_completion_notification(successful_sends, date_str)
-            if notification_sent:
-                print(f"📢 Daily completion notification sent for {date_str}!")
+            # Send all records for this date
+            for i, (record, image_bytes) in enumerate(iter_with_images(date_records, image_reader), 1):
+                record_id = record[0]
+                print(f"\nProcessing record {i}/{len(date_records)}: {record[1]}")  # raw_name
+                
+                success = post_embed(record, image_bytes)
+                if success:
+                    successful_sends += 1
+                    total_successful_sends += 1
+                    # Mark this record as sent
+                    save_sent_record(record_id)
+                    print(f"✅ Sent record {i}")
+                else:
+                    failed_sends += 1
+                    total_failed_sends += 1
+                    print(f"❌ Failed to send record {i}")
+            
+            # Send daily completion notification immediately after this date's records
+            if successful_sends > 0:
+                notification_sent = send_daily_completion_notification(successful_sends, date_str)
+                if notification_sent:
+                    print(f"📢 Daily completion notification sent for {date_str}!")
+                else:
+                    print(f"❌ Failed to send daily completion notification for {date_str}")
             else:
-                print(f"❌ Failed to send daily completion notification for {date_str}")
-        else:
-            print(f"📭 No successful sends for {date_str}, skipping notification")
+                print(f"📭 No successful sends for {date_str}, skipping notification")
     
-    print(f"\n=== Complete ===")
-    print(f"Total records: {len(all_records)}")
+    if total_records == 0:
+        print("No records to send - everything is already delivered!")
+        return
+    
+    print("\n=== Complete ===")
+    print(f"Total records: {total_records}")
     print(f"Successfully sent: {total_successful_sends}")
     print(f"Failed: {total_failed_sends}")
-    print(f"Success rate: {total_successful_sends/len(all_records)*100:.1f}%")
+    print(f"Success rate: {total_successful_sends/total_records*100:.1f}%")
     
     if total_successful_sends > 0:
         print(f"\n✅ {total_successful_sends} bookings sent to Discord!")
     else:
-        print(f"\n📭 No bookings to send.")
+        print("\n📭 No bookings to send.")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        print_pool_stats()
+        close_pool()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+GJ MugShots statistics rollups
+Per-day aggregates of bookings, charges, arresting agencies and gender/age
+bands. Each ingest refreshes only the booking dates it touched, so the
+statistics endpoints read a few hundred pre-aggregated rows instead of
+scanning bookings.
+"""
+
+from db_pool import get_db_connection
+
+# Width in years of the age bands in stats_daily_demographics
+AGE_BAND_YEARS = 5
+
+# Booking dates refreshed per statement
+STATS_REFRESH_CHUNK = 200
+
+AGE_BAND_SQL = (
+    f"IF(b.age_at_booking IS NULL, 'UNKNOWN', CONCAT("
+    f"FLOOR(b.age_at_booking / {AGE_BAND_YEARS}) * {AGE_BAND_YEARS}, '-', "
+    f"FLOOR(b.age_at_booking / {AGE_BAND_YEARS}) * {AGE_BAND_YEARS} + {AGE_BAND_YEARS - 1}))"
+)
+
+# Rollup table, its columns and the SELECT that aggregates them for the
+# booking dates bound to {dates}
+ROLLUPS = [
+    ("stats_daily", "booking_date, bookings, with_image, charges, holds", '''
+        SELECT b.booking_date, COUNT(DISTINCT b.id),
+               COUNT(DISTINCT IF(b.image_path IS NOT NULL, b.id, NULL)),
+               COUNT(c.booking_id), COUNT(DISTINCT IF(c.is_hold, b.id, NULL))
+        FROM bookings b
+        LEFT JOIN booking_charges c ON c.booking_id = b.id
+        WHERE b.booking_date IN ({dates})
+        GROUP BY b.booking_date
+    '''),
+    ("stats_daily_charges", "booking_date, description, statute, charges, bookings", '''
+        SELECT b.booking_date, c.description, MAX(c.statute), COUNT(*), COUNT(DISTINCT b.id)
+        FROM bookings b
+        JOIN booking_charges c ON c.booking_id = b.id
+        WHERE b.booking_date IN ({dates})
+        GROUP BY b.booking_date, c.description
+    '''),
+    ("stats_daily_arrestors", "booking_date, arrestor, bookings", '''
+        SELECT b.booking_date, LEFT(COALESCE(NULLIF(TRIM(b.raw_arrestor), ''), 'UNKNOWN'), 255) AS arrestor, COUNT(*)
+        FROM bookings b
+        WHERE b.booking_date IN ({dates})
+        GROUP BY b.booking_date, arrestor
+    '''),
+    ("stats_daily_demographics", "booking_date, gender, age_band, bookings", f'''
+        SELECT b.booking_date, LEFT(COALESCE(NULLIF(TRIM(b.gender), ''), 'UNKNOWN'), 32) AS gender_key,
+               {AGE_BAND_SQL} AS age_band, COUNT(*)
+        FROM bookings b
+        WHERE b.booking_date IN ({{dates}})
+        GROUP BY b.booking_date, gender_key, age_band
+    '''),
+]
+
+def refresh_daily_stats(cursor, dates):
+    """Recompute every rollup for the given booking dates (None is ignored)
+
+    Runs on the caller's cursor, so the rollups commit together with the
+    bookings and booking_charges rows they summarize.
+    """
+    dates = sorted({d for d in dates if d})
+    for i in range(0, len(dates), STATS_REFRESH_CHUNK):
+        chunk = dates[i:i + STATS_REFRESH_CHUNK]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        for table, columns, select_sql in ROLLUPS:
+            cursor.execute(f"DELETE FROM {table} WHERE booking_date IN ({placeholders})", chunk)
+            cursor.execute(f"INSERT INTO {table} ({columns}) " + select_sql.format(dates=placeholders), chunk)
+    return len(dates)
+
+def rebuild_daily_stats():
+    """Recompute the rollups for every booking date, one chunk of dates per transaction
+
+    For recovery after manual edits or a change to the rollup definitions;
+    rollup rows for dates that no longer have bookings are removed.
+    """
+    print("=== Rebuilding statistics rollups ===")
+    refreshed = 0
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT booking_date FROM bookings WHERE booking_date IS NOT NULL ORDER BY booking_date")
+            dates = [row[0] for row in cursor.fetchall()]
+
+        for i in range(0, len(dates), STATS_REFRESH_CHUNK):
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                refreshed += refresh_daily_stats(cursor, dates[i:i + STATS_REFRESH_CHUNK])
+                conn.commit()
+            print(f"Refreshed {refreshed}/{len(dates)} booking dates")
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            for table, _, _ in ROLLUPS:
+                cursor.execute(f'''
+                    DELETE s FROM {table} s
+                    LEFT JOIN (SELECT DISTINCT booking_date FROM bookings) b ON b.booking_date = s.booking_date
+                    WHERE b.booking_date IS NULL
+                ''')
+            conn.commit()
+    except Exception as e:
+        print(f"Error rebuilding statistics rollups: {e}")
+    return refreshed
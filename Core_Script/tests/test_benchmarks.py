@@ -0,0 +1,97 @@
+"""pytest-benchmark suite for the pipeline on synthetic blotters
+
+Run with `python3 -m pytest tests/test_benchmarks.py --benchmark-only`;
+compare runs with --benchmark-autosave / --benchmark-compare. The save
+benchmark needs a MySQL server (see scratch_db) and is skipped without one.
+"""
+
+import random
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import pymysql
+import gj_mugshots_core
+from records import parse_name
+from benchmark_core import BENCH_SOURCE_PDF, scratch_database, clear_scratch_tables
+from synthetic_blotter import generate_blotter, make_photo, LAST_NAMES, FIRST_NAMES, MIDDLE_NAMES
+from gj_mugshots_core import (extract_records_from_pdf, match_images_to_names, store_images,
+                              save_records_to_database, ensure_database_tables, ensure_database_indexes)
+
+# Size of the synthetic blotter shared by the benchmarks
+PAGES = 10
+BOOKINGS_PER_PAGE = 6
+
+@pytest.fixture(scope="module")
+def blotter(tmp_path_factory):
+    """Path and booking count of a synthetic blotter PDF"""
+    path = str(tmp_path_factory.mktemp("blotter") / "bench.pdf")
+    return path, generate_blotter(path, pages=PAGES, bookings_per_page=BOOKINGS_PER_PAGE)
+
+@pytest.fixture
+def image_store(tmp_path, monkeypatch):
+    """Point the image store at a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(gj_mugshots_core, "IMAGES_DIR", str(tmp_path / "images"))
+    return tmp_path / "images"
+
+@pytest.fixture(scope="module")
+def scratch_db():
+    """Throwaway database with the pipeline schema; skips without a reachable MySQL server"""
+    try:
+        with scratch_database() as name:
+            ensure_database_tables()
+            ensure_database_indexes()
+            yield name
+    except pymysql.err.OperationalError as e:
+        pytest.skip(f"MySQL server not available: {e}")
+
+@pytest.mark.parametrize("backend", ["pymupdf", "pdfplumber"])
+def test_extract(benchmark, blotter, backend):
+    path, bookings = blotter
+    records = benchmark(extract_records_from_pdf, path, backend)
+    assert len(records) == bookings
+
+def test_parse_name(benchmark):
+    rnd = random.Random(0)
+    names = [f"{rnd.choice(LAST_NAMES)}, {rnd.choice(FIRST_NAMES)} {rnd.choice(MIDDLE_NAMES)}".strip()
+             for _ in range(PAGES * BOOKINGS_PER_PAGE * 100)]
+    parsed = benchmark(lambda: [parse_name(n) for n in names])
+    assert all(last for _, _, last in parsed)
+
+def test_match_images(benchmark):
+    rnd = random.Random(0)
+    layouts = []
+    for _ in range(PAGES * 100):
+        name_tops = sorted(rnd.uniform(70, 790) for _ in range(BOOKINGS_PER_PAGE))
+        # Most rows have a photo, plus the occasional logo at the top
+        image_mids = sorted(top + rnd.uniform(-15, 15) for top in name_tops if rnd.random() < 0.9)
+        if rnd.random() < 0.5:
+            image_mids.insert(0, 30.0)
+        layouts.append((name_tops, image_mids))
+    assignments = benchmark(lambda: [match_images_to_names(n, m) for n, m in layouts])
+    assert len(assignments) == len(layouts)
+
+def test_store_images(benchmark, image_store):
+    rnd = random.Random(0)
+    photos = [make_photo(rnd) for _ in range(PAGES * BOOKINGS_PER_PAGE)]
+    counter = iter(range(1_000_000))
+
+    def fresh_store():
+        # Start from an empty store every round so files are really written
+        gj_mugshots_core.IMAGES_DIR = str(image_store / f"round-{next(counter)}")
+        return (photos,), {}
+
+    stored = benchmark.pedantic(store_images, setup=fresh_store, rounds=5)
+    assert len(stored) == len(photos)
+
+def test_save_records(benchmark, blotter, image_store, scratch_db):
+    path, bookings = blotter
+    records = extract_records_from_pdf(path)
+
+    def empty_tables():
+        clear_scratch_tables()
+        return (records, BENCH_SOURCE_PDF, path), {}
+
+    saved = benchmark.pedantic(save_records_to_database, setup=empty_tables, rounds=3)
+    assert saved == bookings
@@ -0,0 +1,49 @@
+"""Photo-to-booking-row matching (match_images_to_names)"""
+
+from gj_mugshots_core import match_images_to_names
+
+def test_one_photo_per_row():
+    assert match_images_to_names([100, 300, 500], [120, 320, 520]) == [0, 1, 2]
+
+def test_missing_photo_does_not_shift_later_rows():
+    assert match_images_to_names([100, 300, 500], [110, 510]) == [0, None, 1]
+
+def test_missing_first_and_last_photo():
+    assert match_images_to_names([100, 300, 500], [310]) == [None, 0, None]
+
+def test_extra_logo_above_first_row_is_skipped():
+    assert match_images_to_names([100, 300, 500], [20, 110, 310, 510]) == [1, 2, 3]
+
+def test_extra_logo_between_rows_is_skipped():
+    assert match_images_to_names([100, 300, 500], [110, 200, 310, 510]) == [0, 2, 3]
+
+def test_extra_logo_below_last_row_is_skipped():
+    assert match_images_to_names([100, 300], [110, 310, 700]) == [0, 1]
+
+def test_photo_beyond_max_distance_is_not_matched():
+    assert match_images_to_names([100], [350]) == [None]
+    assert match_images_to_names([100], [350], max_distance=300) == [0]
+
+def test_close_rows_keep_photo_passed_over_for_next_row():
+    # Row 1 prefers photo 1, so photo 0 is still free for row 0
+    assert match_images_to_names([100, 250, 400], [190, 260]) == [0, 1, None]
+
+def test_close_rows_keep_photo_passed_over_for_next_photo():
+    # Row 3 passes photo 3 over for photo 4, which row 4 then takes
+    names = [97, 266, 402, 560, 695]
+    images = [249, 321, 417, 432, 670]
+    assert match_images_to_names(names, images) == [None, 0, 2, 3, 4]
+
+def test_assignments_never_cross():
+    assignment = match_images_to_names([100, 130, 160, 190], [105, 135, 140, 165, 195])
+    matched = [j for j in assignment if j is not None]
+    assert matched == sorted(matched)
+    assert len(set(matched)) == len(matched)
+
+def test_images_without_position_are_ignored():
+    assert match_images_to_names([100, 300], [110, None]) == [0, None]
+    assert match_images_to_names([100], [None]) == [None]
+
+def test_empty_inputs():
+    assert match_images_to_names([], [100]) == []
+    assert match_images_to_names([100, 200], []) == [None, None]
@@ -4,6 +4,7 @@ import cors from 'cors';
 import path from 'path';
 import fs from 'fs';
 import { fileURLToPath } from 'url';
+import { normalizeSearchText, trigrams, soundex, metaphone } from './search-keys.js';
 
 // ES module equivalent of __dirname
 const __filename = fileURLToPath(import.meta.url);
@@ -427,7 +428,8 @@ app.get('/api/arrestees/:id', async (req, res) => {
         b1.charges,
         b1.source_pdf,
         b1.image_path as original_image_path,
-        b1.image_path as mugshot_path
+        b1.image_path as mugshot_path,
+        b1.person_id
       FROM bookings b1
       WHERE b1.id = ?
     `;
@@ -447,7 +449,8 @@ app.get('/api/arrestees/:id', async (req, res) => {
       charges = row.charges.split(';').map(charge => charge.trim()).filter(charge => charge.length > 0);
     }
     
-    // Get ALL arrests for this person (same name + DOB)
+    // Get ALL arrests for this person: the person the core pipeline resolved
+    // the booking to, or same name + DOB for rows not resolved yet
     const allArrestsQuery = `
       SELECT 
         id,
@@ -460,16 +463,15 @@ app.get('/api/arrestees/:id', async (req, res) => {
         source_pdf,
         address
       FROM bookings
-      WHERE first_name = ? AND last_name = ? AND date_of_birth = ?
+      WHERE ${row.person_id ? 'person_id = ?' : 'first_name = ? AND last_name = ? AND date_of_birth = ?'}
       ORDER BY booking_date DESC
     `;
     
     const connection2 = await pool.getConnection();
-    const [allArrestRows] = await connection2.execute(allArrestsQuery, [
-      row.first_name, 
-      row.last_name, 
-      row.date_of_birth
-    ]);
+    const [allArrestRows] = await connection2.execute(
+      allArrestsQuery,
+      row.person_id ? [row.person_id] : [row.first_name, row.last_name, row.date_of_birth]
+    );
     connection2.release();
     
     // Create arrests array from all bookings for this person
@@ -526,6 +528,7 @@ app.get('/api/arrestees/:id', async (req, res) => {
 
     const arrestee = {
       id: row.id,
+      person_id: row.person_id,
       first_name: row.first_name || '',
       middle_name: row.middle_name,
       last_name: row.last_name || '',
@@ -547,6 +550,32 @@ app.get('/api/arrestees/:id', async (req, res) => {
   }
 });
 
+// People with the most bookings, from the persons table the core pipeline
+// maintains (one indexed range read, no self-join)
+app.get('/api/repeat-offenders', async (req, res) => {
+  try {
+    const minBookings = Math.max(2, parseInt(req.query.min) || 2);
+    const limit = Math.min(Math.max(1, parseInt(req.query.limit) || 50), 500);
+    const connection = await pool.getConnection();
+    try {
+      const [rows] = await connection.execute(
+        `SELECT id, display_name, dob_date, booking_count, first_booking_date, last_booking_date
+         FROM persons
+         WHERE booking_count >= ?
+         ORDER BY booking_count DESC, last_booking_date DESC
+         LIMIT ${limit}`,
+        [minBookings]
+      );
+      res.json({ persons: rows });
+    } finally {
+      connection.release();
+    }
+  } catch (error) {
+    console.error('Database error:', error);
+    res.status(500).json({ error: 'Database query failed', details: error.message });
+  }
+});
+
 // Search arrestees
 app.get('/api/search', async (req, res) => {
   try {
@@ -555,6 +584,8 @@ app.get('/api/search', async (req, res) => {
       middle_name: qMiddleRaw,
       last_name: qLastRaw,
       address: qAddressRaw,
+      charges: qChargesRaw,
+      fuzzy: qFuzzyRaw,
       gender: qGenderRaw,
       age_min: qAgeMinRaw,
       age_max: qAgeMaxRaw,
@@ -601,6 +632,8 @@ app.get('/api/search', async (req, res) => {
     const middle = sanitizeString(getStr(qMiddleRaw));
     const last = sanitizeString(getStr(qLastRaw));
     const address = sanitizeString(getStr(qAddressRaw));
+    const charges = sanitizeString(getStr(qChargesRaw));
+    const fuzzy = ['1', 'true', 'yes'].includes(String(getStr(qFuzzyRaw) || '').toLowerCase());
     const gender = sanitizeString(getStr(qGenderRaw));
     const ageMinStr = getStr(qAgeMinRaw);
     const ageMaxStr = getStr(qAgeMaxRaw);
@@ -614,21 +647,46 @@ app.get('/api/search', async (req, res) => {
     let whereClause = 'WHERE 1=1';
     const params = [];
 
+    // Substring match: candidates come from the trigram index the core
+    // pipeline maintains (booking_search_grams), LIKE confirms them
+    const addSubstringFilter = (column, field, term) => {
+      const grams = [...new Set(term.split(/[%_]/).map(normalizeSearchText).flatMap(trigrams))];
+      if (grams.length > 0) {
+        whereClause += ` AND b1.id IN (SELECT booking_id FROM booking_search_grams WHERE field = ? AND gram IN (${grams.map(() => '?').join(', ')}) GROUP BY booking_id HAVING COUNT(*) = ?)`;
+        params.push(field, ...grams, grams.length);
+      }
+      whereClause += ` AND ${column} LIKE ?`;
+      params.push(`%${term}%`);
+    };
+
+    // Fuzzy name match: every word must share a Soundex or Metaphone key
+    // with a word of that name part (booking_name_keys)
+    const addNameFilter = (column, namePart, term) => {
+      const words = fuzzy ? normalizeSearchText(term).split(' ').filter((word) => soundex(word)) : [];
+      if (words.length === 0) {
+        addSubstringFilter(column, 'N', term);
+        return;
+      }
+      for (const word of words) {
+        whereClause += ' AND b1.id IN (SELECT booking_id FROM booking_name_keys WHERE name_part = ? AND (soundex = ? OR metaphone = ?))';
+        params.push(namePart, soundex(word), metaphone(word));
+      }
+    };
+
     if (first !== null) {
-      whereClause += ' AND b1.first_name LIKE ?';
-      params.push(`%${first}%`);
+      addNameFilter('b1.first_name', 'F', first);
     }
     if (middle !== null) {
-      whereClause += ' AND b1.middle_name LIKE ?';
-      params.push(`%${middle}%`);
+      addNameFilter('b1.middle_name', 'M', middle);
     }
     if (last !== null) {
-      whereClause += ' AND b1.last_name LIKE ?';
-      params.push(`%${last}%`);
+      addNameFilter('b1.last_name', 'L', last);
     }
     if (address !== null) {
-      whereClause += ' AND b1.address LIKE ?';
-      params.push(`%${address}%`);
+      addSubstringFilter('b1.address', 'A', address);
+    }
+    if (charges !== null) {
+      addSubstringFilter('b1.charges', 'C', charges);
     }
     if (gender !== null && gender !== 'ALL' && ['MALE', 'FEMALE', 'NON-BINARY', 'OTHER', 'UNKNOWN'].includes(gender)) {
       whereClause += ' AND b1.gender = ?';
@@ -731,6 +789,84 @@ app.get('/api/search', async (req, res) => {
   }
 });
 
+// Aggregate statistics from the per-day rollup tables the core pipeline
+// maintains (stats_daily*), optionally limited to a booking date range
+app.get('/api/statistics', async (req, res) => {
+  try {
+    const isDate = (v) => typeof v === 'string' && /^\d{4}-\d{2}-\d{2}$/.test(v) && !isNaN(new Date(v).getTime());
+    const from = isDate(req.query.from) ? req.query.from : null;
+    const to = isDate(req.query.to) ? req.query.to : null;
+    const topLimit = Math.min(Math.max(1, parseInt(req.query.limit) || 50), 500);
+
+    let dateFilter = 'WHERE 1=1';
+    const params = [];
+    if (from !== null) {
+      dateFilter += ' AND booking_date >= ?';
+      params.push(from);
+    }
+    if (to !== null) {
+      dateFilter += ' AND booking_date <= ?';
+      params.push(to);
+    }
+
+    const connection = await pool.getConnection();
+    try {
+      const [daily] = await connection.execute(
+        `SELECT booking_date, bookings, with_image, charges, holds FROM stats_daily ${dateFilter} ORDER BY booking_date`,
+        params
+      );
+      const [charges] = await connection.execute(
+        `SELECT description, MAX(statute) AS statute, SUM(charges) AS charges, SUM(bookings) AS bookings
+         FROM stats_daily_charges ${dateFilter}
+         GROUP BY description ORDER BY SUM(charges) DESC LIMIT ${topLimit}`,
+        params
+      );
+      const [arrestors] = await connection.execute(
+        `SELECT arrestor, SUM(bookings) AS bookings
+         FROM stats_daily_arrestors ${dateFilter}
+         GROUP BY arrestor ORDER BY SUM(bookings) DESC LIMIT ${topLimit}`,
+        params
+      );
+      const [demographics] = await connection.execute(
+        `SELECT gender, age_band, SUM(bookings) AS bookings
+         FROM stats_daily_demographics ${dateFilter}
+         GROUP BY gender, age_band ORDER BY gender, age_band`,
+        params
+      );
+
+      const totals = daily.reduce(
+        (sum, day) => ({
+          bookings: sum.bookings + day.bookings,
+          with_image: sum.with_image + day.with_image,
+          charges: sum.charges + day.charges,
+          holds: sum.holds + day.holds,
+        }),
+        { bookings: 0, with_image: 0, charges: 0, holds: 0 }
+      );
+      const toNumber = (rows, ...keys) => rows.map((row) => {
+        const out = { ...row };
+        keys.forEach((key) => { out[key] = Number(row[key]); });
+        return out;
+      });
+
+      res.json({
+        from,
+        to,
+        totals,
+        daily,
+        charges: toNumber(charges, 'charges', 'bookings'),
+        arrestors: toNumber(arrestors, 'bookings'),
+        demographics: toNumber(demographics, 'bookings'),
+      });
+    } finally {
+      connection.release();
+    }
+  } catch (error) {
+    console.error('Database error:', error);
+    res.status(500).json({ error: 'Statistics query failed', details: error.message });
+  }
+});
+
 // Serve PDF files
 app.get('/api/pdf/:filename', (req, res) => {
   try {
@@ -0,0 +1,108 @@
+// Search keys for /api/search
+// Mirrors Core_Script/search_index.py, which fills booking_search_grams and
+// booking_name_keys at ingest: a query term must be normalized, split into
+// trigrams and phonetically encoded exactly the way the pipeline does it.
+
+// Upper-case ASCII letters and digits, every other run of characters collapsed to one space
+export function normalizeSearchText(text) {
+  if (!text) return '';
+  const ascii = text.normalize('NFKD').replace(/[^\x00-\x7f]/g, '');
+  return (ascii.toUpperCase().match(/[A-Z0-9]+/g) || []).join(' ');
+}
+
+// Distinct 3-character substrings of already normalized text
+export function trigrams(text) {
+  const grams = new Set();
+  for (let i = 0; i + 3 <= text.length; i++) {
+    grams.add(text.slice(i, i + 3));
+  }
+  return [...grams];
+}
+
+const SOUNDEX_CODES = {};
+for (const [letters, digit] of [['BFPV', '1'], ['CGJKQSXZ', '2'], ['DT', '3'], ['L', '4'], ['MN', '5'], ['R', '6']]) {
+  for (const c of letters) SOUNDEX_CODES[c] = digit;
+}
+const VOWELS = new Set('AEIOU');
+const METAPHONE_MAX_LENGTH = 16;
+
+// American Soundex of one word ("ROBERT" -> "R163"), or '' if it has no letters
+export function soundex(word) {
+  const letters = word.toUpperCase().replace(/[^A-Z]/g, '');
+  if (!letters) return '';
+  let code = letters[0];
+  let previous = SOUNDEX_CODES[letters[0]] || '';
+  for (const c of letters.slice(1)) {
+    const digit = SOUNDEX_CODES[c] || '';
+    if (digit && digit !== previous) {
+      code += digit;
+      if (code.length === 4) break;
+    }
+    // H and W do not separate letters with the same code; vowels do
+    if (c !== 'H' && c !== 'W') previous = digit;
+  }
+  return code.padEnd(4, '0');
+}
+
+// Original (Philips 1990) Metaphone key of one word, e.g. SMITH -> SM0
+export function metaphone(word) {
+  let w = word.toUpperCase().replace(/[^A-Z]/g, '');
+  if (!w) return '';
+  if (['AE', 'GN', 'KN', 'PN', 'WR'].includes(w.slice(0, 2))) w = w.slice(1);
+  else if (w[0] === 'X') w = 'S' + w.slice(1);
+  else if (w.slice(0, 2) === 'WH') w = 'W' + w.slice(2);
+
+  const at = (i) => (i >= 0 && i < w.length ? w[i] : '');
+  const frontVowel = (c) => c === 'E' || c === 'I' || c === 'Y';
+  let key = '';
+  for (let i = 0; i < w.length; i++) {
+    const c = w[i];
+    const prev = at(i - 1);
+    const next = at(i + 1);
+    if (c === prev && c !== 'C') continue;
+    if (VOWELS.has(c)) {
+      if (i === 0) key += c;
+    } else if (c === 'B') {
+      if (!(prev === 'M' && i === w.length - 1)) key += 'B';
+    } else if (c === 'C') {
+      if (next === 'I' && at(i + 2) === 'A') key += 'X';
+      else if (next === 'H') key += prev === 'S' ? 'K' : 'X';
+      else if (frontVowel(next)) { if (prev !== 'S') key += 'S'; }
+      else key += 'K';
+    } else if (c === 'D') {
+      key += next === 'G' && frontVowel(at(i + 2)) ? 'J' : 'T';
+    } else if (c === 'G') {
+      if (next === 'H' && at(i + 2) && !VOWELS.has(at(i + 2))) continue;
+      if (next === 'N' && (i + 2 === w.length || w.slice(i + 2) === 'ED')) continue;
+      if (prev === 'D' && frontVowel(next)) continue;
+      key += frontVowel(next) && prev !== 'G' ? 'J' : 'K';
+    } else if (c === 'H') {
+      if ('CSPTG'.includes(prev) && prev) continue;
+      if (VOWELS.has(prev) && !VOWELS.has(next)) continue;
+      key += 'H';
+    } else if (c === 'K') {
+      if (prev !== 'C') key += 'K';
+    } else if (c === 'P') {
+      key += next === 'H' ? 'F' : 'P';
+    } else if (c === 'Q') {
+      key += 'K';
+    } else if (c === 'S') {
+      key += next === 'H' || (next === 'I' && (at(i + 2) === 'O' || at(i + 2) === 'A')) ? 'X' : 'S';
+    } else if (c === 'T') {
+      if (next === 'I' && (at(i + 2) === 'O' || at(i + 2) === 'A')) key += 'X';
+      else if (next === 'H') key += '0';
+      else if (!(next === 'C' && at(i + 2) === 'H')) key += 'T';
+    } else if (c === 'V') {
+      key += 'F';
+    } else if (c === 'W' || c === 'Y') {
+      if (VOWELS.has(next)) key += c;
+    } else if (c === 'X') {
+      key += 'KS';
+    } else if (c === 'Z') {
+      key += 'S';
+    } else {
+      key += c;
+    }
+  }
+  return key.slice(0, METAPHONE_MAX_LENGTH);
+}